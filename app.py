@@ -1,5 +1,19 @@
-from flask import Flask, render_template, send_from_directory
+from flask import Flask, render_template, send_from_directory, jsonify, Response, request
 import os
+import logging
+import threading
+
+from startup import STARTUP
+import trading_bot
+from state_broadcaster import StateBroadcaster
+from chart_data import ChartCache
+from candle_store import CandleStore
+from top_gainers import TopGainersAggregator
+from rate_limiter import ANALYTICS
+import metrics
+from tracing import TRACER
+
+STARTUP.mark("imports")
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -28,6 +42,184 @@ def dashboard():
 def webapp():
     return render_template("webapp.html")
 
+# -------------------------------
+# BOT + DASHBOARD STATE
+# -------------------------------
+
+bot_runtime = {"bot": None, "thread": None, "running": False}
+bot_lock = threading.Lock()
+
+
+def get_bot():
+    with bot_lock:
+        if bot_runtime["bot"] is None:
+            notifier = None
+            if os.getenv("TELEGRAM_BOT_TOKEN"):
+                from telegram_notifications import TelegramNotifier
+                notifier = TelegramNotifier(os.getenv("TELEGRAM_BOT_TOKEN"), os.getenv("TELEGRAM_CHAT_ID", ""))
+            bot = trading_bot.TradingBot(telegram_notifier=notifier)
+            bot.on_state_change = broadcaster.notify
+            if notifier:
+                notifier.status_provider = lambda: broadcaster.snapshot or build_status()
+            bot_runtime["bot"] = bot
+        return bot_runtime["bot"]
+
+
+def build_status():
+    """Снимок для /api/status и /api/stream (строится один раз на все подключения)"""
+    status = get_bot().dashboard_snapshot()
+    status["bot_running"] = bot_runtime["running"]
+    return status
+
+
+broadcaster = StateBroadcaster(build_status)
+
+
+def start_broadcaster():
+    broadcaster.start()
+    if broadcaster.version == 0:
+        broadcaster.refresh()
+
+
+@app.route("/api/status")
+def api_status():
+    start_broadcaster()
+    return jsonify(broadcaster.snapshot)
+
+@app.route("/api/stream")
+def api_stream():
+    """Server-Sent Events: снимок состояния, затем только изменённые поля"""
+    start_broadcaster()
+    return Response(
+        broadcaster.stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+chart_cache = ChartCache(
+    lambda timeframe, limit: get_bot().fetch_candles(timeframe, limit=limit, store=chart_candles),
+    step=trading_bot.PSAR_STEP,
+    max_step=trading_bot.PSAR_MAX_STEP
+)
+
+
+def fetch_chart_ohlcv(symbol, timeframe, since=None, limit=None):
+    exchange = get_bot().exchange
+    if hasattr(exchange, "for_priority"):
+        # свечи графика уступают ордерам и данным стратегии
+        exchange = exchange.for_priority(ANALYTICS)
+    return exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
+
+
+# свой кэш свечей: окно графика 15m (~3000 1m свечей) не вытесняет и не пересоздаёт окна стратегии
+chart_candles = CandleStore(fetch_chart_ohlcv, capacity=chart_cache.base_candles,
+                            max_age=trading_bot.OHLCV_CACHE_MAX_AGE)
+
+
+@app.route("/api/chart_data")
+def api_chart_data():
+    """Свечи и SAR; с ?since=<time последней свечи клиента> - только новые и обновлённые"""
+    timeframe = request.args.get("timeframe", "5m")
+    since = request.args.get("since", type=int)
+    try:
+        payload = chart_cache.payload(timeframe, since)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return Response(payload, mimetype="application/json", headers={"Cache-Control": "no-cache"})
+
+top_gainers = None
+
+
+def get_top_gainers():
+    global top_gainers
+    with bot_lock:
+        if top_gainers is None:
+            # в режиме симулятора у бота нет клиента биржи - нужен отдельный, публичный
+            exchange = bot_runtime["bot"].exchange if bot_runtime["bot"] else None
+            exchange = exchange or trading_bot.create_exchange()
+            if hasattr(exchange, "for_priority"):
+                # фоновые тикеры уступают ордерам и данным стратегии
+                exchange = exchange.for_priority(ANALYTICS)
+            top_gainers = TopGainersAggregator(exchange).start()
+    return top_gainers
+
+
+@app.route("/api/top_gainers")
+def api_top_gainers():
+    """Готовый JSON из памяти: не ждёт биржу и не зависит от числа клиентов"""
+    return Response(get_top_gainers().payload, mimetype="application/json")
+
+metrics.gauge("tradingbot_bot_running", "1 while the strategy loop runs").set_function(
+    lambda: int(bot_runtime["running"]))
+metrics.gauge("tradingbot_sse_subscribers", "Connected /api/stream clients").set_function(
+    lambda: broadcaster.subscribers)
+metrics.gauge("tradingbot_signal_queue_pending", "Signals waiting for delivery").set_function(
+    lambda: bot_runtime["bot"].signal_sender.pending() if bot_runtime["bot"] else 0)
+metrics.gauge("tradingbot_telegram_queue_pending", "Telegram broadcasts waiting for delivery").set_function(
+    lambda: bot_runtime["bot"].notifier._broadcasts.unfinished_tasks
+    if bot_runtime["bot"] and bot_runtime["bot"].notifier else 0)
+
+
+@app.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/api/trace", methods=["GET", "POST"])
+def api_trace():
+    """
+    GET - состояние трассировки и последние итерации (?limit=N).
+    POST {"enabled": true|false, "clear": true} - переключить без перезапуска.
+    """
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        if "enabled" in data:
+            TRACER.enable() if data["enabled"] else TRACER.disable()
+        if data.get("clear"):
+            TRACER.clear()
+        return jsonify(TRACER.status())
+    limit = request.args.get("limit", 20, type=int)
+    return jsonify({**TRACER.status(), "iterations": TRACER.recent(limit)})
+
+@app.route("/api/trace/chrome")
+def api_trace_chrome():
+    """Буфер в формате Chrome Trace Event - открыть в ui.perfetto.dev"""
+    return jsonify(TRACER.chrome_trace()), 200, {
+        "Content-Disposition": "attachment; filename=strategy_trace.json"
+    }
+
+@app.route("/api/startup")
+def api_startup():
+    """Фазы старта процесса и время до первого решения стратегии"""
+    return jsonify(STARTUP.report())
+
+@app.route("/api/start_bot", methods=["POST"])
+def api_start_bot():
+    bot = get_bot()
+    with bot_lock:
+        if bot_runtime["running"]:
+            return jsonify({"error": "Bot is already running"}), 400
+        if bot_runtime["thread"] is not None and bot_runtime["thread"].is_alive():
+            return jsonify({"error": "Bot is still stopping, try again in a few seconds"}), 409
+        bot_runtime["running"] = True
+        bot_runtime["thread"] = threading.Thread(
+            target=bot.strategy_loop,
+            kwargs={"should_continue": lambda: bot_runtime["running"]},
+            name="strategy-loop",
+            daemon=True
+        )
+        bot_runtime["thread"].start()
+    broadcaster.notify()
+    return jsonify({"message": "Bot started"})
+
+@app.route("/api/stop_bot", methods=["POST"])
+def api_stop_bot():
+    with bot_lock:
+        if not bot_runtime["running"]:
+            return jsonify({"error": "Bot is not running"}), 400
+        bot_runtime["running"] = False
+    broadcaster.notify()
+    return jsonify({"message": "Bot stopped"})
+
 # static fallback
 @app.route("/static/<path:path>")
 def send_static(path):
@@ -37,4 +229,5 @@ def send_static(path):
 # LOCAL RUN
 # -------------------------------
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=8000)
+    logging.basicConfig(level=logging.INFO)
+    app.run(host="0.0.0.0", port=8000, threaded=True)
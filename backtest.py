@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Vectorized backtest of the strategy_loop rules on historical 1m candles.
+
+ENTRY: 1m and 5m SAR point in the same direction and there is no position.
+EXIT:  1m SAR changes direction (the position is closed, and a new one is opened on
+       the same candle if 1m and 5m are aligned again).
+Size:  POSITION_PERCENT of the current balance with LEVERAGE.
+
+The 1m direction is taken on each closed 1m candle. The 5m direction is evaluated
+the way the live loop sees it: on the forming 5m candle built from the 1m candles
+seen so far in that bucket. Trades use the same schema as state["trades"].
+
+    python backtest.py eth_1m.csv
+"""
+import json
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from psar import psar_series
+from trading_bot import SYMBOL, LEVERAGE, POSITION_PERCENT, START_BANK, PSAR_STEP, PSAR_MAX_STEP
+
+WARMUP_CANDLES = 5
+
+
+def psar_pass(highs, lows, closes, step=PSAR_STEP, max_step=PSAR_MAX_STEP, with_state=False):
+    """
+    Ряд PSAR по всем свечам (psar.psar_series - тот же движок, что в живом цикле) массивом NumPy.
+    С with_state=True возвращает ещё и состояние после каждой свечи:
+    up_trend, af, up_trend_high, down_trend_low.
+    """
+    if not with_state:
+        return np.array(psar_series(highs, lows, closes, step, max_step), dtype=np.float64)
+    psar, up_trend, af, up_trend_high, down_trend_low = psar_series(
+        highs, lows, closes, step, max_step, with_state=True
+    )
+    return (np.array(psar, dtype=np.float64), np.array(up_trend, dtype=bool), np.array(af, dtype=np.float64),
+            np.array(up_trend_high, dtype=np.float64), np.array(down_trend_low, dtype=np.float64))
+
+
+def forming_psar(state, highs, lows, bucket, partial_high, partial_low, partial_close):
+    """
+    PSAR формирующейся свечи старшего таймфрейма для каждой 1m свечи:
+    от состояния на закрытии предыдущей свечи (bucket - 1) и частичных high/low.
+    """
+    psar, up, af, uth, dtl = state
+    k1 = np.maximum(bucket - 1, 0)
+    k2 = np.maximum(bucket - 2, 0)
+    prev = psar[k1]
+
+    rising = prev + af[k1] * (uth[k1] - prev)
+    p_up = np.where(lows[k2] < rising, lows[k2], np.where(lows[k1] < rising, lows[k1], rising))
+    p_up = np.where(partial_low < rising, uth[k1], p_up)
+
+    falling = prev - af[k1] * (prev - dtl[k1])
+    p_dn = np.where(highs[k2] > falling, highs[k2], np.where(highs[k1] > falling, highs[k1], falling))
+    p_dn = np.where(partial_high > falling, dtl[k1], p_dn)
+
+    return np.where(bucket < 2, partial_close, np.where(up[k1], p_up, p_dn))
+
+
+def aggregate(timestamps, highs, lows, closes, minutes):
+    """
+    Свечи N-минутного таймфрейма и частичные high/low/close формирующейся свечи
+    на каждой 1m свече (границы по эпохе, как в resample_ohlcv).
+    """
+    period_ms = minutes * 60_000
+    bucket_start = timestamps - timestamps % period_ms
+    starts = np.flatnonzero(np.r_[True, bucket_start[1:] != bucket_start[:-1]])
+    bucket = np.cumsum(np.r_[False, bucket_start[1:] != bucket_start[:-1]])
+    pos = np.arange(len(timestamps)) - starts[bucket]
+
+    partial_high = highs.copy()
+    partial_low = lows.copy()
+    for d in range(1, minutes):
+        valid = pos >= d
+        idx = np.flatnonzero(valid)
+        partial_high[idx] = np.maximum(partial_high[idx], highs[idx - d])
+        partial_low[idx] = np.minimum(partial_low[idx], lows[idx - d])
+
+    ends = np.r_[starts[1:], len(timestamps)] - 1
+    tf_high = partial_high[ends]
+    tf_low = partial_low[ends]
+    tf_close = closes[ends]
+    return bucket, partial_high, partial_low, tf_high, tf_low, tf_close
+
+
+def run_backtest(timestamps, highs, lows, closes, start_balance=START_BANK,
+                 step=PSAR_STEP, max_step=PSAR_MAX_STEP, leverage=LEVERAGE,
+                 position_percent=POSITION_PERCENT, confirm_minutes=5, with_trades=True, symbol=SYMBOL):
+    """
+    Прогон правил стратегии по 1m свечам (NumPy массивы одинаковой длины, timestamp в мс).
+    Возвращает dict: balance, trades (как state["trades"] у TradingBot), equity
+    (по каждой 1m свече), open_position (как state["position"], или None), stats.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    highs = np.asarray(highs, dtype=np.float64)
+    lows = np.asarray(lows, dtype=np.float64)
+    closes = np.asarray(closes, dtype=np.float64)
+    n = len(closes)
+
+    psar_1m = psar_pass(highs, lows, closes, step, max_step)
+    bucket, partial_high, partial_low, tf_high, tf_low, tf_close = aggregate(
+        timestamps, highs, lows, closes, confirm_minutes
+    )
+    tf_state = psar_pass(tf_high, tf_low, tf_close, step, max_step, with_state=True)
+    psar_tf = forming_psar(tf_state, tf_high, tf_low, bucket, partial_high, partial_low, closes)
+
+    dir_1m = np.where(closes > psar_1m, 1, -1)
+    dir_tf = np.where(closes > psar_tf, 1, -1)
+
+    # первая проверка - когда на обоих таймфреймах есть WARMUP_CANDLES свечей
+    bars = np.arange(n)
+    warmup = max(int(np.searchsorted(bucket, WARMUP_CANDLES - 1)), WARMUP_CANDLES - 1)
+    active = bars >= warmup
+
+    # позиция открывается на первой свече с совпадением 1m/5m внутри отрезка
+    # между сменами направления 1m и закрывается на следующей смене
+    flip = np.r_[False, dir_1m[1:] != dir_1m[:-1]] & (bars > warmup)
+    segment = np.cumsum(flip)
+    segment_starts = np.flatnonzero(flip)
+    aligned = np.flatnonzero((dir_1m == dir_tf) & active)
+    _, first = np.unique(segment[aligned], return_index=True)
+    entry_idx = aligned[first]
+
+    entry_segment = segment[entry_idx]
+    has_exit = entry_segment < len(segment_starts)
+    closed_entry = entry_idx[has_exit]
+    closed_exit = segment_starts[entry_segment[has_exit]]
+
+    side = dir_1m[closed_entry]
+    entry_price = closes[closed_entry]
+    exit_price = closes[closed_exit]
+
+    exposure = position_percent * leverage
+    growth = 1 + exposure * side * (exit_price - entry_price) / entry_price
+    balances = start_balance * np.r_[1.0, np.cumprod(growth)]
+    notional = balances[:-1] * exposure
+    size = notional / entry_price
+    pnl = np.diff(balances)
+
+    # equity: реализованный баланс + нереализованный P&L открытой позиции
+    equity = balances[np.searchsorted(closed_exit, bars, side="right")]
+    if len(entry_idx):
+        all_exits = np.r_[closed_exit, np.full(len(entry_idx) - len(closed_entry), n)]
+        k = np.searchsorted(entry_idx, bars, side="right") - 1
+        in_trade = (k >= 0) & (bars < all_exits[np.maximum(k, 0)])
+        k = np.maximum(k, 0)
+        opened_at = entry_idx[k]
+        unrealized = balances[k] * exposure * dir_1m[opened_at] * (closes - closes[opened_at]) / closes[opened_at]
+        equity = np.where(in_trade, balances[k] + unrealized, equity)
+
+    trades = []
+    if with_trades and len(closed_entry):
+        durations = (timestamps[closed_exit] - timestamps[closed_entry]) // 1000
+        times = np.datetime_as_string(timestamps[closed_exit].astype("datetime64[ms]"), unit="s")
+        trades = [
+            {
+                "time": ts,
+                "symbol": symbol,
+                "side": "long" if s > 0 else "short",
+                "entry_price": ep,
+                "exit_price": xp,
+                "size_base": sz,
+                "pnl": round(p, 4),
+                "notional": nt,
+                "duration": f"{d // 60}м {d % 60}с",
+                "close_reason": "1m_direction_change_exit"
+            }
+            for ts, s, ep, xp, sz, p, nt, d in zip(
+                times.tolist(), side.tolist(), entry_price.tolist(),
+                exit_price.tolist(), size.tolist(), pnl.tolist(), notional.tolist(), durations.tolist()
+            )
+        ]
+
+    open_position = None
+    if len(entry_idx) > len(closed_entry):
+        i = int(entry_idx[-1])
+        open_notional = float(balances[-1] * exposure)
+        open_position = {
+            "symbol": symbol,
+            "side": "long" if dir_1m[i] > 0 else "short",
+            "entry_price": float(closes[i]),
+            "size_base": open_notional / float(closes[i]),
+            "notional": open_notional,
+            "margin": open_notional / leverage,
+            "entry_time": datetime.utcfromtimestamp(int(timestamps[i]) / 1000).isoformat()
+        }
+
+    wins = int(np.count_nonzero(pnl > 0))
+    peak = np.maximum.accumulate(equity) if n else equity
+    drawdown = float(np.max((peak - equity) / peak)) if n else 0.0
+    return {
+        "balance": float(balances[-1]),
+        "trades": trades,
+        "equity": equity,
+        "open_position": open_position,
+        "stats": {
+            "candles": n,
+            "trades": int(len(closed_entry)),
+            "wins": wins,
+            "win_rate": wins / len(closed_entry) if len(closed_entry) else 0.0,
+            "return_pct": (float(balances[-1]) / start_balance - 1) * 100,
+            "max_drawdown_pct": drawdown * 100
+        }
+    }
+
+
+def load_ohlcv_csv(path):
+    """CSV timestamp,open,high,low,close,volume (timestamp в мс, заголовок необязателен)"""
+    with open(path) as f:
+        first = f.readline()
+    try:
+        # метка времени может быть записана как 1700000000000.0
+        float(first.split(",")[0])
+        skip = 0
+    except ValueError:
+        skip = 1
+    data = np.loadtxt(path, delimiter=",", skiprows=skip, usecols=(0, 1, 2, 3, 4, 5), ndmin=2)
+    return {
+        "timestamp": data[:, 0].astype(np.int64),
+        "open": data[:, 1],
+        "high": data[:, 2],
+        "low": data[:, 3],
+        "close": data[:, 4],
+        "volume": data[:, 5]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the 1m + 5m SAR alignment strategy")
+    parser.add_argument("csv", help="1m candles: timestamp,open,high,low,close,volume")
+    parser.add_argument("--balance", type=float, default=START_BANK)
+    parser.add_argument("--trades-out", help="write trades as JSON to this file")
+    args = parser.parse_args()
+
+    candles = load_ohlcv_csv(args.csv)
+    started = datetime.utcnow()
+    result = run_backtest(candles["timestamp"], candles["high"], candles["low"], candles["close"],
+                          start_balance=args.balance)
+    elapsed = (datetime.utcnow() - started).total_seconds()
+
+    print(json.dumps(result["stats"], indent=2))
+    print(f"Final balance: ${result['balance']:.2f} ({elapsed:.3f}s)")
+    if args.trades_out:
+        with open(args.trades_out, "w") as f:
+            json.dump(result["trades"], f, default=str)
+
+
+if __name__ == "__main__":
+    main()
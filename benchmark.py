@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the hot paths of the bot.
+
+The exchange, Telegram and the signal webhook are local stubs. The exchange is
+backed by a seeded MarketSimulator, and the two HTTP endpoints are served by an
+HTTP server on 127.0.0.1. No network access is needed. Every run appends one
+record (commit, python, per-benchmark timings) to bench_results.jsonl and is
+compared with the latest record from another commit. A slowdown over --threshold
+percent is reported as a regression.
+
+    python benchmark.py
+    python benchmark.py --quick --only psar strategy
+    python benchmark.py --fail-on-regression     # exit code 1 on regression
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+import statistics
+import subprocess
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_FILE = os.path.join(BASE_DIR, "bench_results.jsonl")
+
+# до импорта trading_bot: никаких бирж и живых файлов состояния; рабочие файлы
+# прогона лежат во временном каталоге BenchEnvironment
+os.environ.update({
+    "USE_SIMULATOR": "0",
+    "USE_WS_FEED": "0",
+    "REPLAY_FILE": "",
+    "VIRTUAL_CLOCK": "0",
+    "RUN_IN_PAPER": "1",
+    "KUCOIN_API_KEY": "",
+    "KUCOIN_API_SECRET": "",
+    "TRADE_JOURNAL_FILE": ":memory:",
+    "SIGNAL_QUEUE_PATH": ":memory:",
+})
+
+import trading_bot  # noqa: E402
+from trading_bot import TradingBot, new_state  # noqa: E402
+from market_simulator import MarketSimulator  # noqa: E402
+from clock import VirtualClock  # noqa: E402
+from signal_sender import SignalSender  # noqa: E402
+from telegram_notifications import TelegramNotifier  # noqa: E402
+
+BENCH_SYMBOL = "BENCH/USDT"
+SEED = 7
+DEFAULT_THRESHOLD = 20.0
+
+
+class StubExchange:
+    """ccxt-подобная биржа поверх симулятора: те же вызовы, что делает бот"""
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+        self.calls = 0
+
+    def fetch_ohlcv(self, symbol, timeframe="1m", since=None, limit=None):
+        self.calls += 1
+        candles = self.simulator.fetch_ohlcv(timeframe, limit=limit or 500)
+        if since is not None:
+            candles = [c for c in candles if c[0] >= since]
+        return candles
+
+    def fetch_ticker(self, symbol):
+        self.calls += 1
+        return {"symbol": symbol, "last": self.simulator.get_current_price()}
+
+    def fetch_tickers(self, symbols=None):
+        return {BENCH_SYMBOL: self.fetch_ticker(BENCH_SYMBOL)}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.requests += 1
+        body = b'{"ok":true,"result":{}}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubHTTPServer:
+    """Telegram Bot API и вебхук сигналов на 127.0.0.1 (любой POST -> 200)"""
+
+    def __init__(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        self.server.daemon_threads = True
+        self.server.requests = 0
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, name="bench-stub-http", daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+
+
+def measure(func, number, repeat):
+    """Медиана и минимум одного вызова (мкс) по repeat сериям из number вызовов"""
+    func()  # прогрев: кэши, ленивые импорты, соединения
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - started) / number * 1e6)
+    return {
+        "median_us": round(statistics.median(samples), 2),
+        "min_us": round(min(samples), 2),
+        "number": number,
+        "repeat": repeat
+    }
+
+
+class BenchEnvironment:
+    """
+    Бот на заглушках во временном каталоге (журнал, очередь сигналов, файлы состояния);
+    close() останавливает заглушки и удаляет каталог.
+    """
+
+    def __init__(self):
+        self.work_dir = tempfile.TemporaryDirectory(prefix="bench_")
+        self._previous_cwd = os.getcwd()
+        os.chdir(self.work_dir.name)
+        trading_bot.TRADE_JOURNAL_FILE = os.path.join(self.work_dir.name, "trades.db")
+        self.http = StubHTTPServer()
+        os.environ["SIGNAL_WEBHOOK_URL"] = f"{self.http.url}/signal"
+        self.clock = VirtualClock()
+        self.simulator = MarketSimulator(initial_price=3000, seed=SEED, clock=self.clock)
+        self.exchange = StubExchange(self.simulator)
+        self.notifier = TelegramNotifier("bench-token", "1001,1002")
+        self.notifier.base_url = f"{self.http.url}/botbench-token"
+        self.signal_sender = SignalSender(queue_path=os.path.join(self.work_dir.name, "signal_queue.db"))
+        self.bot = TradingBot(
+            telegram_notifier=self.notifier,
+            symbol=BENCH_SYMBOL,
+            bot_state=new_state(),
+            exchange=self.exchange,
+            signal_sender=self.signal_sender,
+            market_stream=False,
+            clock=self.clock
+        )
+        self.bot.state_file = os.path.join(self.work_dir.name, "bench_state.json")
+        # каждый вызов идёт в "биржу", а не в кэш свечей/цены
+        self.bot.candle_store.max_age = 0
+        self.bot.price_service.max_age = 0
+        self.df_1m = self.bot.fetch_ohlcv_tf("1m", limit=200)
+
+    def close(self):
+        self.notifier.flush(timeout=10)
+        self.signal_sender.flush(timeout=10)
+        self.http.close()
+        os.chdir(self._previous_cwd)
+        self.work_dir.cleanup()
+
+    def strategy_iteration(self):
+        """Одна итерация strategy_loop: шаг рынка, цикл стратегии, ожидание"""
+        self.clock.advance(5)
+        self.bot.run_strategy_cycle()
+
+    def trade_round_trip(self):
+        """Вход и выход: ордер, журнал, состояние, Telegram и сигнал в очередь"""
+        if self.bot.state["in_position"]:
+            self.bot.close_position(close_reason="benchmark")
+        self.bot.open_aligned_position("long")
+        self.bot.close_position(close_reason="benchmark")
+
+
+BENCHMARKS = {
+    "compute_psar_200": (lambda env: lambda: env.bot.compute_psar(env.df_1m), 200),
+    "fetch_ohlcv_tf_1m": (lambda env: lambda: env.bot.fetch_ohlcv_tf("1m", limit=50), 200),
+    "fetch_ohlcv_tf_5m": (lambda env: lambda: env.bot.fetch_ohlcv_tf("5m", limit=50), 100),
+    "simulator_fetch_ohlcv_1m": (lambda env: lambda: env.simulator.fetch_ohlcv("1m", limit=200), 500),
+    "simulator_fetch_ohlcv_15m": (lambda env: lambda: env.simulator.fetch_ohlcv("15m", limit=200), 200),
+    "save_state_to_file": (lambda env: env.bot.save_state_to_file, 200),
+    "strategy_iteration": (lambda env: env.strategy_iteration, 100),
+    "trade_round_trip": (lambda env: env.trade_round_trip, 30),
+    "telegram_post": (lambda env: lambda: env.notifier._post_message("1001", "benchmark"), 50),
+    "signal_deliver": (lambda env: lambda: env.signal_sender._deliver("long", "open", {"bench": True}), 50),
+}
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BASE_DIR,
+                                    capture_output=True, text=True, timeout=30).stdout.strip())
+    except (OSError, subprocess.SubprocessError):
+        return "unknown", False
+    return commit or "unknown", dirty
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def baseline_for(history, commit, dirty):
+    """Последний прогон другого коммита (или того же коммита до локальных правок)"""
+    for record in reversed(history):
+        if record["commit"] != commit or (dirty and not record.get("dirty")):
+            return record
+    return None
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"\n{'benchmark':<28}{'median':>12}{'min':>12}{'baseline':>12}{'change':>10}")
+    for name, result in results.items():
+        base = (baseline or {}).get("results", {}).get(name)
+        change = ""
+        if base:
+            delta = (result["median_us"] - base["median_us"]) / base["median_us"] * 100
+            change = f"{delta:+.1f}%"
+            if delta > threshold:
+                regressions.append((name, delta))
+                change += " !"
+        base_text = f"{base['median_us']:.1f}us" if base else "-"
+        print(f"{name:<28}{result['median_us']:>10.1f}us{result['min_us']:>10.1f}us{base_text:>12}{change:>10}")
+    if baseline:
+        print(f"\nbaseline: {baseline['commit']}{' (dirty)' if baseline.get('dirty') else ''} at {baseline['time']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the bot hot paths")
+    parser.add_argument("--only", nargs="+", help="run benchmarks whose name contains any of these")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--quick", action="store_true", help="a tenth of the calls per series")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="regression threshold, percent")
+    parser.add_argument("--output", default=RESULTS_FILE)
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    selected = {
+        name: spec for name, spec in BENCHMARKS.items()
+        if not args.only or any(part in name for part in args.only)
+    }
+    if not selected:
+        parser.error(f"no benchmarks match {args.only}; available: {', '.join(BENCHMARKS)}")
+
+    env = BenchEnvironment()
+    results = {}
+    try:
+        for name, (factory, number) in selected.items():
+            if args.quick:
+                number = max(1, number // 10)
+            results[name] = measure(factory(env), number, args.repeat)
+            print(f"{name:<28}{results[name]['median_us']:>10.1f}us", file=sys.stderr)
+    finally:
+        env.close()
+
+    commit, dirty = git_revision()
+    history = load_history(args.output)
+    regressions = compare(results, baseline_for(history, commit, dirty), args.threshold)
+
+    if not args.no_save:
+        record = {
+            "commit": commit,
+            "dirty": dirty,
+            "time": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": results
+        }
+        with open(args.output, "a") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    for name, delta in regressions:
+        print(f"REGRESSION {name}: {delta:+.1f}% (threshold {args.threshold:.0f}%)")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
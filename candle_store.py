@@ -0,0 +1,210 @@
+import time
+import logging
+import threading
+
+import numpy as np
+
+from candles import Candles
+
+
+def timeframe_to_seconds(timeframe):
+    """'1m' -> 60, '1h' -> 3600, '1d' -> 86400"""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+    return int(timeframe[:-1]) * units[timeframe[-1]]
+
+
+class CandleBuffer:
+    """
+    Окно свечей фиксированной ёмкости для одной пары (symbol, timeframe).
+
+    Строки [timestamp, open, high, low, close, volume] лежат в одном массиве NumPy
+    на 2 * capacity строк: новые дописываются в конец, а при заполнении последние
+    capacity строк один раз сдвигаются в начало. Окно всегда непрерывно, и его
+    копия для читателя - одно копирование блока памяти.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._rows = np.empty((2 * capacity, 6), dtype=np.float64)
+        self._start = 0
+        self._end = 0
+        self.synced_at = None
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def last_timestamp(self):
+        return int(self._rows[self._end - 1, 0]) if self._end > self._start else None
+
+    def clear(self):
+        self._start = self._end = 0
+
+    def _append(self, candle):
+        if self._end == len(self._rows):
+            keep = self.capacity - 1
+            self._rows[:keep] = self._rows[self._end - keep:self._end]
+            self._start, self._end = 0, keep
+        self._rows[self._end] = candle
+        self._end += 1
+        if self._end - self._start > self.capacity:
+            self._start += 1
+
+    def merge(self, ohlcv):
+        """
+        Добавляет свечи [timestamp, open, high, low, close, volume].
+        Свеча с той же меткой времени, что и последняя (формирующаяся), заменяет её,
+        более старые свечи игнорируются.
+        """
+        for candle in ohlcv:
+            ts = candle[0]
+            if self._end > self._start:
+                last_ts = self._rows[self._end - 1, 0]
+                if ts < last_ts:
+                    continue
+                if ts == last_ts:
+                    self._rows[self._end - 1] = candle
+                    continue
+            self._append(candle)
+
+    def _block(self, limit):
+        return self._rows[max(self._start, self._end - limit):self._end]
+
+    def window(self, limit):
+        rows = self._block(limit).tolist()
+        for row in rows:
+            row[0] = int(row[0])
+        return rows
+
+    def window_candles(self, limit):
+        """Последние limit свечей как Candles (копия: буфер меняется под другими читателями)"""
+        return Candles.from_array(self._block(limit).copy())
+
+
+class CandleStore:
+    """
+    Кэш OHLCV в памяти. Первый запрос по (symbol, timeframe) загружает окно целиком,
+    дальше с биржи запрашиваются только свечи начиная с последней сохранённой (since),
+    а повторные запросы в пределах max_age отдаются из памяти.
+
+    fetch_ohlcv - callable(symbol, timeframe, since=None, limit=None), как у ccxt.
+    Окно больше full_limit (столько свечей биржа отдаёт за один запрос) загружается
+    страницами от начала окна.
+    """
+
+    def __init__(self, fetch_ohlcv, capacity=500, max_age=1.0, page_limit=500, full_limit=1500):
+        self._fetch = fetch_ohlcv
+        self.capacity = capacity
+        self.max_age = max_age
+        self.page_limit = page_limit
+        self.full_limit = full_limit
+        self._buffers = {}
+        self._lock = threading.Lock()
+        self.stats = {"full": 0, "delta": 0, "memory": 0, "candles": 0}
+
+    def _buffer(self, symbol, timeframe, limit):
+        key = (symbol, timeframe)
+        with self._lock:
+            buf = self._buffers.get(key)
+            if buf is None or buf.capacity < limit:
+                buf = CandleBuffer(max(self.capacity, limit))
+                self._buffers[key] = buf
+            return buf
+
+    def _synced(self, buf, symbol, timeframe):
+        now = time.monotonic()
+        if buf.synced_at is not None and now - buf.synced_at < self.max_age:
+            self.stats["memory"] += 1
+        else:
+            self._sync(buf, symbol, timeframe)
+            buf.synced_at = time.monotonic()
+        return buf
+
+    def get(self, symbol, timeframe, limit=200):
+        """Возвращает последние limit свечей списком [timestamp, open, high, low, close, volume]"""
+        buf = self._buffer(symbol, timeframe, limit)
+        with buf.lock:
+            return self._synced(buf, symbol, timeframe).window(limit)
+
+    def get_candles(self, symbol, timeframe, limit=200):
+        """То же, что get(), но колонками NumPy (Candles) - без списков и DataFrame"""
+        buf = self._buffer(symbol, timeframe, limit)
+        with buf.lock:
+            return self._synced(buf, symbol, timeframe).window_candles(limit)
+
+    def _sync(self, buf, symbol, timeframe):
+        last_ts = buf.last_timestamp
+        tf_ms = timeframe_to_seconds(timeframe) * 1000
+        now_ms = int(time.time() * 1000)
+        missing = None if last_ts is None else (now_ms - last_ts) // tf_ms
+
+        if last_ts is not None and missing < buf.capacity:
+            self._fetch_pages(buf, symbol, timeframe, last_ts, self.page_limit, "delta")
+        elif buf.capacity <= self.full_limit:
+            ohlcv = self._fetch(symbol, timeframe, limit=buf.capacity)
+            buf.clear()
+            buf.merge(ohlcv or [])
+            self.stats["full"] += 1
+            self.stats["candles"] += len(ohlcv or [])
+            return
+        else:
+            # окно больше одного ответа биржи - страницами от начала окна
+            buf.clear()
+            start = now_ms - now_ms % tf_ms - (buf.capacity - 1) * tf_ms
+            self._fetch_pages(buf, symbol, timeframe, start, self.full_limit, "full")
+
+        logging.debug(f"Candle store {symbol} {timeframe}: synced to {buf.last_timestamp}")
+
+    def _fetch_pages(self, buf, symbol, timeframe, since, limit, kind):
+        """Свечи начиная с since, по limit за запрос, пока биржа отдаёт полные страницы"""
+        while True:
+            ohlcv = self._fetch(symbol, timeframe, since=since, limit=limit)
+            self.stats[kind] += 1
+            if not ohlcv:
+                break
+            self.stats["candles"] += len(ohlcv)
+            buf.merge(ohlcv)
+            if len(ohlcv) < limit or ohlcv[-1][0] <= since:
+                break
+            since = ohlcv[-1][0]
+
+    def apply(self, symbol, timeframe, candle):
+        """
+        Принять свечу из потока (WebSocket). Пока окно не загружено по REST или
+        если между последней сохранённой свечой и новой есть разрыв, свеча не
+        применяется, а окно помечается для дозагрузки по REST.
+        """
+        with self._lock:
+            buf = self._buffers.get((symbol, timeframe))
+        if buf is None:
+            return False
+        with buf.lock:
+            last_ts = buf.last_timestamp
+            tf_ms = timeframe_to_seconds(timeframe) * 1000
+            if last_ts is None or candle[0] - last_ts > tf_ms:
+                buf.synced_at = None
+                return False
+            buf.merge([candle])
+            buf.synced_at = time.monotonic()
+            return True
+
+    def mark_stale(self, symbol=None, timeframe=None):
+        """Следующий get() синхронизирует окно с биржей, не дожидаясь max_age"""
+        with self._lock:
+            buffers = [
+                buf for (sym, tf), buf in self._buffers.items()
+                if (symbol is None or sym == symbol) and (timeframe is None or tf == timeframe)
+            ]
+        for buf in buffers:
+            buf.synced_at = None
+
+    def invalidate(self, symbol=None, timeframe=None):
+        """Сбросить кэш (всё, по символу или по паре symbol/timeframe)"""
+        with self._lock:
+            for key in list(self._buffers):
+                if symbol is not None and key[0] != symbol:
+                    continue
+                if timeframe is not None and key[1] != timeframe:
+                    continue
+                del self._buffers[key]
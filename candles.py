@@ -0,0 +1,69 @@
+import numpy as np
+
+CANDLE_FIELDS = ("timestamp", "open", "high", "low", "close", "volume")
+
+
+class Candles:
+    """
+    Окно свечей по колонкам: timestamp (int64, мс), open, high, low, close, volume (float64).
+
+    Индикаторы читают колонки напрямую (candles.close, candles["high"]), без копий.
+    pandas нужен только тем, кто просит to_frame() - DataFrame строится по запросу
+    и запоминается.
+    """
+
+    __slots__ = CANDLE_FIELDS + ("_frame",)
+
+    def __init__(self, timestamp, open, high, low, close, volume):
+        self.timestamp = np.asarray(timestamp, dtype=np.int64)
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = np.asarray(volume, dtype=np.float64)
+        self._frame = None
+
+    @classmethod
+    def from_array(cls, block):
+        """Из массива (n, 6) строк [timestamp, open, high, low, close, volume]; цены - представления block"""
+        block = np.asarray(block, dtype=np.float64).reshape(-1, 6)
+        return cls(block[:, 0].astype(np.int64), block[:, 1], block[:, 2], block[:, 3], block[:, 4], block[:, 5])
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Из списка [timestamp, open, high, low, close, volume], как отдаёт ccxt"""
+        return cls.from_array(rows if len(rows) else np.empty((0, 6)))
+
+    def __len__(self):
+        return len(self.close)
+
+    def __getitem__(self, field):
+        if field not in CANDLE_FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def tail(self, limit):
+        """Последние limit свечей (представления тех же массивов)"""
+        if limit >= len(self):
+            return self
+        return Candles(*(getattr(self, field)[-limit:] for field in CANDLE_FIELDS))
+
+    @property
+    def last_close(self):
+        return float(self.close[-1]) if len(self) else None
+
+    def rows(self):
+        """Списком [timestamp, open, high, low, close, volume], как у ccxt"""
+        return [
+            [ts, o, h, l, c, v]
+            for ts, o, h, l, c, v in zip(*(getattr(self, field).tolist() for field in CANDLE_FIELDS))
+        ]
+
+    def to_frame(self):
+        """pandas.DataFrame (timestamp, open, high, low, close, volume, datetime) - строится один раз"""
+        if self._frame is None:
+            import pandas as pd
+            frame = pd.DataFrame({field: getattr(self, field) for field in CANDLE_FIELDS})
+            frame["datetime"] = pd.to_datetime(frame["timestamp"], unit="ms")
+            self._frame = frame
+        return self._frame
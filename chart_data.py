@@ -0,0 +1,124 @@
+import json
+import time
+import bisect
+import threading
+
+from candle_store import timeframe_to_seconds
+from psar import psar_series
+
+CHART_TIMEFRAMES = ("1m", "5m", "15m")  # как в переключателе дашборда
+CHART_CANDLES = 100
+CHART_WARMUP = 100  # лишние свечи в начале окна, чтобы SAR видимой части не зависел от сдвига окна
+CHART_MAX_AGE = 1.0
+SAR_COLORS = {"up": "#22c55e", "down": "#ff3366"}
+
+
+class ChartCache:
+    """
+    Свечи и точки SAR для /api/chart_data, посчитанные один раз на всех клиентов.
+
+    На таймфрейм хранится последнее окно (время свечи в секундах, как у биржи) и
+    готовый JSON полного ответа. Клиент с курсором since получает только свечи
+    с time >= since: формирующуюся (обновлённую) и новые, обычно одну-две.
+
+    fetch_candles - callable(timeframe, limit) -> Candles; в app.py это TradingBot.fetch_candles,
+    тот же путь, что у стратегии (старшие таймфреймы собираются из 1m при RESAMPLE_FROM_1M),
+    но со своим CandleStore. Таймфреймы - только из timeframes, остальные - ValueError.
+    """
+
+    def __init__(self, fetch_candles, candles=CHART_CANDLES, warmup=CHART_WARMUP, max_age=CHART_MAX_AGE,
+                 step=0.05, max_step=0.5, timeframes=CHART_TIMEFRAMES):
+        self._fetch = fetch_candles
+        self.timeframes = tuple(timeframes)
+        self.step = step
+        self.max_step = max_step
+        self.candles = candles
+        self.warmup = warmup
+        self.max_age = max_age
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.stats = {"builds": 0, "full": 0, "delta": 0, "memo": 0}
+
+    @property
+    def base_candles(self):
+        """Сколько 1m свечей нужно, чтобы собрать окно самого старшего таймфрейма"""
+        minutes = max(timeframe_to_seconds(tf) for tf in self.timeframes) // 60
+        return (self.candles + self.warmup + 1) * minutes
+
+    def _entry(self, timeframe):
+        if timeframe not in self.timeframes:
+            raise ValueError(f"Unsupported timeframe: {timeframe}")
+        with self._lock:
+            lock = self._locks.setdefault(timeframe, threading.Lock())
+        with lock:
+            entry = self._entries.get(timeframe)
+            if entry is None or time.monotonic() - entry["built_at"] >= self.max_age:
+                entry = self._build(timeframe, entry)
+                self._entries[timeframe] = entry
+        return entry
+
+    def _build(self, timeframe, previous):
+        window = self._fetch(timeframe, self.candles + self.warmup)
+        self.stats["builds"] += 1
+        psar = psar_series(window.high, window.low, window.close, self.step, self.max_step)[-self.candles:]
+        window = window.tail(self.candles)
+
+        times = (window.timestamp // 1000).tolist()
+        candles = [
+            {"time": t, "open": o, "high": h, "low": l, "close": c}
+            for t, o, h, l, c in zip(times, window.open.tolist(), window.high.tolist(),
+                                     window.low.tolist(), window.close.tolist())
+        ]
+        sar_points = []
+        for t, value, close in zip(times, psar, window.close.tolist()):
+            trend = "up" if value < close else "down"
+            sar_points.append({"time": t, "value": value, "trend": trend, "color": SAR_COLORS[trend]})
+
+        rows = list(zip(candles, sar_points))
+        if previous is not None and previous["rows"] == rows:
+            # ничего не изменилось - тот же ответ и тот же memo
+            previous["built_at"] = time.monotonic()
+            return previous
+
+        return {
+            "built_at": time.monotonic(),
+            "timeframe": timeframe,
+            "times": times,
+            "rows": rows,
+            "memo": {},
+            "full": self._encode(timeframe, candles, sar_points, times, reset=True)
+        }
+
+    @staticmethod
+    def _encode(timeframe, candles, sar_points, times, reset):
+        return json.dumps({
+            "timeframe": timeframe,
+            "reset": reset,
+            "cursor": times[-1] if times else None,
+            "candles": candles,
+            "sar_points": sar_points
+        }, separators=(",", ":"))
+
+    def payload(self, timeframe, since=None):
+        """JSON ответа: всё окно (reset) или только свечи начиная с since (секунды)"""
+        entry = self._entry(timeframe)
+        times = entry["times"]
+        if since is None or not times or since < times[0]:
+            self.stats["full"] += 1
+            return entry["full"]
+
+        memo = entry["memo"]
+        cached = memo.get(since)
+        if cached is not None:
+            self.stats["memo"] += 1
+            return cached
+
+        start = bisect.bisect_left(times, since)
+        rows = entry["rows"][start:]
+        payload = self._encode(timeframe, [r[0] for r in rows], [r[1] for r in rows], times, reset=False)
+        if len(memo) > 16:
+            memo.clear()
+        memo[since] = payload
+        self.stats["delta"] += 1
+        return payload
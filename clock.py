@@ -0,0 +1,57 @@
+"""
+Clocks for the bot and the simulators.
+
+RealClock is the wall clock. VirtualClock only moves when someone sleeps on it, so
+the live strategy code (5s cycles, pauses after exits) runs a simulated day in
+seconds:
+
+    clock = VirtualClock()
+    bot = TradingBot(clock=clock)                 # USE_SIMULATOR=1 or REPLAY_FILE=...
+    end = clock.time() + 24 * 3600
+    bot.strategy_loop(should_continue=lambda: clock.time() < end)
+"""
+import time
+import threading
+from datetime import datetime
+
+
+class RealClock:
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def utcnow(self):
+        return datetime.utcnow()
+
+
+class VirtualClock:
+    """Время двигается только через sleep()/advance(), без реального ожидания"""
+
+    def __init__(self, start=None):
+        self._now = time.time() if start is None else float(start)
+        self._lock = threading.Lock()
+
+    def time(self):
+        return self._now
+
+    def monotonic(self):
+        return self._now
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    def advance(self, seconds):
+        with self._lock:
+            self._now += max(0.0, seconds)
+        return self._now
+
+    def utcnow(self):
+        return datetime.utcfromtimestamp(self._now)
+
+
+REAL_CLOCK = RealClock()
@@ -1,76 +1,169 @@
-import random
-import time
-from datetime import datetime, timedelta
+import threading
+
+import numpy as np
+
+from clock import REAL_CLOCK
+from resample import resample_arrays
+
 
 class MarketSimulator:
     """
-    Симулятор рынка для тестирования торговой стратегии без реальных денег
+    Симулятор рынка для тестирования торговой стратегии без реальных денег.
+
+    Одна постоянная траектория цены (геометрическое броуновское движение, по желанию
+    со скачками и режимами волатильности) генерируется NumPy блоками по block свечей
+    и хранится в кольцевом буфере 1m свечей. Свечи любого таймфрейма, текущая цена и
+    формирующаяся свеча берутся из этой же траектории, поэтому повторные запросы
+    согласованы, а с одинаковым seed траектория воспроизводится.
+
+    volatility - стандартное отклонение лог-доходности за 1m свечу (0.001 - около 4% за сутки),
+    drift - средняя лог-доходность за 1m свечу, ticks_per_candle - шагов цены в минуте.
+    regimes - множители волатильности (например (0.5, 1.0, 3.0)), смена режима
+    с вероятностью regime_switch_prob на каждой свече; jump_prob/jump_std - скачки на шаге.
     """
-    def __init__(self, initial_price=3000, volatility=0.02):
-        self.current_price = initial_price
+    def __init__(self, initial_price=3000, volatility=0.001, seed=None, drift=0.0,
+                 ticks_per_candle=12, jump_prob=0.0, jump_std=0.0, regimes=None,
+                 regime_switch_prob=0.0, base_volume=500.0, history=1500,
+                 capacity=100_000, block=4096, clock=REAL_CLOCK):
+        self.initial_price = initial_price
         self.volatility = volatility
-        self.last_update = datetime.utcnow()
-        self.price_history = []
-        
-    def get_current_price(self):
-        """Возвращает текущую цену с симуляцией изменения"""
+        self.seed = seed
+        self.drift = drift
+        self.ticks_per_candle = ticks_per_candle
+        self.jump_prob = jump_prob
+        self.jump_std = jump_std
+        self.regimes = np.asarray(regimes if regimes else (1.0,), dtype=np.float64)
+        self.regime_switch_prob = regime_switch_prob if regimes else 0.0
+        self.base_volume = base_volume
+        self.capacity = capacity
+        self.block = min(block, capacity)
+        self.clock = clock
+
+        self.rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._open = np.empty(capacity)
+        self._high = np.empty(capacity)
+        self._low = np.empty(capacity)
+        self._close = np.empty(capacity)
+        self._volume = np.empty(capacity)
+        self._generated = 0
+        self._log_price = np.log(initial_price)
+        self._regime = 0
+        self._ticks = None
+        self._ticks_start = 0
+
+        # свеча с индексом i начинается в start_ms + i минут; history минут уже прошло
+        now_ms = int(self.clock.time() * 1000)
+        self.start_ms = now_ms - now_ms % 60_000 - min(history, capacity - 1) * 60_000
+        self.current_price = initial_price
         self.update_price()
-        return self.current_price
-    
+
+    def _generate(self, count):
+        """Следующие count свечей траектории (все шаги сразу, без циклов Python)"""
+        rng = self.rng
+        tpc = self.ticks_per_candle
+        sigma = np.full(count, self.volatility / np.sqrt(tpc))
+        if self.regime_switch_prob:
+            switch = rng.random(count) < self.regime_switch_prob
+            choice = rng.integers(len(self.regimes), size=count)
+            last_switch = np.maximum.accumulate(np.where(switch, np.arange(count), -1))
+            regime = np.where(last_switch >= 0, choice[np.maximum(last_switch, 0)], self._regime)
+            self._regime = int(regime[-1])
+            sigma *= self.regimes[regime]
+
+        steps = rng.standard_normal((count, tpc))
+        steps *= sigma[:, None]
+        steps += self.drift / tpc - 0.5 * sigma[:, None] ** 2
+        if self.jump_prob:
+            jumps = rng.random((count, tpc)) < self.jump_prob
+            steps[jumps] += rng.normal(0.0, self.jump_std, int(jumps.sum()))
+
+        log_path = np.cumsum(steps).reshape(count, tpc)
+        log_path += self._log_price
+        ticks = np.exp(log_path)
+        open_ = np.exp(np.r_[self._log_price, log_path[:-1, -1]])
+        close = ticks[:, -1]
+        move = np.abs(log_path[:, -1] - np.r_[self._log_price, log_path[:-1, -1]])
+        volume = self.base_volume * rng.lognormal(0.0, 0.5, count) * (1 + move / max(self.volatility, 1e-12))
+        self._log_price = log_path[-1, -1]
+
+        slots = (self._generated + np.arange(count)) % self.capacity
+        self._open[slots] = open_
+        self._high[slots] = np.maximum(ticks.max(axis=1), open_)
+        self._low[slots] = np.minimum(ticks.min(axis=1), open_)
+        self._close[slots] = close
+        self._volume[slots] = volume
+        self._ticks = ticks
+        self._ticks_start = self._generated
+        self._generated += count
+
+    def _position(self):
+        """Индекс формирующейся 1m свечи и номер шага внутри неё"""
+        elapsed = int(self.clock.time() * 1000) - self.start_ms
+        index, offset = divmod(max(elapsed, 0), 60_000)
+        while self._generated <= index:
+            self._generate(self.block)
+        return index, offset * self.ticks_per_candle // 60_000
+
+    def _forming(self, index, tick):
+        """open, high, low, close, volume формирующейся свечи на шаге tick"""
+        slot = index % self.capacity
+        row = index - self._ticks_start
+        if row < 0:
+            return (self._open[slot], self._high[slot], self._low[slot],
+                    self._close[slot], self._volume[slot])
+        seen = self._ticks[row, :tick + 1]
+        open_ = self._open[slot]
+        return (open_, max(open_, seen.max()), min(open_, seen.min()), seen[-1],
+                self._volume[slot] * (tick + 1) / self.ticks_per_candle)
+
+    def get_current_price(self):
+        """Возвращает текущую цену (close формирующейся 1m свечи)"""
+        return self.update_price()
+
     def update_price(self):
-        """Обновляет цену с учетом волатильности"""
-        now = datetime.utcnow()
-        time_diff = (now - self.last_update).total_seconds()
-        
-        if time_diff > 1:
-            change_percent = random.gauss(0, self.volatility)
-            self.current_price *= (1 + change_percent)
-            
-            self.current_price = max(1000, min(10000, self.current_price))
-            
-            self.last_update = now
-            self.price_history.append({
-                'timestamp': now.timestamp() * 1000,
-                'price': self.current_price
-            })
-            
-            if len(self.price_history) > 1000:
-                self.price_history.pop(0)
-    
+        """Догенерировать траекторию до текущего момента"""
+        with self._lock:
+            index, tick = self._position()
+            self.current_price = float(self._forming(index, tick)[3])
+        return self.current_price
+
+    def ohlcv_arrays(self, timeframe, limit=200):
+        """
+        Последние limit свечей таймфрейма (последняя - формирующаяся) как кортеж
+        NumPy массивов (timestamp, open, high, low, close, volume).
+        """
+        minutes = self._timeframe_to_minutes(timeframe)
+        with self._lock:
+            index, tick = self._position()
+            oldest = max(0, self._generated - self.capacity)
+            first = max(oldest, index - (limit + 1) * minutes + 1)
+
+            slots = np.arange(first, index + 1) % self.capacity
+            timestamps = self.start_ms + np.arange(first, index + 1, dtype=np.int64) * 60_000
+            opens = self._open[slots]
+            highs = self._high[slots]
+            lows = self._low[slots]
+            closes = self._close[slots]
+            volumes = self._volume[slots]
+            opens[-1], highs[-1], lows[-1], closes[-1], volumes[-1] = self._forming(index, tick)
+            self.current_price = float(closes[-1])
+
+        candles = resample_arrays(timestamps, opens, highs, lows, closes, volumes, minutes)
+        return tuple(column[-limit:] for column in candles)
+
     def fetch_ohlcv(self, timeframe, limit=200):
         """
-        Генерирует OHLCV данные для заданного таймфрейма
+        Свечи таймфрейма из траектории симулятора
         Возвращает список [timestamp, open, high, low, close, volume]
         """
-        tf_minutes = self._timeframe_to_minutes(timeframe)
-        
-        ohlcv = []
-        current_time = datetime.utcnow()
-        
-        for i in range(limit):
-            candle_time = current_time - timedelta(minutes=tf_minutes * (limit - i))
-            timestamp = int(candle_time.timestamp() * 1000)
-            
-            base_price = self.current_price * (1 + random.gauss(0, self.volatility * (limit - i) / limit))
-            
-            open_price = base_price
-            high_price = open_price * (1 + abs(random.gauss(0, self.volatility / 2)))
-            low_price = open_price * (1 - abs(random.gauss(0, self.volatility / 2)))
-            close_price = open_price + random.gauss(0, (high_price - low_price) / 2)
-            close_price = max(low_price, min(high_price, close_price))
-            
-            volume = random.uniform(100, 1000)
-            
-            ohlcv.append([timestamp, open_price, high_price, low_price, close_price, volume])
-        
-        if ohlcv:
-            ohlcv[-1][1] = self.current_price * 0.998
-            ohlcv[-1][2] = self.current_price * 1.001
-            ohlcv[-1][3] = self.current_price * 0.997
-            ohlcv[-1][4] = self.current_price
-        
-        return ohlcv
-    
+        timestamps, opens, highs, lows, closes, volumes = self.ohlcv_arrays(timeframe, limit)
+        return [
+            [ts, o, h, l, c, v]
+            for ts, o, h, l, c, v in zip(timestamps.tolist(), opens.tolist(), highs.tolist(),
+                                         lows.tolist(), closes.tolist(), volumes.tolist())
+        ]
+
     def _timeframe_to_minutes(self, timeframe):
         """Конвертирует строку таймфрейма в минуты"""
         if timeframe.endswith('m'):
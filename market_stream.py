@@ -0,0 +1,185 @@
+import json
+import time
+import queue
+import logging
+import threading
+import itertools
+from collections import namedtuple
+
+import requests
+
+KUCOIN_BULLET_URL = "https://api.kucoin.com/api/v1/bullet-public"
+KLINE_TYPES = {"1m": "1min", "3m": "3min", "5m": "5min", "15m": "15min", "30m": "30min", "1h": "1hour"}
+
+MarketEvent = namedtuple("MarketEvent", ["kind", "symbol", "timeframe", "data", "received_at"])
+
+
+def to_exchange_symbol(symbol):
+    """'ETH/USDT' -> 'ETH-USDT'"""
+    return symbol.replace("/", "-")
+
+
+def from_exchange_symbol(symbol):
+    """'ETH-USDT' -> 'ETH/USDT'"""
+    return symbol.replace("-", "/")
+
+
+def kucoin_public_ws_url():
+    """Получить адрес публичного WebSocket KuCoin (токен bullet-public)"""
+    response = requests.post(KUCOIN_BULLET_URL, timeout=10)
+    response.raise_for_status()
+    data = response.json()["data"]
+    server = data["instanceServers"][0]
+    return f"{server['endpoint']}?token={data['token']}&connectId={int(time.time() * 1000)}"
+
+
+class MarketDataStream:
+    """
+    Поток рыночных данных по WebSocket (протокол KuCoin): тикер и свечи выбранного
+    таймфрейма. Сообщения превращаются в MarketEvent и складываются в очередь,
+    из которой их забирает стратегия (wait_events).
+
+    При обрыве соединения - переподключение с экспоненциальной задержкой; после
+    каждого (пере)подключения вызывается on_connect(), чтобы дозагрузить пропущенные
+    свечи по REST.
+    """
+
+    def __init__(self, symbols, timeframe="1m", url=None, on_connect=None,
+                 ping_interval=18, reconnect_delay=1.0, max_reconnect_delay=30.0):
+        self.symbols = list(symbols)
+        self.timeframe = timeframe
+        self.url = url
+        self.on_connect = on_connect
+        self.ping_interval = ping_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self.events = queue.Queue()
+        self.connected = threading.Event()
+        self.reconnects = 0
+        self.last_message_at = None
+
+        self._ids = itertools.count(1)
+        self._stop = threading.Event()
+        self._thread = None
+        self._ws = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="market-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def wait_events(self, timeout):
+        """Ждёт хотя бы одно событие до timeout секунд и возвращает все накопленные"""
+        try:
+            events = [self.events.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def _run(self):
+        from websockets.sync.client import connect  # нужен только с потоком, не при старте
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            try:
+                url = self.url or kucoin_public_ws_url()
+                with connect(url, open_timeout=10, close_timeout=2) as ws:
+                    self._ws = ws
+                    self._handshake(ws)
+                    self.connected.set()
+                    delay = self.reconnect_delay
+                    logging.info(f"Market stream connected: {', '.join(self.symbols)}")
+                    if self.on_connect:
+                        self.on_connect()
+                    self._listen(ws)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                logging.error(f"Market stream error: {e}")
+            finally:
+                self._ws = None
+                self.connected.clear()
+
+            if self._stop.wait(delay):
+                break
+            self.reconnects += 1
+            delay = min(delay * 2, self.max_reconnect_delay)
+            logging.warning(f"Market stream reconnecting (attempt {self.reconnects})")
+
+    def _handshake(self, ws):
+        welcome = json.loads(ws.recv(timeout=10))
+        if welcome.get("type") != "welcome":
+            raise ConnectionError(f"Unexpected greeting: {welcome}")
+
+        markets = ",".join(to_exchange_symbol(s) for s in self.symbols)
+        kline_type = KLINE_TYPES[self.timeframe]
+        klines = ",".join(f"{to_exchange_symbol(s)}_{kline_type}" for s in self.symbols)
+        for topic in (f"/market/ticker:{markets}", f"/market/candles:{klines}"):
+            ws.send(json.dumps({
+                "id": next(self._ids),
+                "type": "subscribe",
+                "topic": topic,
+                "privateChannel": False,
+                "response": True
+            }))
+
+    def _listen(self, ws):
+        last_ping = time.monotonic()
+        while not self._stop.is_set():
+            timeout = max(0.0, self.ping_interval - (time.monotonic() - last_ping))
+            try:
+                raw = ws.recv(timeout=timeout)
+            except TimeoutError:
+                ws.send(json.dumps({"id": next(self._ids), "type": "ping"}))
+                last_ping = time.monotonic()
+                continue
+
+            self.last_message_at = time.time()
+            message = json.loads(raw)
+            if message.get("type") == "ping":
+                ws.send(json.dumps({"id": message.get("id"), "type": "pong"}))
+            elif message.get("type") == "error":
+                raise ConnectionError(f"Stream error message: {message}")
+            elif message.get("type") == "message":
+                event = self._parse(message)
+                if event:
+                    self.events.put(event)
+
+    def _parse(self, message):
+        topic = message.get("topic", "")
+        data = message.get("data", {})
+        received_at = time.time()
+
+        if topic.startswith("/market/ticker:"):
+            symbol = from_exchange_symbol(topic.split(":", 1)[1])
+            return MarketEvent("ticker", symbol, None, {
+                "last": float(data["price"]),
+                "bid": float(data["bestBid"]) if data.get("bestBid") else None,
+                "ask": float(data["bestAsk"]) if data.get("bestAsk") else None,
+                "timestamp": data.get("time")
+            }, received_at)
+
+        if topic.startswith("/market/candles:"):
+            # candles: [start(s), open, close, high, low, volume, turnover]
+            c = data["candles"]
+            candle = [int(c[0]) * 1000, float(c[1]), float(c[3]), float(c[4]), float(c[2]), float(c[5])]
+            return MarketEvent("kline", from_exchange_symbol(data["symbol"]), self.timeframe, candle, received_at)
+
+        return None
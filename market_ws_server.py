@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the KuCoin public WebSocket, fed by MarketSimulator.
+
+Speaks the subset of the protocol used by MarketDataStream (welcome, subscribe/ack,
+ping/pong, ticker and candle messages) and, on the same port, a minimal REST API for
+candles and tickers from the same simulator. With STANDIN_EXCHANGE=1 the bot uses that
+REST API as its exchange, so the stream, the REST backfill and the reconnect path all
+run without an exchange and see one price series:
+
+    python market_ws_server.py --port 8765
+    USE_WS_FEED=1 STANDIN_EXCHANGE=1 MARKET_WS_URL=ws://localhost:8765 python app.py
+"""
+import json
+import time
+import logging
+import argparse
+from urllib.parse import urlsplit, parse_qs
+
+import requests
+
+from market_simulator import MarketSimulator
+from candle_store import timeframe_to_seconds
+
+
+class StandInSession:
+    """Одно подключение: подписки клиента"""
+
+    def __init__(self, simulator, interval, disconnect_after=None):
+        self.simulator = simulator
+        self.interval = interval
+        self.disconnect_after = disconnect_after
+        self.tickers = []
+        self.klines = []
+
+    def handle(self, ws):
+        started = time.monotonic()
+        ws.send(json.dumps({"id": str(int(time.time() * 1000)), "type": "welcome"}))
+        while True:
+            if self.disconnect_after and time.monotonic() - started > self.disconnect_after:
+                logging.info("Dropping client connection (--disconnect-after)")
+                return
+            try:
+                raw = ws.recv(timeout=self.interval)
+            except TimeoutError:
+                self.push(ws)
+                continue
+            self.on_message(ws, json.loads(raw))
+
+    def on_message(self, ws, message):
+        kind = message.get("type")
+        if kind == "ping":
+            ws.send(json.dumps({"id": message.get("id"), "type": "pong"}))
+        elif kind == "subscribe":
+            prefix, targets = message["topic"].split(":", 1)
+            targets = targets.split(",")
+            if prefix == "/market/ticker":
+                self.tickers.extend(targets)
+            elif prefix == "/market/candles":
+                self.klines.extend(targets)
+            if message.get("response"):
+                ws.send(json.dumps({"id": message.get("id"), "type": "ack"}))
+
+    def push(self, ws):
+        # формирующаяся 1m свеча и цена - из той же траектории, что и REST симулятора
+        start_ms, open_, high, low, close, volume = self.simulator.fetch_ohlcv("1m", limit=1)[-1]
+        price = close
+        now = time.time()
+
+        for market in self.tickers:
+            ws.send(json.dumps({
+                "type": "message",
+                "topic": f"/market/ticker:{market}",
+                "subject": "trade.ticker",
+                "data": {
+                    "price": str(price),
+                    "bestBid": str(price * 0.9999),
+                    "bestAsk": str(price * 1.0001),
+                    "time": int(now * 1000)
+                }
+            }))
+
+        for topic in self.klines:
+            market = topic.rsplit("_", 1)[0]
+            ws.send(json.dumps({
+                "type": "message",
+                "topic": f"/market/candles:{topic}",
+                "subject": "trade.candles.update",
+                "data": {
+                    "symbol": market,
+                    "candles": [str(start_ms // 1000), str(open_), str(close), str(high), str(low), str(volume), "0"],
+                    "time": int(now * 1e9)
+                }
+            }))
+
+
+def rest_response(simulator, connection, request):
+    """
+    process_request сервера: GET /api/ohlcv и /api/ticker отвечают JSON из симулятора,
+    остальные запросы идут на WebSocket рукопожатие
+    """
+    url = urlsplit(request.path)
+    if not url.path.startswith("/api/"):
+        return None
+    query = {key: values[0] for key, values in parse_qs(url.query).items()}
+    if url.path == "/api/ohlcv":
+        timeframe = query.get("timeframe", "1m")
+        limit = int(query.get("limit") or 500)
+        since = int(query["since"]) if query.get("since") else None
+        if since is None:
+            body = simulator.fetch_ohlcv(timeframe, limit=limit)
+        else:
+            tf_ms = timeframe_to_seconds(timeframe) * 1000
+            missing = (int(time.time() * 1000) - since) // tf_ms + 1
+            body = [row for row in simulator.fetch_ohlcv(timeframe, limit=max(missing, 1)) if row[0] >= since][:limit]
+    elif url.path == "/api/ticker":
+        price = simulator.get_current_price()
+        body = {"last": price, "bid": price * 0.9999, "ask": price * 1.0001, "timestamp": int(time.time() * 1000)}
+    else:
+        return connection.respond(404, "not found\n")
+    response = connection.respond(200, json.dumps(body))
+    response.headers["Content-Type"] = "application/json"
+    return response
+
+
+class StandInExchange:
+    """
+    Клиент REST API stand-in сервера с методами ccxt, которые нужны боту
+    (fetch_ohlcv, fetch_ticker, fetch_tickers). Все символы получают одну траекторию.
+    """
+
+    def __init__(self, url):
+        # ws://host:port -> http://host:port
+        self.base_url = "http" + url[2:].split("?", 1)[0].rstrip("/") if url.startswith("ws") else url.rstrip("/")
+        self.session = requests.Session()
+
+    def _get(self, path, **params):
+        response = self.session.get(f"{self.base_url}{path}", params=params, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_ohlcv(self, symbol, timeframe="1m", since=None, limit=None):
+        return self._get("/api/ohlcv", symbol=symbol, timeframe=timeframe, since=since, limit=limit)
+
+    def fetch_ticker(self, symbol):
+        ticker = self._get("/api/ticker", symbol=symbol)
+        ticker["symbol"] = symbol
+        return ticker
+
+    def fetch_tickers(self, symbols):
+        ticker = self._get("/api/ticker")
+        return {symbol: dict(ticker, symbol=symbol) for symbol in symbols}
+
+
+def main():
+    from websockets.sync.server import serve
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Local KuCoin WebSocket stand-in")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between pushes")
+    parser.add_argument("--price", type=float, default=3000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--disconnect-after", type=float, default=None,
+                        help="drop each connection after N seconds to exercise reconnects")
+    args = parser.parse_args()
+
+    simulator = MarketSimulator(initial_price=args.price, seed=args.seed)
+
+    def handler(ws):
+        StandInSession(simulator, args.interval, args.disconnect_after).handle(ws)
+
+    def process_request(connection, request):
+        return rest_response(simulator, connection, request)
+
+    with serve(handler, args.host, args.port, process_request=process_request) as server:
+        logging.info(f"Stand-in market stream on ws://{args.host}:{args.port}")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
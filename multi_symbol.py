@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Several instruments in one process.
+
+All symbols share one exchange client (one connection pool and rate limiter), one
+CandleStore, one SignalSender and, with USE_WS_FEED, one WebSocket subscription.
+A single scheduler runs the strategy cycle for every symbol: one bulk
+fetch_tickers per cycle instead of a ticker request per symbol, then the per-symbol
+SAR checks. Each symbol keeps its own state file and journal rows.
+
+    SYMBOLS=ETH/USDT,BTC/USDT,SOL/USDT python multi_symbol.py
+"""
+import os
+import time
+import logging
+
+from startup import STARTUP
+import trading_bot
+from trading_bot import TradingBot, SYMBOL, OHLCV_CACHE_CAPACITY, OHLCV_CACHE_MAX_AGE, create_exchange
+from candle_store import CandleStore
+from market_stream import MarketDataStream
+from market_simulator import MarketSimulator
+from signal_sender import SignalSender
+from clock import RealClock, VirtualClock
+
+STARTUP.mark("imports")
+
+SYMBOLS = [s.strip() for s in os.getenv("SYMBOLS", SYMBOL).split(",") if s.strip()]
+CYCLE_INTERVAL = 5
+
+
+class MultiSymbolEngine:
+    def __init__(self, symbols=SYMBOLS, telegram_notifier=None, clock=None):
+        self.symbols = list(dict.fromkeys(symbols))
+        if clock is None:
+            clock = VirtualClock() if trading_bot.VIRTUAL_CLOCK and trading_bot.USE_SIMULATOR else RealClock()
+        self.clock = clock
+        self.exchange = None if trading_bot.USE_SIMULATOR else create_exchange()
+        self.candle_store = CandleStore(
+            self._fetch_exchange_ohlcv,
+            capacity=OHLCV_CACHE_CAPACITY,
+            max_age=OHLCV_CACHE_MAX_AGE
+        )
+        self.signal_sender = SignalSender()
+        self.bots = {}
+        for number, symbol in enumerate(self.symbols):
+            simulator = None
+            if trading_bot.USE_SIMULATOR:
+                seed = None if trading_bot.SIMULATOR_SEED is None else trading_bot.SIMULATOR_SEED + number
+                simulator = MarketSimulator(initial_price=3000, volatility=trading_bot.SIMULATOR_VOLATILITY, seed=seed, clock=clock)
+            self.bots[symbol] = TradingBot(
+                telegram_notifier,
+                symbol=symbol,
+                exchange=self.exchange,
+                candle_store=self.candle_store,
+                signal_sender=self.signal_sender,
+                simulator=simulator,
+                market_stream=False,
+                clock=clock
+            )
+
+        self.market_stream = None
+        if trading_bot.USE_WS_FEED and not (trading_bot.USE_SIMULATOR or trading_bot.REPLAY_FILE):
+            self.market_stream = MarketDataStream(
+                self.symbols,
+                timeframe="1m",
+                url=trading_bot.MARKET_WS_URL or None,
+                on_connect=lambda: self.candle_store.mark_stale()
+            )
+        self.stats = {"cycles": 0, "ticker_batches": 0, "errors": 0, "last_cycle_ms": None}
+        logging.info(f"Multi-symbol engine: {', '.join(self.symbols)}")
+
+    def _fetch_exchange_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        return self.exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
+
+    def refresh_prices(self):
+        """Один запрос тикеров на все инструменты вместо fetch_ticker на каждый"""
+        if self.exchange is None or self.market_stream is not None:
+            return
+        try:
+            tickers = self.exchange.fetch_tickers(self.symbols)
+        except Exception as e:
+            logging.error(f"Bulk ticker fetch failed: {e}")
+            return
+        self.stats["ticker_batches"] += 1
+        now = self.clock.time()
+        for symbol, ticker in tickers.items():
+            bot = self.bots.get(symbol)
+            if bot is not None and ticker.get("last") is not None:
+                bot.price_service.update(ticker["last"], now)
+
+    def apply_market_events(self, events):
+        """Раздать события общего потока ботам по символу"""
+        for event in events:
+            bot = self.bots.get(event.symbol)
+            if bot is not None:
+                bot.apply_market_events([event])
+
+    def run_cycle(self):
+        started = time.perf_counter()
+        self.refresh_prices()
+        for symbol, bot in self.bots.items():
+            try:
+                bot.run_strategy_cycle()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logging.error(f"{symbol} strategy cycle error: {e}", exc_info=True)
+        self.stats["cycles"] += 1
+        self.stats["last_cycle_ms"] = (time.perf_counter() - started) * 1000
+
+    def run(self, should_continue=None):
+        STARTUP.mark("loop_start")
+        logging.info("Starting multi-symbol strategy loop - 1m + 5m alignment mode")
+        for bot in self.bots.values():
+            bot.last_1m_direction = None
+        if self.market_stream:
+            self.market_stream.start()
+        last_cycle = 0
+
+        try:
+            while not should_continue or should_continue():
+                if self.clock.time() - last_cycle >= (0 if self.market_stream else CYCLE_INTERVAL):
+                    last_cycle = self.clock.time()
+                    self.run_cycle()
+                    if self.stats["cycles"] == 1:
+                        STARTUP.mark("first_decision")
+                if self.market_stream:
+                    self.apply_market_events(self.market_stream.wait_events(CYCLE_INTERVAL))
+                else:
+                    self.clock.sleep(max(0, CYCLE_INTERVAL - (self.clock.time() - last_cycle)))
+        finally:
+            if self.market_stream:
+                self.market_stream.stop()
+            logging.info("Multi-symbol strategy loop stopped")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    notifier = None
+    if os.getenv("TELEGRAM_BOT_TOKEN"):
+        from telegram_notifications import TelegramNotifier
+        notifier = TelegramNotifier(os.getenv("TELEGRAM_BOT_TOKEN"), os.getenv("TELEGRAM_CHAT_ID", ""))
+    MultiSymbolEngine(SYMBOLS, notifier).run()
+
+
+if __name__ == "__main__":
+    main()
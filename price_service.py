@@ -0,0 +1,96 @@
+import time
+import logging
+import threading
+from collections import namedtuple
+
+from clock import REAL_CLOCK
+
+
+class PriceUnavailable(Exception):
+    """Нет ни свежей, ни сохранённой котировки"""
+
+
+class Quote(namedtuple("Quote", ["price", "timestamp"])):
+    @property
+    def age(self):
+        return time.time() - self.timestamp
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.quote = None
+        self.error = None
+
+
+class PriceService:
+    """
+    Текущая цена одного инструмента с ограничением по возрасту.
+
+    Котировка не старше max_age отдаётся из памяти. Если нужна новая, запрос к бирже
+    делает только первый поток, остальные ждут его результат (single-flight).
+    При ошибке запроса возвращается последняя удачная котировка (её возраст виден
+    в Quote.age); PriceUnavailable - только если котировок ещё не было.
+    """
+
+    def __init__(self, fetch_price, max_age=1.0, wait_timeout=15.0, clock=REAL_CLOCK):
+        self._fetch = fetch_price
+        self.clock = clock
+        self.max_age = max_age
+        self.wait_timeout = wait_timeout
+        self.last_quote = None
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._flight = None
+        self.stats = {"fetches": 0, "cached": 0, "coalesced": 0, "errors": 0, "stale": 0}
+
+    def update(self, price, timestamp=None):
+        """Записать котировку из внешнего источника (например, тикер WebSocket)"""
+        quote = Quote(float(price), timestamp or self.clock.time())
+        current = self.last_quote
+        if current is None or quote.timestamp >= current.timestamp:
+            self.last_quote = quote
+        return quote
+
+    def get_quote(self, max_age=None):
+        max_age = self.max_age if max_age is None else max_age
+        quote = self.last_quote
+        if quote is not None and self.clock.time() - quote.timestamp <= max_age:
+            self.stats["cached"] += 1
+            return quote
+
+        with self._lock:
+            flight = self._flight
+            leader = flight is None
+            if leader:
+                flight = self._flight = _Flight()
+
+        if leader:
+            try:
+                self.stats["fetches"] += 1
+                flight.quote = self.update(self._fetch())
+            except Exception as e:
+                flight.error = e
+                self.last_error = e
+                self.stats["errors"] += 1
+            finally:
+                with self._lock:
+                    self._flight = None
+                flight.done.set()
+        else:
+            self.stats["coalesced"] += 1
+            flight.done.wait(self.wait_timeout)
+
+        if flight.quote is not None:
+            return flight.quote
+
+        quote = self.last_quote
+        if quote is None:
+            raise PriceUnavailable(f"No price available: {flight.error or 'fetch timed out'}")
+        self.stats["stale"] += 1
+        age = self.clock.time() - quote.timestamp
+        logging.warning(f"Using last good price {quote.price} ({age:.1f}s old): {flight.error}")
+        return quote
+
+    def get_price(self, max_age=None):
+        return self.get_quote(max_age).price
@@ -0,0 +1,178 @@
+import bisect
+from collections import deque
+
+
+class IncrementalPSAR:
+    """
+    Parabolic SAR, который продвигается по одной свече за раз.
+
+    Повторяет алгоритм ta.trend.PSARIndicator (та же инициализация по первой
+    свече, то же ограничение по двум предыдущим low/high), но хранит состояние
+    между вызовами: закрытые свечи фиксируются один раз, а формирующаяся свеча
+    пересчитывается от зафиксированного состояния за O(1).
+    """
+
+    def __init__(self, step=0.05, max_step=0.5):
+        self.step = step
+        self.max_step = max_step
+        self.reset()
+
+    def reset(self):
+        self._count = 0
+        self._up_trend = True
+        self._af = self.step
+        self._up_trend_high = None
+        self._down_trend_low = None
+        self._psar = None
+        self._highs = deque(maxlen=2)
+        self._lows = deque(maxlen=2)
+
+        self.last_timestamp = None
+        self.value = None
+        self.close = None
+        self.up_trend = True
+        self._pending = None
+
+    def __len__(self):
+        return self._count + (1 if self._pending is not None else 0)
+
+    @property
+    def direction(self):
+        """'long' или 'short' для формирующейся свечи (как get_direction_from_psar)"""
+        if self.value is None or self.close is None:
+            return None
+        return "long" if self.close > self.value else "short"
+
+    def _evaluate(self, high, low, close):
+        """Считает PSAR свечи с индексом self._count, не меняя состояние"""
+        i = self._count
+        if i == 0:
+            return close, True, self.step, high, low
+        if i == 1:
+            return close, self._up_trend, self._af, self._up_trend_high, self._down_trend_low
+
+        up_trend = self._up_trend
+        af = self._af
+        up_trend_high = self._up_trend_high
+        down_trend_low = self._down_trend_low
+        prev_psar = self._psar
+        reversal = False
+
+        if up_trend:
+            psar = prev_psar + af * (up_trend_high - prev_psar)
+            if low < psar:
+                reversal = True
+                psar = up_trend_high
+                down_trend_low = low
+                af = self.step
+            else:
+                if high > up_trend_high:
+                    up_trend_high = high
+                    af = min(af + self.step, self.max_step)
+                low2, low1 = self._lows
+                if low2 < psar:
+                    psar = low2
+                elif low1 < psar:
+                    psar = low1
+        else:
+            psar = prev_psar - af * (prev_psar - down_trend_low)
+            if high > psar:
+                reversal = True
+                psar = down_trend_low
+                up_trend_high = high
+                af = self.step
+            else:
+                if low < down_trend_low:
+                    down_trend_low = low
+                    af = min(af + self.step, self.max_step)
+                high2, high1 = self._highs
+                if high2 > psar:
+                    psar = high2
+                elif high1 > psar:
+                    psar = high1
+
+        return psar, up_trend != reversal, af, up_trend_high, down_trend_low
+
+    def _commit(self):
+        high, low, close = self._pending
+        psar, up_trend, af, up_trend_high, down_trend_low = self._evaluate(high, low, close)
+        self._psar = psar
+        self._up_trend = up_trend
+        self._af = af
+        self._up_trend_high = up_trend_high
+        self._down_trend_low = down_trend_low
+        self._highs.append(high)
+        self._lows.append(low)
+        self._count += 1
+        self._pending = None
+
+    def update(self, timestamp, high, low, close):
+        """
+        Подать свечу. Та же метка времени - пересчёт формирующейся свечи,
+        более новая - предыдущая свеча считается закрытой и фиксируется.
+        Возвращает PSAR для переданной свечи.
+        """
+        if self._pending is not None and timestamp != self.last_timestamp:
+            self._commit()
+
+        self._pending = (high, low, close)
+        self.last_timestamp = timestamp
+        psar, up_trend, _, _, _ = self._evaluate(high, low, close)
+        self.value = psar
+        self.close = close
+        self.up_trend = up_trend
+        return psar
+
+    def feed(self, timestamps, highs, lows, closes):
+        """
+        Подать окно свечей (как из fetch_ohlcv). Свечи, уже зафиксированные
+        движком, пропускаются; если окно не пересекается с известной историей,
+        движок заново инициализируется от начала окна.
+        Возвращает PSAR последней свечи окна.
+        """
+        n = len(timestamps)
+        if n == 0:
+            return self.value
+
+        if self.last_timestamp is not None and timestamps[0] > self.last_timestamp:
+            self.reset()
+
+        # уже зафиксированные свечи пропускаются поиском, а не перебором окна
+        start = 0 if self.last_timestamp is None else bisect.bisect_left(timestamps, self.last_timestamp)
+        timestamps, highs, lows, closes = (
+            _tolist(column[start:]) for column in (timestamps, highs, lows, closes)
+        )
+        for i in range(len(timestamps)):
+            self.update(timestamps[i], highs[i], lows[i], closes[i])
+        return self.value
+
+
+def _tolist(column):
+    """Значения NumPy массива - в числа Python (арифметика над ними в разы быстрее)"""
+    return column.tolist() if hasattr(column, "tolist") else column
+
+
+def psar_series(highs, lows, closes, step=0.05, max_step=0.5, with_state=False):
+    """
+    Полный ряд PSAR (то же, что PSARIndicator(...).psar()) в виде списка.
+    С with_state=True - кортеж списков (psar, up_trend, af, up_trend_high, down_trend_low):
+    состояние движка после каждой свечи (для PSAR формирующихся свечей в backtest.py).
+    """
+    highs, lows, closes = _tolist(highs), _tolist(lows), _tolist(closes)
+    engine = IncrementalPSAR(step=step, max_step=max_step)
+    result = []
+    if not with_state:
+        for i in range(len(closes)):
+            result.append(engine.update(i, highs[i], lows[i], closes[i]))
+        return result
+
+    up_trend, af, up_trend_high, down_trend_low = [], [], [], []
+    for i in range(len(closes)):
+        result.append(engine.update(i, highs[i], lows[i], closes[i]))
+        # свеча сразу считается закрытой: следующий update её не перефиксирует
+        engine._commit()
+        up_trend.append(engine._up_trend)
+        af.append(engine._af)
+        up_trend_high.append(engine._up_trend_high)
+        down_trend_low.append(engine._down_trend_low)
+    return result, up_trend, af, up_trend_high, down_trend_low
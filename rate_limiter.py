@@ -0,0 +1,184 @@
+"""
+Общий планировщик запросов к бирже: token bucket по лимитам KuCoin и строгие приоритеты.
+
+Вызовы одного пула лимитов (public, private) выстраиваются в очередь по приоритету:
+ORDER (ордера, отмены, плечо) -> TICKER -> OHLCV -> ANALYTICS. Запрос с более низким
+приоритетом не забирает токены, пока в том же пуле ждёт более важный, а чтения не
+могут опустошить пул ниже резерва - ордеру всегда хватает токенов сразу.
+ccxt с enableRateLimit=True ограничивает по порядку прихода, поэтому в create_exchange
+он выключен и все вызовы идут через ScheduledExchange.
+"""
+import time
+import heapq
+import itertools
+import threading
+
+import metrics
+
+ORDER, TICKER, OHLCV, ANALYTICS = 0, 1, 2, 3
+PRIORITY_NAMES = {ORDER: "order", TICKER: "ticker", OHLCV: "ohlcv", ANALYTICS: "analytics"}
+
+# рынок, на котором торгует бот (options.defaultType клиента ccxt в create_exchange)
+KUCOIN_DEFAULT_TYPE = "swap"
+FUTURES_TYPES = ("swap", "future")
+
+# пулы KuCoin (VIP0): public - 2000 единиц веса за 30 с на IP; private - spot 4000 за 30 с,
+# futures 2000 за 30 с
+KUCOIN_SPOT_POOLS = {
+    "public": {"capacity": 2000, "period": 30.0, "reserve": 0.0},
+    "private": {"capacity": 4000, "period": 30.0, "reserve": 40.0},
+}
+KUCOIN_FUTURES_POOLS = {
+    "public": {"capacity": 2000, "period": 30.0, "reserve": 0.0},
+    "private": {"capacity": 2000, "period": 30.0, "reserve": 40.0},
+}
+
+
+def kucoin_pools(default_type):
+    """Пулы лимитов для рынка клиента: futures (swap) или spot"""
+    return KUCOIN_FUTURES_POOLS if default_type in FUTURES_TYPES else KUCOIN_SPOT_POOLS
+
+
+KUCOIN_POOLS = kucoin_pools(KUCOIN_DEFAULT_TYPE)
+
+# метод ccxt -> (пул, вес KuCoin, приоритет по умолчанию)
+KUCOIN_METHODS = {
+    "create_order": ("private", 2, ORDER),
+    "create_market_buy_order": ("private", 2, ORDER),
+    "create_market_sell_order": ("private", 2, ORDER),
+    "cancel_order": ("private", 3, ORDER),
+    "cancel_all_orders": ("private", 20, ORDER),
+    "set_leverage": ("private", 3, ORDER),
+    "set_margin_mode": ("private", 3, ORDER),
+    "fetch_balance": ("private", 3, TICKER),
+    "fetch_positions": ("private", 3, TICKER),
+    "fetch_open_orders": ("private", 2, TICKER),
+    "fetch_ticker": ("public", 2, TICKER),
+    "fetch_tickers": ("public", 15, TICKER),
+    "fetch_order_book": ("public", 2, TICKER),
+    "fetch_ohlcv": ("public", 3, OHLCV),
+    "fetch_trades": ("public", 3, OHLCV),
+    "load_markets": ("public", 3, ANALYTICS),
+}
+DEFAULT_METHOD = ("public", 3, ANALYTICS)
+ORDER_METHOD = ("private", 2, ORDER)
+
+EXCHANGE_WAIT = metrics.histogram(
+    "tradingbot_exchange_wait_seconds", "Time exchange calls wait for a rate-limit token", ["priority"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 15.0, 30.0)
+)
+EXCHANGE_REQUESTS = metrics.counter("tradingbot_exchange_requests_total", "Exchange calls by method", ["method"])
+EXCHANGE_QUEUE = metrics.gauge("tradingbot_exchange_queue_depth", "Exchange calls waiting for a token", ["priority"])
+
+
+class TokenBucket:
+    """capacity единиц веса, пополняется равномерно за period секунд"""
+
+    def __init__(self, name, capacity, period, reserve=0.0):
+        self.name = name
+        self.capacity = float(capacity)
+        self.rate = capacity / period
+        self.reserve = reserve
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.waiting = []  # куча (priority, seq)
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class RequestScheduler:
+    def __init__(self, pools=KUCOIN_POOLS, methods=KUCOIN_METHODS):
+        self.buckets = {name: TokenBucket(name, **config) for name, config in pools.items()}
+        self.methods = methods
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self.depth = {priority: 0 for priority in PRIORITY_NAMES}
+        self.stats = {"calls": 0, "waited": 0}
+        for priority, name in PRIORITY_NAMES.items():
+            EXCHANGE_QUEUE.labels(priority=name).set_function(lambda p=priority: self.depth[p])
+
+    def acquire(self, pool, weight, priority):
+        """Дождаться своей очереди и токенов; возвращает время ожидания в секундах"""
+        bucket = self.buckets[pool]
+        ticket = (priority, next(self._seq))
+        started = time.monotonic()
+        with self._cond:
+            heapq.heappush(bucket.waiting, ticket)
+            self.depth[priority] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    bucket.refill(now)
+                    timeout = None
+                    if bucket.waiting[0] == ticket:
+                        available = bucket.tokens - (0.0 if priority == ORDER else bucket.reserve)
+                        if available >= weight:
+                            bucket.tokens -= weight
+                            break
+                        timeout = (weight - available) / bucket.rate
+                    self._cond.wait(timeout)
+            finally:
+                bucket.waiting.remove(ticket)
+                heapq.heapify(bucket.waiting)
+                self.depth[priority] -= 1
+                self._cond.notify_all()
+        waited = time.monotonic() - started
+        self.stats["calls"] += 1
+        if waited > 0.001:
+            self.stats["waited"] += 1
+        EXCHANGE_WAIT.labels(priority=PRIORITY_NAMES[priority]).observe(waited)
+        return waited
+
+    def call(self, method, func, *args, priority=None, **kwargs):
+        """Вызвать func(*args) после acquire; priority понижает чтения, но не ордера"""
+        pool, weight, default_priority = self.methods.get(
+            method, ORDER_METHOD if method.startswith(("create_", "cancel_")) else DEFAULT_METHOD
+        )
+        if priority is None or default_priority == ORDER:
+            priority = default_priority
+        self.acquire(pool, weight, priority)
+        EXCHANGE_REQUESTS.labels(method=method).inc()
+        return func(*args, **kwargs)
+
+    def snapshot(self):
+        with self._cond:
+            now = time.monotonic()
+            for bucket in self.buckets.values():
+                bucket.refill(now)
+            return {
+                "pools": {name: round(b.tokens, 1) for name, b in self.buckets.items()},
+                "queue": {PRIORITY_NAMES[p]: depth for p, depth in self.depth.items()},
+                **self.stats
+            }
+
+
+SCHEDULER = RequestScheduler()
+
+
+class ScheduledExchange:
+    """
+    Обёртка клиента ccxt: методы-запросы проходят через планировщик, остальное
+    (markets, options, ...) отдаётся как есть. for_priority(ANALYTICS) - тот же
+    клиент для фоновых задач: его чтения уступают торговым.
+    """
+
+    def __init__(self, exchange, scheduler=SCHEDULER, priority=None):
+        self._exchange = exchange
+        self._scheduler = scheduler
+        self._priority = priority
+
+    def for_priority(self, priority):
+        return ScheduledExchange(self._exchange, self._scheduler, priority)
+
+    def __getattr__(self, name):
+        attr = getattr(self._exchange, name)
+        if not callable(attr) or not (name in self._scheduler.methods or name.startswith(("fetch_", "create_", "cancel_"))):
+            return attr
+        scheduler = self._scheduler
+        priority = self._priority
+
+        def scheduled(*args, **kwargs):
+            return scheduler.call(name, attr, *args, priority=priority, **kwargs)
+        return scheduled
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Replay of recorded market data through the simulator interface
+(fetch_ohlcv(timeframe, limit), get_current_price()), so TradingBot runs its normal
+code path on a recorded day.
+
+Input: 1m candles (timestamp, open, high, low, close, volume) or trades
+(timestamp, price, amount) as CSV or Parquet, timestamp in ms.
+
+speed=N plays N seconds of data per second of the clock (see clock.py); speed=0 ("max") plays as
+fast as possible: the strategy loop calls advance() after each cycle and every cycle
+sees the next closed 1m candle.
+
+    python replay_feed.py eth_2024-03-05.csv --speed max
+    python replay_feed.py eth_trades_2024-03-05.parquet --speed 60
+"""
+import logging
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from clock import REAL_CLOCK
+from resample import resample_arrays
+
+CANDLE_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+TRADE_COLUMNS = ["timestamp", "price", "amount"]
+
+
+def _to_ms(column):
+    import pandas as pd
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return column.astype("datetime64[ms]").astype(np.int64).to_numpy()
+    return column.to_numpy(dtype=np.float64).astype(np.int64)
+
+
+def load_market_data(path):
+    """
+    CSV или Parquet со свечами 1m или сделками.
+    Возвращает (candles, trades): словари NumPy массивов, trades - None для свечей.
+    pandas загружается только здесь - для чтения файла.
+    """
+    import pandas as pd
+    if str(path).endswith((".parquet", ".pq")):
+        frame = pd.read_parquet(path)
+    else:
+        with open(path) as f:
+            first = f.readline()
+        try:
+            float(first.split(",")[0])
+            has_header = False
+        except ValueError:
+            has_header = True
+        frame = pd.read_csv(path, header=0 if has_header else None)
+        if not has_header:
+            columns = CANDLE_COLUMNS if frame.shape[1] >= 6 else TRADE_COLUMNS
+            frame = frame.iloc[:, :len(columns)]
+            frame.columns = columns
+
+    frame.columns = [str(c).lower() for c in frame.columns]
+    if "size" in frame.columns and "amount" not in frame.columns:
+        frame = frame.rename(columns={"size": "amount"})
+    frame = frame.sort_values("timestamp", kind="stable")
+
+    if "price" in frame.columns and "close" not in frame.columns:
+        trades = {
+            "timestamp": _to_ms(frame["timestamp"]),
+            "price": frame["price"].to_numpy(dtype=np.float64),
+            "amount": frame["amount"].to_numpy(dtype=np.float64) if "amount" in frame.columns
+            else np.zeros(len(frame))
+        }
+        return trades_to_candles(trades), trades
+
+    candles = {name: frame[name].to_numpy(dtype=np.float64) for name in CANDLE_COLUMNS[1:]}
+    candles["timestamp"] = _to_ms(frame["timestamp"])
+    return candles, None
+
+
+def trades_to_candles(trades):
+    """1m свечи из сделок (минуты без сделок пропускаются, как у биржи)"""
+    ts = trades["timestamp"]
+    price = trades["price"]
+    if len(ts) == 0:
+        return {name: np.empty(0) for name in CANDLE_COLUMNS}
+    minute = ts - ts % 60_000
+    first = np.flatnonzero(np.r_[True, minute[1:] != minute[:-1]])
+    last = np.r_[first[1:], len(ts)] - 1
+    return {
+        "timestamp": minute[first],
+        "open": price[first],
+        "high": np.maximum.reduceat(price, first),
+        "low": np.minimum.reduceat(price, first),
+        "close": price[last],
+        "volume": np.add.reduceat(trades["amount"], first)
+    }
+
+
+class ReplayFeed:
+    """
+    Проигрывание записанных 1m свечей (или сделок) с ускорением.
+
+    Формирующаяся свеча: по сделкам - точно из сделок до текущего момента,
+    по свечам - путь open -> low -> high -> close (или open -> high -> low -> close
+    для падающей свечи) с линейной интерполяцией внутри минуты.
+    """
+
+    def __init__(self, path, speed=1.0, start=None, warmup=200, step=1, clock=REAL_CLOCK):
+        self.path = path
+        self.speed = speed
+        self.step = step
+        self.clock = clock
+        self.candles, self.trades = load_market_data(path)
+        self._ts = self.candles["timestamp"]
+        if len(self._ts) == 0:
+            raise ValueError(f"No market data in {path}")
+
+        # воспроизведение начинается после warmup свечей истории (или с момента start, мс)
+        if start is None:
+            start = int(self._ts[min(warmup, len(self._ts) - 1)])
+        self.start_ms = int(start)
+        self.end_ms = int(self._ts[-1]) + 60_000 - 1
+        self._position_ms = self.start_ms
+        self._wall_start = self.clock.time()
+        self.current_price = None
+        self.stats = {"ohlcv_requests": 0, "price_requests": 0, "advances": 0}
+        source = f" from {len(self.trades['timestamp'])} trades" if self.trades is not None else ""
+        logging.info(f"Replay {path}: {len(self._ts)} candles{source}, speed={'max' if self.max_speed else speed}")
+
+    @property
+    def max_speed(self):
+        return not self.speed
+
+    @property
+    def finished(self):
+        return self.now_ms() >= self.end_ms
+
+    def now_ms(self):
+        """Текущий момент воспроизведения (время записи, мс)"""
+        if self.max_speed:
+            return min(self._position_ms, self.end_ms)
+        elapsed = (self.clock.time() - self._wall_start) * self.speed
+        return min(self.start_ms + int(elapsed * 1000), self.end_ms)
+
+    def advance(self, candles=None):
+        """Режим max: перейти к закрытию следующей 1m свечи (или через candles свечей)"""
+        index = max(int(np.searchsorted(self._ts, self._position_ms, side="right")) - 1, 0)
+        index = min(index + (candles or self.step), len(self._ts) - 1)
+        self._position_ms = int(self._ts[index]) + 60_000 - 1
+        self.stats["advances"] += 1
+        return not self.finished
+
+    def _forming(self, index, now):
+        """open, high, low, close, volume свечи index на момент now"""
+        c = self.candles
+        open_, high, low, close, volume = (c["open"][index], c["high"][index], c["low"][index],
+                                           c["close"][index], c["volume"][index])
+        elapsed = now - int(self._ts[index])
+        if elapsed >= 59_999:
+            return open_, high, low, close, volume
+
+        if self.trades is not None:
+            tts = self.trades["timestamp"]
+            lo = np.searchsorted(tts, self._ts[index], side="left")
+            hi = max(np.searchsorted(tts, now, side="right"), lo + 1)
+            prices = self.trades["price"][lo:hi]
+            return (prices[0], prices.max(), prices.min(), prices[-1],
+                    float(self.trades["amount"][lo:hi].sum()))
+
+        fraction = elapsed / 60_000
+        path = (open_, low, high, close) if close >= open_ else (open_, high, low, close)
+        segment = min(int(fraction * 3), 2)
+        local = fraction * 3 - segment
+        price = path[segment] + (path[segment + 1] - path[segment]) * local
+        seen = path[:segment + 1] + (price,)
+        return open_, max(seen), min(seen), price, volume * fraction
+
+    def ohlcv_arrays(self, timeframe, limit=200):
+        """Последние limit свечей таймфрейма на текущий момент воспроизведения"""
+        self.stats["ohlcv_requests"] += 1
+        minutes = _timeframe_to_minutes(timeframe)
+        now = self.now_ms()
+        index = int(np.searchsorted(self._ts, now, side="right")) - 1
+        if index < 0:
+            return tuple(np.empty(0) for _ in CANDLE_COLUMNS)
+        first = max(0, index - (limit + 1) * minutes + 1)
+
+        window = slice(first, index + 1)
+        timestamps = self._ts[window].copy()
+        columns = [self.candles[name][window].copy() for name in CANDLE_COLUMNS[1:]]
+        forming = self._forming(index, now)
+        for column, value in zip(columns, forming):
+            column[-1] = value
+        self.current_price = float(forming[3])
+
+        candles = resample_arrays(timestamps, *columns, minutes)
+        return tuple(column[-limit:] for column in candles)
+
+    def fetch_ohlcv(self, timeframe, limit=200):
+        """Свечи списком [timestamp, open, high, low, close, volume], как у биржи"""
+        timestamps, opens, highs, lows, closes, volumes = self.ohlcv_arrays(timeframe, limit)
+        return [
+            [ts, o, h, l, c, v]
+            for ts, o, h, l, c, v in zip(timestamps.tolist(), opens.tolist(), highs.tolist(),
+                                         lows.tolist(), closes.tolist(), volumes.tolist())
+        ]
+
+    def get_current_price(self):
+        self.stats["price_requests"] += 1
+        now = self.now_ms()
+        index = max(int(np.searchsorted(self._ts, now, side="right")) - 1, 0)
+        self.current_price = float(self._forming(index, now)[3])
+        return self.current_price
+
+    def get_stats(self):
+        wall = max(self.clock.time() - self._wall_start, 1e-9)
+        replayed = (self.now_ms() - self.start_ms) / 1000
+        return dict(
+            self.stats,
+            replay_time=datetime.utcfromtimestamp(self.now_ms() / 1000).isoformat(),
+            progress=replayed * 1000 / max(self.end_ms - self.start_ms, 1),
+            replayed_minutes=replayed / 60,
+            wall_seconds=wall,
+            speedup=replayed / wall,
+            finished=self.finished
+        )
+
+
+class ReplayClock:
+    """
+    Часы бота при воспроизведении: время - момент записи (ReplayFeed.now_ms), поэтому
+    entry_time, время сделок и длительности в журнале - из записанного дня.
+    sleep ждёт на base часах с поправкой на скорость; на max скорости время двигает
+    только advance() ленты.
+    """
+
+    def __init__(self, feed, base=REAL_CLOCK):
+        self.feed = feed
+        self.base = base
+
+    def time(self):
+        return self.feed.now_ms() / 1000
+
+    def monotonic(self):
+        return self.time()
+
+    def sleep(self, seconds):
+        if not self.feed.max_speed:
+            self.base.sleep(seconds / self.feed.speed)
+
+    def utcnow(self):
+        return datetime.utcfromtimestamp(self.time())
+
+
+def _timeframe_to_minutes(timeframe):
+    if timeframe.endswith("m"):
+        return int(timeframe[:-1])
+    if timeframe.endswith("h"):
+        return int(timeframe[:-1]) * 60
+    if timeframe.endswith("d"):
+        return int(timeframe[:-1]) * 1440
+    return 1
+
+
+def parse_speed(value):
+    """"max" или 0 - максимальная скорость, иначе множитель реального времени"""
+    return 0.0 if str(value).lower() in ("max", "0", "") else float(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded market data through TradingBot")
+    parser.add_argument("path", help="1m candles or trades, CSV or Parquet")
+    parser.add_argument("--speed", default="max", help="multiple of real time or 'max'")
+    parser.add_argument("--symbol", default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    import trading_bot
+    trading_bot.REPLAY_FILE = args.path
+    trading_bot.REPLAY_SPEED = parse_speed(args.speed)
+    bot = trading_bot.TradingBot(symbol=args.symbol or trading_bot.SYMBOL)
+    bot.strategy_loop(should_continue=lambda: not bot.simulator.finished)
+    logging.info(f"Replay finished: {bot.simulator.get_stats()}")
+    logging.info(f"Balance: ${bot.state['balance']:.2f}, trades: {len(bot.state['trades'])}, journal: {bot.journal.path}")
+
+
+if __name__ == "__main__":
+    main()
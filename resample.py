@@ -0,0 +1,67 @@
+import numpy as np
+
+
+def resample_ohlcv(ohlcv, minutes, drop_partial_first=True):
+    """
+    Собирает N-минутные свечи из 1m свечей [timestamp, open, high, low, close, volume].
+
+    Границы выравниваются по времени эпохи (как у биржи: 5m свеча начинается в :00, :05, ...).
+    open - первой минуты, close - последней, high/low - экстремумы, volume - сумма.
+    Последняя (формирующаяся) свеча строится из имеющихся минут. Первая свеча,
+    у которой в окне нет начальной минуты, по умолчанию отбрасывается - её open неверен.
+    """
+    if minutes <= 1:
+        return [list(c) for c in ohlcv]
+
+    period_ms = minutes * 60_000
+    result = []
+    bucket = None
+    current = None
+
+    for ts, open_, high, low, close, volume in ohlcv:
+        start = ts - ts % period_ms
+        if start != bucket:
+            if current is not None:
+                result.append(current)
+            bucket = start
+            current = [start, open_, high, low, close, volume]
+        else:
+            if high > current[2]:
+                current[2] = high
+            if low < current[3]:
+                current[3] = low
+            current[4] = close
+            current[5] += volume
+
+    if current is not None:
+        result.append(current)
+
+    if drop_partial_first and result and ohlcv[0][0] % period_ms != 0:
+        result.pop(0)
+    return result
+
+
+def resample_arrays(timestamps, opens, highs, lows, closes, volumes, minutes, drop_partial_first=True):
+    """
+    То же, что resample_ohlcv, для NumPy массивов одинаковой длины (timestamp в мс).
+    Возвращает кортеж массивов (timestamp, open, high, low, close, volume).
+    """
+    columns = (timestamps, opens, highs, lows, closes, volumes)
+    if minutes <= 1 or len(timestamps) == 0:
+        return tuple(np.array(c) for c in columns)
+
+    period_ms = minutes * 60_000
+    start = timestamps - timestamps % period_ms
+    first = np.flatnonzero(np.r_[True, start[1:] != start[:-1]])
+    last = np.r_[first[1:], len(timestamps)] - 1
+    result = (
+        start[first],
+        opens[first],
+        np.maximum.reduceat(highs, first),
+        np.minimum.reduceat(lows, first),
+        closes[last],
+        np.add.reduceat(volumes, first)
+    )
+    if drop_partial_first and timestamps[0] % period_ms != 0:
+        result = tuple(c[1:] for c in result)
+    return result
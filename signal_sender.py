@@ -1,93 +1,362 @@
 import os
+import json
+import time
+import sqlite3
+import threading
 import requests
 import logging
 from typing import Literal
+from requests.adapters import HTTPAdapter
+
+import metrics
+from metrics import timed
+from tracing import traced
+
+SIGNAL_QUEUE_PATH = os.getenv('SIGNAL_QUEUE_PATH', 'signal_queue.db')
+SIGNAL_TIMEOUT = 30
+SIGNAL_MAX_ATTEMPTS = 8
+SIGNAL_RETRY_BASE = 0.5
+SIGNAL_RETRY_MAX = 30.0
+SIGNAL_MAX_AGE = 300  # не доставлять OPEN старше 5 минут (например, после рестарта)
+SIGNAL_DEFAULT_SYMBOL = "ETH/USDT"  # инструмент сигналов без символа (как target_url по умолчанию)
+
+SIGNALS_DROPPED = metrics.counter("tradingbot_signals_dropped_total", "Signals removed without delivery", ["reason"])
+
+
+class SignalQueue:
+    """
+    Очередь исходящих сигналов в SQLite: переживает перезапуск. Порядок - по id
+    внутри символа; символы друг друга не ждут (повторы по одному символу не
+    задерживают сигналы остальных).
+    """
+
+    def __init__(self, path, default_symbol=SIGNAL_DEFAULT_SYMBOL):
+        self.path = path
+        self.default_symbol = default_symbol
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS signals ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " position_type TEXT NOT NULL,"
+            " mode TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt REAL NOT NULL DEFAULT 0)"
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(signals)")]
+        if "symbol" not in columns:
+            self._conn.execute("ALTER TABLE signals ADD COLUMN symbol TEXT NOT NULL DEFAULT ''")
+        # сигналы от версии без символа шли на default_symbol: CLOSE оттуда должен
+        # держать за собой новые OPEN того же символа
+        self._conn.execute("UPDATE signals SET symbol = ? WHERE symbol = ''", (default_symbol,))
+        self._conn.execute("CREATE INDEX IF NOT EXISTS signals_symbol ON signals (symbol, id)")
+        # OPEN, отброшенные без доставки: следующий CLOSE того же символа и направления не отправляется
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS unopened ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " symbol TEXT NOT NULL,"
+            " position_type TEXT NOT NULL)"
+        )
+
+    def push(self, position_type, mode, payload, symbol=""):
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO signals (symbol, position_type, mode, payload, created_at, next_attempt)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (symbol or self.default_symbol, position_type, mode, json.dumps(payload), now, now)
+            )
+            return cur.lastrowid
+
+    def head(self):
+        """
+        Следующий к отправке сигнал: из самых старых сигналов каждого символа -
+        тот, чья попытка наступает раньше. dict или None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, symbol, position_type, mode, payload, created_at, attempts, next_attempt"
+                " FROM signals WHERE id IN (SELECT MIN(id) FROM signals GROUP BY symbol)"
+                " ORDER BY next_attempt, id LIMIT 1"
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("id", "symbol", "position_type", "mode", "payload", "created_at", "attempts", "next_attempt")
+        item = dict(zip(keys, row))
+        item["payload"] = json.loads(item["payload"])
+        return item
+
+    def retry_later(self, signal_id, attempts, next_attempt):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE signals SET attempts = ?, next_attempt = ? WHERE id = ?",
+                (attempts, next_attempt, signal_id)
+            )
+
+    def remove(self, signal_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM signals WHERE id = ?", (signal_id,))
+
+    def remove_opens_after(self, signal_id, symbol):
+        """Удалить OPEN сигналы символа, стоящие в очереди после signal_id; возвращает их position_type"""
+        where = "FROM signals WHERE symbol = ? AND id > ? AND mode = 'OPEN'"
+        with self._lock:
+            removed = self._conn.execute(f"SELECT position_type {where} ORDER BY id", (symbol, signal_id)).fetchall()
+            self._conn.execute(f"DELETE {where}", (symbol, signal_id))
+        return [row[0] for row in removed]
+
+    def mark_unopened(self, symbol, position_type):
+        with self._lock:
+            self._conn.execute("INSERT INTO unopened (symbol, position_type) VALUES (?, ?)", (symbol, position_type))
+
+    def take_unopened(self, symbol, position_type):
+        """Снять отметку для CLOSE; True - получатель не видел OPEN этой позиции"""
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM unopened WHERE id = (SELECT MIN(id) FROM unopened"
+                " WHERE symbol = ? AND position_type = ?)", (symbol, position_type)
+            ).rowcount > 0
+
+    def clear_unopened(self, symbol):
+        """OPEN символа доставлен: все CLOSE до него уже обработаны, отметки больше не нужны"""
+        with self._lock:
+            self._conn.execute("DELETE FROM unopened WHERE symbol = ?", (symbol,))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM signals").fetchone()[0]
+
 
 class SignalSender:
-    """Отправка торговых сигналов на внешний сервис"""
-    
-    def __init__(self):
+    """
+    Отправка торговых сигналов на внешний сервис.
+
+    send_signal только записывает сигнал в очередь на диске; доставкой занимается
+    фоновый поток - по порядку внутри символа (CLOSE никогда не уходит после следующего
+    OPEN того же символа), с повторами и экспоненциальной задержкой, через одно
+    keep-alive соединение.
+
+    CLOSE не устаревает и после SIGNAL_MAX_ATTEMPTS продолжает повторяться
+    (раз в SIGNAL_RETRY_MAX), держа за собой OPEN своего символа: получатель всё ещё
+    держит позицию, и новый OPEN лёг бы поверх неё. Если CLOSE всё же отброшен
+    (получатель отверг его ответом 4xx), отбрасываются и OPEN этого символа за ним.
+    Отброшенный OPEN (устарел, отвергнут) помечается в очереди, и парный ему CLOSE -
+    уже стоящий в очереди или пришедший позже - тоже отбрасывается: получатель не
+    должен получать закрытие позиции, которую он не открывал.
+    """
+
+    def __init__(self, queue_path=SIGNAL_QUEUE_PATH):
         self.webhook_url = os.getenv('SIGNAL_WEBHOOK_URL', '')
         self.auth_token = os.getenv('SIGNAL_AUTH_TOKEN', '')
         self.target_url = "https://www.mexc.com/ru-RU/futures/ETH_USDT"
         self.enabled = bool(self.webhook_url)
-        
+        self.queue = None
+        self.stats = {"queued": 0, "delivered": 0, "retries": 0, "dropped": 0, "orphaned": 0}
+        self._wakeup = threading.Event()
+        self._worker = None
+
         if not self.enabled:
             logging.warning("Signal sender disabled: SIGNAL_WEBHOOK_URL not configured")
         else:
             logging.info(f"Signal sender enabled: {self.webhook_url}")
-    
+            self.session = requests.Session()
+            self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            self.queue = SignalQueue(queue_path)
+            pending = len(self.queue)
+            if pending:
+                logging.info(f"Signal queue: {pending} pending signal(s) from previous run")
+            self._start_worker()
+
+    def target_url_for(self, symbol):
+        """ETH/USDT -> https://www.mexc.com/ru-RU/futures/ETH_USDT"""
+        if not symbol:
+            return self.target_url
+        return f"https://www.mexc.com/ru-RU/futures/{symbol.replace('/', '_')}"
+
+    def build_payload(self, position_type, mode, symbol=None):
+        position_capitalized = position_type.capitalize()
+        return {
+            "settings": {
+                "targetUrl": self.target_url_for(symbol),
+                "openType": position_capitalized,
+                "openPercent": 30,
+                "closeType": position_capitalized,
+                "closePercent": 100,
+                "mode": mode
+            }
+        }
+
+    @timed("send_signal")
     def send_signal(
-        self, 
+        self,
         position_type: Literal["LONG", "SHORT"],
-        mode: Literal["OPEN", "CLOSE"]
+        mode: Literal["OPEN", "CLOSE"],
+        symbol: str = None
     ):
         """
-        Отправка сигнала на внешний сервис
-        
+        Поставить сигнал в очередь на отправку
+
         Args:
             position_type: Тип позиции - "LONG" или "SHORT"
             mode: Режим - "OPEN" (открытие) или "CLOSE" (закрытие)
+            symbol: Инструмент (например "BTC/USDT"), по умолчанию ETH/USDT
         """
         if not self.enabled:
             logging.debug(f"Signal not sent (disabled): {position_type} {mode}")
             return False
-        
-        position_capitalized = position_type.capitalize()
-        
-        payload = {
-            "settings": {
-                "targetUrl": self.target_url,
-                "openType": position_capitalized,
-                "openPercent": 30,
-                "closeType": position_capitalized,
-                "closePercent": 100,
-                "mode": mode
-            }
-        }
-        
+
+        try:
+            self.queue.push(position_type, mode, self.build_payload(position_type, mode, symbol), symbol)
+        except Exception as e:
+            logging.error(f"Signal enqueue error: {e}")
+            return False
+        self.stats["queued"] += 1
+        self._wakeup.set()
+        return True
+
+    def _start_worker(self):
+        self._worker = threading.Thread(target=self._deliver_loop, name="signal-sender", daemon=True)
+        self._worker.start()
+
+    def _deliver_loop(self):
+        while True:
+            try:
+                item = self.queue.head()
+                if item is None:
+                    self._wakeup.wait()
+                    self._wakeup.clear()
+                    continue
+
+                delay = item["next_attempt"] - time.time()
+                if delay > 0:
+                    self._wakeup.wait(delay)
+                    self._wakeup.clear()
+                    continue
+
+                self._process(item)
+            except Exception as e:
+                logging.error(f"Signal worker error: {e}")
+                time.sleep(1)
+
+    def _process(self, item):
+        position_type, mode = item["position_type"], item["mode"]
+        is_close = mode == "CLOSE"
+
+        if is_close and self.queue.take_unopened(item["symbol"], position_type):
+            logging.warning(f"Signal dropped: {position_type} CLOSE {item['symbol']}, its OPEN was never delivered")
+            self._drop(item, "unopened")
+            return
+
+        if not is_close and time.time() - item["created_at"] > SIGNAL_MAX_AGE:
+            logging.error(f"Signal expired, dropped: {position_type} {mode} (queued {item['created_at']:.0f})")
+            self._drop(item, "expired")
+            return
+
+        delivered, retryable = self._deliver(position_type, mode, item["payload"])
+        if delivered:
+            self.queue.remove(item["id"])
+            if not is_close:
+                self.queue.clear_unopened(item["symbol"])
+            self.stats["delivered"] += 1
+            return
+
+        attempts = item["attempts"] + 1
+        if not retryable or (attempts >= SIGNAL_MAX_ATTEMPTS and not is_close):
+            logging.error(f"Signal dropped after {attempts} attempt(s): {position_type} {mode}")
+            self._drop(item, "rejected" if not retryable else "attempts")
+            return
+
+        backoff = min(SIGNAL_RETRY_BASE * 2 ** (attempts - 1), SIGNAL_RETRY_MAX)
+        if attempts >= SIGNAL_MAX_ATTEMPTS:
+            logging.error(f"Signal {position_type} {mode} {item['symbol']} undelivered after {attempts} attempts, "
+                          f"still retrying; later OPEN signals of this symbol wait for it")
+        else:
+            logging.warning(f"Signal retry {attempts} in {backoff:.1f}s: {position_type} {mode}")
+        self.queue.retry_later(item["id"], attempts, time.time() + backoff)
+        self.stats["retries"] += 1
+
+    def _drop(self, item, reason):
+        self.queue.remove(item["id"])
+        self.stats["dropped"] += 1
+        SIGNALS_DROPPED.labels(reason=reason).inc()
+        if item["mode"] != "CLOSE":
+            self.queue.mark_unopened(item["symbol"], item["position_type"])
+            return
+        if reason == "unopened":
+            return
+        # получатель не узнал о закрытии: OPEN за ним открыл бы вторую позицию поверх первой
+        orphaned = self.queue.remove_opens_after(item["id"], item["symbol"])
+        for position_type in orphaned:
+            self.queue.mark_unopened(item["symbol"], position_type)
+        if orphaned:
+            logging.error(f"CLOSE {item['symbol']} was not delivered: dropped {len(orphaned)} queued OPEN signal(s) behind it")
+            self.stats["orphaned"] += len(orphaned)
+            self.stats["dropped"] += len(orphaned)
+            SIGNALS_DROPPED.labels(reason="close_dropped").inc(len(orphaned))
+
+    @timed("signal_deliver", error_when=lambda result: not result[0])
+    @traced("signal_deliver")
+    def _deliver(self, position_type, mode, payload):
+        """Возвращает (доставлено, имеет ли смысл повторять)"""
         headers = {
             "Content-Type": "application/json"
         }
-        
+
         if self.auth_token:
             headers["Authorization"] = f"Bearer {self.auth_token}"
-        
+
         try:
             logging.info(f"Sending signal: {position_type} {mode} to {self.webhook_url}")
-            response = requests.post(
+            response = self.session.post(
                 self.webhook_url,
                 json=payload,
                 headers=headers,
-                timeout=30
+                timeout=SIGNAL_TIMEOUT
             )
-            
+
             if response.status_code in [200, 201, 202]:
                 logging.info(f"Signal sent successfully: {position_type} {mode} (status: {response.status_code})")
-                return True
+                return True, False
             else:
                 logging.error(f"Signal failed: {response.status_code} - {response.text}")
-                return False
-                
+                return False, response.status_code == 429 or response.status_code >= 500
+
         except requests.exceptions.Timeout:
             logging.error(f"Signal timeout: {position_type} {mode}")
-            return False
+            return False, True
         except Exception as e:
             logging.error(f"Signal error: {e}")
-            return False
-    
-    def send_open_long(self):
+            return False, True
+
+    def pending(self):
+        return len(self.queue) if self.queue else 0
+
+    def flush(self, timeout=None):
+        """Дождаться доставки всех сигналов из очереди"""
+        deadline = None if timeout is None else time.time() + timeout
+        while self.pending():
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def send_open_long(self, symbol=None):
         """Отправка сигнала открытия LONG позиции"""
-        return self.send_signal("LONG", "OPEN")
-    
-    def send_close_long(self):
+        return self.send_signal("LONG", "OPEN", symbol)
+
+    def send_close_long(self, symbol=None):
         """Отправка сигнала закрытия LONG позиции"""
-        return self.send_signal("LONG", "CLOSE")
-    
-    def send_open_short(self):
+        return self.send_signal("LONG", "CLOSE", symbol)
+
+    def send_open_short(self, symbol=None):
         """Отправка сигнала открытия SHORT позиции"""
-        return self.send_signal("SHORT", "OPEN")
-    
-    def send_close_short(self):
+        return self.send_signal("SHORT", "OPEN", symbol)
+
+    def send_close_short(self, symbol=None):
         """Отправка сигнала закрытия SHORT позиции"""
-        return self.send_signal("SHORT", "CLOSE")
+        return self.send_signal("SHORT", "CLOSE", symbol)
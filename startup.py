@@ -0,0 +1,79 @@
+"""
+Время старта процесса по фазам, до первого решения стратегии.
+
+    interpreter     запуск процесса -> начало импорта модулей бота
+    imports         -> модули загружены (точка входа или TradingBot.__init__)
+    bot_init        -> TradingBot создан (состояние, журнал, клиент биржи)
+    loop_start      -> strategy_loop запущен
+    first_decision  -> первый цикл стратегии завершён (отмечается в strategy_loop / MultiSymbolEngine.run)
+
+Каждая фаза отмечается один раз. После first_decision отчёт пишется в лог,
+а также отдаётся в /api/startup и в метрике tradingbot_startup_seconds{phase}.
+"""
+import os
+import time
+import logging
+import threading
+
+import metrics
+
+STARTUP_PHASES = ("interpreter", "imports", "bot_init", "loop_start", "first_decision")
+
+
+def process_start_time():
+    """Время запуска процесса (unix) из /proc; вне Linux - время импорта этого модуля"""
+    try:
+        with open("/proc/self/stat") as f:
+            # поле 22 (starttime) идёт после имени процесса в скобках
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat") as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return boot_time + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return time.time()
+
+
+class StartupReport:
+    def __init__(self, started_at=None):
+        self.started_at = started_at if started_at is not None else process_start_time()
+        self.marks = {}
+        self._lock = threading.Lock()
+        self._gauge = metrics.gauge(
+            "tradingbot_startup_seconds", "Seconds from process start to the end of each startup phase", ["phase"]
+        )
+
+    def mark(self, phase):
+        """Отметить конец фазы (повторные отметки игнорируются)"""
+        with self._lock:
+            if phase in self.marks:
+                return False
+            self.marks[phase] = time.time()
+        self._gauge.labels(phase=phase).set(round(self.marks[phase] - self.started_at, 4))
+        if phase == "first_decision":
+            logging.info(f"Startup: {self.summary()}")
+        return True
+
+    def report(self):
+        phases = []
+        previous = self.started_at
+        for phase in sorted(self.marks, key=self.marks.get):
+            at = self.marks[phase]
+            phases.append({
+                "phase": phase,
+                "duration_ms": round((at - previous) * 1000, 1),
+                "since_start_ms": round((at - self.started_at) * 1000, 1)
+            })
+            previous = at
+        first_decision = self.marks.get("first_decision")
+        return {
+            "process_started_at": self.started_at,
+            "phases": phases,
+            "time_to_first_decision_ms": round((first_decision - self.started_at) * 1000, 1) if first_decision else None
+        }
+
+    def summary(self):
+        return ", ".join(f"{p['phase']} {p['duration_ms']:.0f}ms" for p in self.report()["phases"])
+
+
+STARTUP = StartupReport()
+STARTUP.mark("interpreter")
@@ -0,0 +1,126 @@
+import json
+import queue
+import logging
+import threading
+
+SSE_KEEPALIVE = 15.0
+SSE_QUEUE_SIZE = 64
+
+
+def sse_message(event, payload):
+    """Одно событие Server-Sent Events, уже закодированное"""
+    return f"event: {event}\ndata: {json.dumps(payload, default=str, separators=(',', ':'))}\n\n".encode()
+
+
+class StateBroadcaster:
+    """
+    Один производитель состояния дашборда на все подключения.
+
+    Снимок строится функцией build_snapshot не чаще interval (или сразу после notify()),
+    сравнивается с предыдущим по ключам верхнего уровня, и только изменённые ключи
+    рассылаются подписчикам одним заранее закодированным сообщением. Новый подписчик
+    сначала получает полный снимок. Стоимость на клиента - одна запись в очередь,
+    поэтому нагрузка не растёт от числа открытых дашбордов.
+    """
+
+    def __init__(self, build_snapshot, interval=1.0, keepalive=SSE_KEEPALIVE, queue_size=SSE_QUEUE_SIZE):
+        self.build_snapshot = build_snapshot
+        self.interval = interval
+        self.keepalive = keepalive
+        self.queue_size = queue_size
+        self.version = 0
+        self.snapshot = {}
+        self._encoded = {}
+        self._snapshot_message = sse_message("snapshot", {"version": 0, "state": {}})
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._thread = None
+        self.stats = {"builds": 0, "publishes": 0, "dropped_subscribers": 0}
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="state-broadcaster", daemon=True)
+            self._thread.start()
+        return self
+
+    def notify(self):
+        """Состояние изменилось - пересобрать снимок, не дожидаясь interval"""
+        self._changed.set()
+
+    def _run(self):
+        while True:
+            self._changed.wait(self.interval)
+            self._changed.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.error(f"State broadcaster error: {e}")
+
+    def refresh(self):
+        """Собрать снимок и разослать изменения; возвращает номер версии"""
+        snapshot = self.build_snapshot()
+        self.stats["builds"] += 1
+        encoded = {key: json.dumps(value, default=str, sort_keys=True) for key, value in snapshot.items()}
+        changed = {key: snapshot[key] for key, value in encoded.items() if self._encoded.get(key) != value}
+        removed = [key for key in self._encoded if key not in encoded]
+        if not changed and not removed:
+            return self.version
+
+        with self._lock:
+            self.version += 1
+            self.snapshot = snapshot
+            self._encoded = encoded
+            self._snapshot_message = sse_message("snapshot", {"version": self.version, "state": snapshot})
+            message = sse_message("diff", {"version": self.version, "changed": changed, "removed": removed})
+            subscribers = list(self._subscribers)
+        self.stats["publishes"] += 1
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # медленный клиент: отключаем, EventSource переподключится и получит снимок
+                self._drop(subscriber)
+        return self.version
+
+    def _drop(self, subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.discard(subscriber)
+                self.stats["dropped_subscribers"] += 1
+        with subscriber.mutex:
+            subscriber.queue.clear()
+        subscriber.put_nowait(None)
+
+    def subscribe(self):
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            subscriber.put_nowait(self._snapshot_message)
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def stream(self):
+        """Генератор тела ответа text/event-stream для одного клиента"""
+        subscriber = self.subscribe()
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    message = subscriber.get(timeout=self.keepalive)
+                except queue.Empty:
+                    yield b": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
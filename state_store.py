@@ -0,0 +1,109 @@
+import time
+import threading
+from contextlib import contextmanager
+
+
+class FrozenDict(dict):
+    """dict только для чтения: json и jsonify работают с ним как с обычным dict"""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("state snapshot is read-only")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = __ior__ = _read_only
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+    def __copy__(self):
+        return thaw(self)
+
+    def __deepcopy__(self, memo):
+        return thaw(self)
+
+
+def freeze(value):
+    """Глубокая неизменяемая копия: dict -> FrozenDict, list -> tuple"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """Изменяемая копия снимка (dict и list)"""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+class Snapshot:
+    __slots__ = ("version", "state", "published_at")
+
+    def __init__(self, version, state, published_at):
+        self.version = version
+        self.state = state
+        self.published_at = published_at
+
+
+class StateStore:
+    """
+    Версионированное состояние бота: писатель (поток стратегии) меняет свой рабочий
+    dict и публикует его, читатели (Flask, Telegram, дашборд) берут store.snapshot -
+    неизменяемую копию последней публикации - без блокировок и HTTP запросов.
+
+    Внутри batch() публикации откладываются: решение из нескольких шагов (закрытие,
+    вход, сохранение) даёт одну новую версию и один вызов подписчиков.
+    """
+
+    def __init__(self, state=None):
+        self._lock = threading.Lock()
+        self._batch_depth = 0
+        self._pending = None
+        self._listeners = []
+        self.snapshot = Snapshot(0, freeze(state or {}), time.time())
+        self.stats = {"publishes": 0, "batched": 0}
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    @property
+    def state(self):
+        return self.snapshot.state
+
+    def subscribe(self, listener):
+        """listener(snapshot) вызывается после каждой новой версии (в потоке писателя)"""
+        self._listeners.append(listener)
+
+    def publish(self, state):
+        """Опубликовать текущее состояние писателя; внутри batch() - при выходе из него"""
+        with self._lock:
+            if self._batch_depth:
+                self._pending = state
+                self.stats["batched"] += 1
+                return None
+            snapshot = Snapshot(self.snapshot.version + 1, freeze(state), time.time())
+            # одна запись атрибута: читатель видит либо старый, либо новый снимок целиком
+            self.snapshot = snapshot
+            self.stats["publishes"] += 1
+        for listener in self._listeners:
+            listener(snapshot)
+        return snapshot
+
+    @contextmanager
+    def batch(self):
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                pending = self._pending if self._batch_depth == 0 else None
+                if pending is not None:
+                    self._pending = None
+            if pending is not None:
+                self.publish(pending)
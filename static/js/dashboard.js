@@ -2,17 +2,24 @@ class TradingDashboard {
     constructor() {
         this.lastUpdateTime = null;
         this.isUpdating = false;
+        this.state = {};
+        this.stateVersion = 0;
+        this.eventSource = null;
         this.currentTimeframe = '5m';
         this.chart = null;
         this.candlestickSeries = null;
         this.chartManuallyAdjusted = false;
         this.savedTimeRange = null;
+        this.chartCursor = null;
+        this.sarMarkers = new Map();
         
         this.initChart();
         this.bindEvents();
         this.startDataUpdates();
         
-        this.updateDashboard();
+        if (!window.EventSource) {
+            this.updateDashboard();
+        }
         this.updateChart();
     }
 
@@ -83,44 +90,60 @@ class TradingDashboard {
                 this.currentTimeframe = e.target.getAttribute('data-tf');
                 this.chartManuallyAdjusted = false;
                 this.savedTimeRange = null;
+                this.chartCursor = null;
                 this.updateChart();
             });
         });
     }
 
     async updateChart() {
+        const timeframe = this.currentTimeframe;
+        const since = this.chartCursor !== null ? `&since=${this.chartCursor}` : '';
         try {
-            const response = await fetch(`/api/chart_data?timeframe=${this.currentTimeframe}`);
+            const response = await fetch(`/api/chart_data?timeframe=${timeframe}${since}`);
             if (!response.ok) return;
             
             const data = await response.json();
             
-            if (!this.candlestickSeries || !data.candles || data.candles.length === 0) return;
+            // the user switched timeframe while the request was in flight
+            if (!this.candlestickSeries || data.timeframe !== this.currentTimeframe) return;
             
-            // Convert time strings to timestamps
-            const candles = data.candles.map((candle, idx) => ({
-                time: Math.floor(Date.now() / 1000) - (data.candles.length - idx) * 60,
+            const candles = (data.candles || []).map(candle => ({
+                time: candle.time,
                 open: candle.open,
                 high: candle.high,
                 low: candle.low,
                 close: candle.close
             }));
             
-            this.candlestickSeries.setData(candles);
+            if (data.reset) {
+                this.sarMarkers = new Map();
+                this.candlestickSeries.setData(candles);
+            } else {
+                // only the forming candle and any new ones
+                candles.forEach(candle => this.candlestickSeries.update(candle));
+            }
             
-            // Add SAR points as markers with offset
-            if (data.sar_points && data.sar_points.length > 0) {
-                const markers = data.sar_points.map((point, idx) => ({
-                    time: candles[idx].time,
+            // SAR points as markers, keyed by candle time
+            (data.sar_points || []).forEach(point => {
+                this.sarMarkers.set(point.time, {
+                    time: point.time,
                     position: point.trend === 'up' ? 'belowBar' : 'aboveBar',
                     color: point.color,
                     shape: 'circle',
                     size: 'large'
-                }));
-                this.candlestickSeries.setMarkers(markers);
+                });
+            });
+            while (this.sarMarkers.size > 300) {
+                this.sarMarkers.delete(this.sarMarkers.keys().next().value);
             }
+            this.candlestickSeries.setMarkers([...this.sarMarkers.values()].sort((a, b) => a.time - b.time));
             
-            if (!this.chartManuallyAdjusted) {
+            if (data.cursor !== null && data.cursor !== undefined) {
+                this.chartCursor = data.cursor;
+            }
+            
+            if (data.reset && !this.chartManuallyAdjusted) {
                 this.chart.timeScale().fitContent();
             }
         } catch (error) {
@@ -254,8 +277,45 @@ class TradingDashboard {
                 return;
             }
 
-            const data = await response.json();
+            this.state = await response.json();
+            this.renderState(this.state);
+        } catch (error) {
+            console.error('Dashboard update error:', error);
+        } finally {
+            this.isUpdating = false;
+        }
+    }
 
+    connectStream() {
+        // One server-side producer pushes a snapshot, then only the fields that changed
+        this.eventSource = new EventSource('/api/stream');
+
+        this.eventSource.addEventListener('snapshot', (event) => {
+            const message = JSON.parse(event.data);
+            this.stateVersion = message.version;
+            this.state = message.state;
+            this.renderState(this.state);
+        });
+
+        this.eventSource.addEventListener('diff', (event) => {
+            const message = JSON.parse(event.data);
+            if (message.version <= this.stateVersion) return;
+            this.stateVersion = message.version;
+            Object.assign(this.state, message.changed);
+            (message.removed || []).forEach(key => delete this.state[key]);
+            this.renderState(this.state, message.changed);
+        });
+
+        this.eventSource.onerror = () => {
+            // EventSource reconnects by itself and receives a fresh snapshot
+            console.warn('State stream interrupted, reconnecting');
+        };
+    }
+
+    renderState(data, changed = null) {
+        const has = (key) => changed === null || key in changed;
+
+        try {
             const statusBadge = document.getElementById('bot-status');
             if (data.bot_running) {
                 statusBadge.textContent = 'RUNNING';
@@ -272,7 +332,7 @@ class TradingDashboard {
                 document.getElementById('current-price').textContent = `$${parseFloat(data.current_price).toFixed(2)}`;
             }
 
-            if (data.sar_directions) {
+            if (data.sar_directions && has('sar_directions')) {
                 this.updateSARDirections(data.sar_directions);
             }
 
@@ -284,15 +344,13 @@ class TradingDashboard {
                 this.clearPosition();
             }
 
-            if (data.trades) {
+            if (data.trades && has('trades')) {
                 this.updateTrades(data.trades);
             }
 
             this.lastUpdateTime = new Date();
         } catch (error) {
-            console.error('Dashboard update error:', error);
-        } finally {
-            this.isUpdating = false;
+            console.error('Dashboard render error:', error);
         }
     }
 
@@ -378,7 +436,7 @@ class TradingDashboard {
         
         const sizeElement = document.getElementById('pos-size');
         if (sizeElement) {
-            sizeElement.textContent = `${parseFloat(position.size_base).toFixed(6)} ETH`;
+            sizeElement.textContent = `${parseFloat(position.size_base).toFixed(6)} ${(position.symbol || 'ETH/USDT').split('/')[0]}`;
             sizeElement.className = colorClass;
         }
         
@@ -509,7 +567,11 @@ class TradingDashboard {
     }
 
     startDataUpdates() {
-        setInterval(() => this.updateDashboard(), 3000);
+        if (window.EventSource) {
+            this.connectStream();
+        } else {
+            setInterval(() => this.updateDashboard(), 3000);
+        }
         setInterval(() => this.updateChart(), 5000);
         setInterval(() => this.updateTopGainers(), 15000);
         this.updateTopGainers();
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Parameter sweep for the SAR strategy on top of backtest.run_backtest.
+
+The candle arrays are placed once in shared memory and every worker process maps
+them read-only, so tasks only carry their parameters. Results are ranked and
+written to CSV.
+
+    python sweep.py eth_1m.csv --step 0.02 0.05 --max-step 0.2 0.5 --leverage 100 500
+    python sweep.py eth_1m.csv --random 500 --workers 32
+"""
+import os
+import csv
+import random
+import logging
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from backtest import run_backtest, load_ohlcv_csv
+from trading_bot import LEVERAGE, POSITION_PERCENT, START_BANK, PSAR_STEP, PSAR_MAX_STEP
+
+PARAM_NAMES = ("step", "max_step", "leverage", "position_percent")
+RANDOM_RANGES = {
+    "step": (0.005, 0.1),
+    "max_step": (0.1, 0.8),
+    "leverage": (10, 500),
+    "position_percent": (0.01, 0.25)
+}
+
+_worker = {}
+
+
+def param_grid(steps, max_steps, leverages, percents):
+    """Все сочетания параметров (step не больше max_step)"""
+    for step, max_step, leverage, percent in itertools.product(steps, max_steps, leverages, percents):
+        if step <= max_step:
+            yield {"step": step, "max_step": max_step, "leverage": leverage, "position_percent": percent}
+
+
+def random_params(count, ranges=RANDOM_RANGES, seed=None):
+    """Случайный поиск: count наборов из равномерных диапазонов"""
+    rng = random.Random(seed)
+    produced = 0
+    while produced < count:
+        params = {name: rng.uniform(*ranges[name]) for name in PARAM_NAMES}
+        params["leverage"] = int(round(params["leverage"]))
+        if params["step"] <= params["max_step"]:
+            produced += 1
+            yield params
+
+
+def _attach(shm_name, length, start_balance):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    data = np.ndarray((4, length), dtype=np.float64, buffer=shm.buf)
+    _worker.update(shm=shm, data=data, start_balance=start_balance)
+
+
+def _evaluate(params):
+    data = _worker["data"]
+    result = run_backtest(
+        data[0].astype(np.int64), data[1], data[2], data[3],
+        start_balance=_worker["start_balance"],
+        with_trades=False,
+        **params
+    )
+    return dict(params, **result["stats"], balance=result["balance"])
+
+
+def run_sweep(candles, params, workers=None, start_balance=START_BANK, rank_by="return_pct"):
+    """
+    Прогоняет наборы параметров по процессам. candles - dict из load_ohlcv_csv.
+    Возвращает список результатов, отсортированный по rank_by (лучшие первыми).
+    """
+    params = list(params)
+    length = len(candles["close"])
+    shm = shared_memory.SharedMemory(create=True, size=max(1, 4 * length * 8))
+    try:
+        data = np.ndarray((4, length), dtype=np.float64, buffer=shm.buf)
+        data[0] = candles["timestamp"]
+        data[1] = candles["high"]
+        data[2] = candles["low"]
+        data[3] = candles["close"]
+
+        workers = workers or os.cpu_count()
+        chunksize = max(1, len(params) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(shm.name, length, start_balance)) as pool:
+            results = list(pool.map(_evaluate, params, chunksize=chunksize))
+        del data
+    finally:
+        shm.close()
+        shm.unlink()
+
+    results.sort(key=lambda r: r[rank_by], reverse=True)
+    return results
+
+
+def write_results(results, path):
+    if not results:
+        return
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["rank"] + list(results[0].keys()))
+        writer.writeheader()
+        for rank, row in enumerate(results, 1):
+            writer.writerow(dict(row, rank=rank))
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Parameter sweep for the SAR strategy")
+    parser.add_argument("csv", help="1m candles: timestamp,open,high,low,close,volume")
+    parser.add_argument("--step", type=float, nargs="+", default=[PSAR_STEP])
+    parser.add_argument("--max-step", type=float, nargs="+", default=[PSAR_MAX_STEP])
+    parser.add_argument("--leverage", type=int, nargs="+", default=[LEVERAGE])
+    parser.add_argument("--percent", type=float, nargs="+", default=[POSITION_PERCENT])
+    parser.add_argument("--random", type=int, default=0, help="random search with N samples instead of the grid")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rank-by", default="return_pct")
+    parser.add_argument("--balance", type=float, default=START_BANK)
+    parser.add_argument("--out", default="sweep_results.csv")
+    args = parser.parse_args()
+
+    candles = load_ohlcv_csv(args.csv)
+    if args.random:
+        params = random_params(args.random, seed=args.seed)
+    else:
+        params = param_grid(args.step, args.max_step, args.leverage, args.percent)
+
+    results = run_sweep(candles, params, workers=args.workers,
+                        start_balance=args.balance, rank_by=args.rank_by)
+    write_results(results, args.out)
+    logging.info(f"{len(results)} runs written to {args.out}")
+    for row in results[:10]:
+        logging.info(
+            f"step={row['step']:.3f} max_step={row['max_step']:.3f} leverage={row['leverage']} "
+            f"percent={row['position_percent']:.3f} -> {row[args.rank_by]:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
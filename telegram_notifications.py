@@ -1,7 +1,27 @@
 import requests
 import logging
 import os
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+
+import metrics
+from metrics import timed
+from tracing import traced
+
+NOTIFY_WORKERS = int(os.environ.get("TELEGRAM_NOTIFY_WORKERS", "8"))
+NOTIFY_TIMEOUT = 10
+BROADCAST_HISTORY = 100
+
+TELEGRAM_MESSAGES = metrics.counter(
+    "tradingbot_telegram_messages_total", "Telegram broadcast messages by delivery result", ["result"])
+TELEGRAM_BROADCAST_SECONDS = metrics.histogram(
+    "tradingbot_telegram_broadcast_seconds", "Telegram broadcast latency: waiting in the queue and sending to all chats",
+    ["stage"])
 
 class TelegramNotifier:
     def __init__(self, bot_token, chat_id):
@@ -17,33 +37,111 @@ class TelegramNotifier:
         self.owner_id = os.environ.get("TELEGRAM_OWNER_ID", "").strip()
         if self.owner_id:
             self.owner_id = str(self.owner_id)
-            
+
+        # keep-alive connections to api.telegram.org shared by all sends
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=NOTIFY_WORKERS)
+        self.session.mount("https://", adapter)
+
+        self._broadcasts = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=NOTIFY_WORKERS, thread_name_prefix="telegram-send")
+        self._dispatcher = None
+        self._dispatcher_lock = threading.Lock()
+        self.broadcast_history = deque(maxlen=BROADCAST_HISTORY)
+        self.delivery_totals = {"broadcasts": 0, "delivered": 0, "failed": 0}
+        # callable -> dict состояния для /status (задаёт процесс с ботом, см. app.get_bot)
+        self.status_provider = None
+
+    @timed("telegram_post")
+    @traced("telegram_post")
+    def _post_message(self, chat_id, message):
+        response = self.session.post(
+            f"{self.base_url}/sendMessage",
+            data={"chat_id": chat_id, "text": message, "parse_mode": "HTML"},
+            timeout=NOTIFY_TIMEOUT
+        )
+        response.raise_for_status()
+
+    def _send_to_chat(self, chat_id, message):
+        try:
+            self._post_message(chat_id, message)
+            return True
+        except Exception as e:
+            logging.error(f"Failed to send Telegram message to {chat_id}: {e}")
+            return False
+
+    def _ensure_dispatcher(self):
+        with self._dispatcher_lock:
+            if self._dispatcher is None or not self._dispatcher.is_alive():
+                self._dispatcher = threading.Thread(target=self._dispatch_loop, name="telegram-dispatcher", daemon=True)
+                self._dispatcher.start()
+
+    def _dispatch_loop(self):
+        # broadcasts go out one at a time (opened before closed), each to all chats at once
+        while True:
+            message, chat_ids, queued_at = self._broadcasts.get()
+            try:
+                started = time.monotonic()
+                results = list(self._pool.map(lambda chat_id: self._send_to_chat(chat_id, message), chat_ids))
+                self._record_broadcast(len(chat_ids), sum(results), started, queued_at)
+            except Exception as e:
+                logging.error(f"Telegram dispatcher error: {e}")
+            finally:
+                self._broadcasts.task_done()
+
+    def _record_broadcast(self, chats, delivered, started, queued_at):
+        finished = time.monotonic()
+        failed = chats - delivered
+        self.broadcast_history.append({
+            "time": datetime.utcnow().isoformat(),
+            "chats": chats,
+            "delivered": delivered,
+            "failed": failed,
+            "queue_ms": round((started - queued_at) * 1000, 1),
+            "send_ms": round((finished - started) * 1000, 1)
+        })
+        self.delivery_totals["broadcasts"] += 1
+        self.delivery_totals["delivered"] += delivered
+        self.delivery_totals["failed"] += failed
+        TELEGRAM_MESSAGES.labels(result="delivered").inc(delivered)
+        TELEGRAM_MESSAGES.labels(result="failed").inc(failed)
+        TELEGRAM_BROADCAST_SECONDS.labels(stage="queue").observe(started - queued_at)
+        TELEGRAM_BROADCAST_SECONDS.labels(stage="send").observe(finished - started)
+        if delivered > 0:
+            logging.info(f"Telegram message sent to {delivered}/{chats} chats in {(finished - started) * 1000:.0f}ms")
+
+    @timed("telegram_send_message", error_when=lambda queued: not queued)
     def send_message(self, message):
-        """Send a message to Telegram"""
+        """Queue a message for all subscribed chats; delivery happens in the background"""
         if not self.bot_token or not self.chat_ids:
             logging.warning("Telegram credentials not configured")
             return False
-            
-        success_count = 0
-        for chat_id in self.chat_ids:
-            try:
-                url = f"{self.base_url}/sendMessage"
-                data = {
-                    "chat_id": chat_id,
-                    "text": message,
-                    "parse_mode": "HTML"
-                }
-                
-                response = requests.post(url, data=data, timeout=10)
-                response.raise_for_status()
-                success_count += 1
-            except Exception as e:
-                logging.error(f"Failed to send Telegram message to {chat_id}: {e}")
-                
-        if success_count > 0:
-            logging.info(f"Telegram message sent to {success_count} chats")
-            return True
-        return False
+
+        self._ensure_dispatcher()
+        self._broadcasts.put((message, list(self.chat_ids), time.monotonic()))
+        return True
+
+    def flush(self, timeout=None):
+        """Wait until queued broadcasts are delivered (for scripts and shutdown)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._broadcasts.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def get_delivery_stats(self):
+        """Totals, queue depth and the most recent broadcasts with their latencies"""
+        recent = list(self.broadcast_history)
+        send_ms = sorted(b["send_ms"] for b in recent)
+        return {
+            "totals": dict(self.delivery_totals),
+            "pending": self._broadcasts.unfinished_tasks,
+            "subscribers": len(self.chat_ids),
+            "send_ms_p50": send_ms[len(send_ms) // 2] if send_ms else None,
+            "send_ms_max": send_ms[-1] if send_ms else None,
+            "recent": recent[-10:]
+        }
     
     def send_current_position(self, position, current_price, balance=0):
         """Send notification about current open position"""
@@ -58,6 +156,8 @@ No open position at the moment.
             side_emoji = "UP" if position["side"] == "long" else "DOWN"
             side_text = "LONG" if position["side"] == "long" else "SHORT"
             trade_number = position.get("trade_number", 1)
+            pair = position.get("symbol", "ETH/USDT")
+            base = pair.split("/")[0]
             
             entry_price = position["entry_price"]
             size = position["size_base"]
@@ -74,11 +174,11 @@ No open position at the moment.
             
             message = f"""
 <b>CURRENT POSITION #{trade_number}</b>
-<b>{side_text} ETH/USDT</b> (10.0% of bank)
+<b>{side_text} {pair}</b> (10.0% of bank)
 
 <b>Entry Price:</b> ${entry_price:.2f}
 <b>Current Price:</b> ${current_price:.2f}
-<b>Size:</b> {size:.6f} ETH
+<b>Size:</b> {size:.6f} {base}
 <b>Notional:</b> ${position["notional"]:.2f}
 <b>Margin:</b> ${margin:.2f}
 <b>Leverage:</b> x500
@@ -95,14 +195,16 @@ No open position at the moment.
     def send_position_opened(self, position, current_price, trade_number=1, balance=0):
         """Send notification when position is opened"""
         side_text = "LONG" if position["side"] == "long" else "SHORT"
+        pair = position.get("symbol", "ETH/USDT")
+        base = pair.split("/")[0]
         
         message = f"""
 <b>POSITION OPENED #{trade_number}</b>
-<b>{side_text} ETH/USDT</b> (10.0% of bank)
+<b>{side_text} {pair}</b> (10.0% of bank)
 
 <b>Entry Price:</b> ${position["entry_price"]:.2f}
 <b>Current Price:</b> ${current_price:.2f}
-<b>Size:</b> {position["size_base"]:.6f} ETH
+<b>Size:</b> {position["size_base"]:.6f} {base}
 <b>Notional:</b> ${position["notional"]:.2f}
 <b>Margin:</b> ${position["notional"]/500:.2f}
 <b>Leverage:</b> x500
@@ -116,6 +218,8 @@ No open position at the moment.
     def send_position_closed(self, trade, trade_number=1, balance=0):
         """Send notification when position is closed"""
         side_text = "LONG" if trade["side"] == "long" else "SHORT"
+        pair = trade.get("symbol", "ETH/USDT")
+        base = pair.split("/")[0]
         
         margin = trade["notional"] / 500
         roi = (trade["pnl"] / margin) * 100 if margin > 0 else 0
@@ -124,11 +228,11 @@ No open position at the moment.
         
         message = f"""
 <b>POSITION CLOSED #{trade_number}</b>
-<b>{side_text} ETH/USDT</b> (10.0% of bank)
+<b>{side_text} {pair}</b> (10.0% of bank)
 
 <b>Entry Price:</b> ${trade["entry_price"]:.2f}
 <b>Exit Price:</b> ${trade["exit_price"]:.2f}
-<b>Size:</b> {trade["size_base"]:.6f} ETH
+<b>Size:</b> {trade["size_base"]:.6f} {base}
 <b>Notional:</b> ${trade["notional"]:.2f}
 <b>Margin:</b> ${margin:.2f}
 <b>Leverage:</b> x500
@@ -265,23 +369,16 @@ Use /help to see available commands.
     def send_bot_status_on_demand(self, chat_id):
         """Send bot status when requested by owner"""
         try:
-            import requests
-            try:
-                response = requests.get('http://localhost:5000/api/get_global_state', timeout=5)
-                if response.status_code == 200:
-                    state = response.json()
-                    bot_running = state.get('bot_running', False)
-                    balance = state.get('balance', 0)
-                    in_position = state.get('in_position', False)
-                    current_price = state.get('current_price', 0)
-                else:
-                    raise Exception("API request failed")
-            except:
-                from trading_bot import state
-                bot_running = False
-                balance = state.get('balance', 0)
-                in_position = state.get('in_position', False)
-                current_price = 0
+            if self.status_provider:
+                # снимок процесса бота (app.build_status): без HTTP запроса к самому себе
+                state = self.status_provider()
+            else:
+                from trading_bot import STATE_STORE
+                state = STATE_STORE.state
+            bot_running = state.get('bot_running', False)
+            balance = state.get('balance', 0)
+            in_position = state.get('in_position', False)
+            current_price = state.get('current_price') or 0
             
             status_emoji = "ON" if bot_running else "OFF"
             position_emoji = "OPEN" if in_position else "NONE"
@@ -303,15 +400,7 @@ Use /help to see available commands.
     def send_message_to_chat(self, chat_id, message):
         """Send message to specific chat"""
         try:
-            url = f"{self.base_url}/sendMessage"
-            data = {
-                "chat_id": chat_id,
-                "text": message,
-                "parse_mode": "HTML"
-            }
-            
-            response = requests.post(url, data=data, timeout=10)
-            response.raise_for_status()
+            self._post_message(chat_id, message)
             return True
         except Exception as e:
             logging.error(f"Failed to send message to chat {chat_id}: {e}")
@@ -323,7 +412,7 @@ Use /help to see available commands.
             return None
         try:
             url = f"{self.base_url}/getMe"
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, timeout=10)
             response.raise_for_status()
             bot_info = response.json()
             return bot_info.get('result', {}).get('username')
@@ -27,4 +27,5 @@ test_trade = {
 # Send notification
 print("\nSending test signal...")
 notifier.send_position_closed(test_trade, trade_number=42, balance=102.28)
-print("Done!")
+notifier.flush(timeout=30)
+print(f"Done! {notifier.get_delivery_stats()['totals']}")
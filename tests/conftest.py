@@ -0,0 +1,15 @@
+import os
+
+# до импорта модулей бота: без бирж, симулятора и живых файлов состояния
+os.environ.update({
+    "USE_SIMULATOR": "0",
+    "USE_WS_FEED": "0",
+    "REPLAY_FILE": "",
+    "VIRTUAL_CLOCK": "0",
+    "RUN_IN_PAPER": "1",
+    "KUCOIN_API_KEY": "",
+    "KUCOIN_API_SECRET": "",
+    "SIGNAL_WEBHOOK_URL": "",
+    "TRADE_JOURNAL_FILE": ":memory:",
+    "SIGNAL_QUEUE_PATH": ":memory:",
+})
@@ -0,0 +1,95 @@
+import pytest
+
+import candle_store
+from candle_store import CandleBuffer, CandleStore
+
+MINUTE = 60_000
+NOW = 1_700_000_000_000 - 1_700_000_000_000 % MINUTE
+
+
+def candle(ts, close=1.0):
+    return [ts, close, close + 1, close - 1, close, 10.0]
+
+
+class FakeExchange:
+    """1m свечи до now; последняя - формирующаяся с ценой forming"""
+
+    def __init__(self, now=NOW):
+        self.now = now
+        self.forming = 1.0
+        self.calls = []
+
+    def __call__(self, symbol, timeframe, since=None, limit=None):
+        self.calls.append((since, limit))
+        if since is None:
+            since = self.now - (limit - 1) * MINUTE
+        rows = [candle(ts) for ts in range(since, self.now + 1, MINUTE)][:limit]
+        if rows and rows[-1][0] == self.now:
+            rows[-1] = candle(self.now, self.forming)
+        return rows
+
+
+@pytest.fixture
+def exchange(monkeypatch):
+    exchange = FakeExchange()
+    monkeypatch.setattr(candle_store.time, "time", lambda: exchange.now / 1000)
+    return exchange
+
+
+def test_buffer_keeps_last_capacity_candles_in_order():
+    buf = CandleBuffer(5)
+    buf.merge([candle(i * MINUTE, i) for i in range(23)])
+    assert [row[0] for row in buf.window(10)] == [i * MINUTE for i in range(18, 23)]
+    buf.merge([candle(22 * MINUTE, 99.0), candle(3 * MINUTE)])  # формирующаяся заменяется, старые - нет
+    assert len(buf) == 5 and buf.window(1)[0][4] == 99.0
+    assert buf.window_candles(3).timestamp.tolist() == [20 * MINUTE, 21 * MINUTE, 22 * MINUTE]
+
+
+def test_delta_fetches_only_from_last_candle(exchange):
+    store = CandleStore(exchange, capacity=100, max_age=0)
+    assert len(store.get("ETH/USDT", "1m", limit=100)) == 100
+
+    exchange.forming = 2.0
+    exchange.now += 3 * MINUTE
+    rows = store.get("ETH/USDT", "1m", limit=100)
+
+    assert exchange.calls[-1] == (NOW, store.page_limit)
+    assert rows[-1][0] == exchange.now and rows[-4] == candle(NOW)  # прежняя формирующаяся закрыта
+    assert rows[-1][4] == 2.0 and store.stats["full"] == 1 and store.stats["delta"] == 1
+
+
+def test_fresh_window_is_served_from_memory(exchange):
+    store = CandleStore(exchange, capacity=100, max_age=60)
+    store.get("ETH/USDT", "1m", limit=50)
+    store.get_candles("ETH/USDT", "1m", limit=50)
+    assert len(exchange.calls) == 1 and store.stats["memory"] == 1
+
+
+def test_gap_longer_than_window_reloads_it(exchange):
+    store = CandleStore(exchange, capacity=100, max_age=0)
+    store.get("ETH/USDT", "1m", limit=100)
+    exchange.now += 500 * MINUTE
+    rows = store.get("ETH/USDT", "1m", limit=100)
+    assert exchange.calls[-1] == (None, 100) and store.stats["full"] == 2
+    assert rows[0][0] == exchange.now - 99 * MINUTE
+
+
+def test_window_larger_than_one_response_is_paged(exchange):
+    store = CandleStore(exchange, capacity=3015, max_age=0, full_limit=1500)
+    rows = store.get("ETH/USDT", "1m", limit=3015)
+    assert [limit for _, limit in exchange.calls] == [1500, 1500, 1500]
+    assert len(rows) == 3015 and rows[-1][0] == NOW
+    assert all(b[0] - a[0] == MINUTE for a, b in zip(rows, rows[1:]))
+
+
+def test_stream_candle_applies_only_without_gap(exchange):
+    store = CandleStore(exchange, capacity=100, max_age=60)
+    assert not store.apply("ETH/USDT", "1m", candle(NOW))  # окно ещё не загружено
+    store.get("ETH/USDT", "1m", limit=100)
+
+    assert store.apply("ETH/USDT", "1m", candle(NOW, 5.0))
+    assert store.apply("ETH/USDT", "1m", candle(NOW + MINUTE, 6.0))
+    assert store.get("ETH/USDT", "1m", limit=2) == [candle(NOW, 5.0), candle(NOW + MINUTE, 6.0)]
+
+    assert not store.apply("ETH/USDT", "1m", candle(NOW + 3 * MINUTE))  # пропущена свеча
+    assert store._buffers[("ETH/USDT", "1m")].synced_at is None
@@ -0,0 +1,82 @@
+import json
+
+import numpy as np
+import pytest
+
+from candles import Candles
+from chart_data import ChartCache
+
+START = 1_700_000_100_000 - 1_700_000_100_000 % 900_000
+
+
+class FakeCandles:
+    """Окно свечей таймфрейма; последняя (формирующаяся) меняется через update()"""
+
+    def __init__(self, count=300, step_ms=60_000):
+        rng = np.random.default_rng(1)
+        self.step_ms = step_ms
+        self.close = list(3000 + np.cumsum(rng.normal(0, 2, count)))
+        self.requests = []
+
+    def update(self, close=None, new=False):
+        if new:
+            self.close.append(self.close[-1])
+        if close is not None:
+            self.close[-1] = close
+
+    def __call__(self, timeframe, limit):
+        self.requests.append((timeframe, limit))
+        close = np.array(self.close[-limit:])
+        timestamps = START + np.arange(len(self.close) - len(close), len(self.close)) * self.step_ms
+        return Candles(timestamps, close, close + 1, close - 1, close, np.ones(len(close)))
+
+
+@pytest.fixture
+def feed():
+    return FakeCandles()
+
+
+@pytest.fixture
+def cache(feed):
+    return ChartCache(feed, candles=50, warmup=50, max_age=0)
+
+
+def test_full_payload_then_delta_from_cursor(cache, feed):
+    full = json.loads(cache.payload("1m"))
+    assert full["reset"] and len(full["candles"]) == len(full["sar_points"]) == 50
+    cursor = full["cursor"]
+    assert cursor == full["candles"][-1]["time"]
+
+    feed.update(close=feed.close[-1] + 5)  # формирующаяся свеча изменилась
+    delta = json.loads(cache.payload("1m", since=cursor))
+    assert not delta["reset"] and [c["time"] for c in delta["candles"]] == [cursor]
+    assert delta["candles"][0]["close"] == pytest.approx(feed.close[-1])
+
+    feed.update(new=True)  # открылась новая свеча
+    delta = json.loads(cache.payload("1m", since=cursor))
+    assert [c["time"] for c in delta["candles"]] == [cursor, cursor + 60]
+    assert delta["cursor"] == cursor + 60
+
+
+def test_cursor_outside_window_gets_full_payload(cache):
+    full = json.loads(cache.payload("1m"))
+    assert json.loads(cache.payload("1m", since=full["candles"][0]["time"] - 60))["reset"]
+    assert cache.stats["full"] == 2 and cache.stats["delta"] == 0
+
+
+def test_same_cursor_is_encoded_once(feed):
+    cache = ChartCache(feed, candles=50, warmup=50, max_age=60)
+    cursor = json.loads(cache.payload("1m"))["cursor"]
+    assert cache.payload("1m", since=cursor) is cache.payload("1m", since=cursor)
+    assert cache.stats["delta"] == 1 and cache.stats["memo"] == 1 and len(feed.requests) == 1
+
+
+@pytest.mark.parametrize("timeframe", ["1w", "2m", "1h", "", "abc"])
+def test_only_dashboard_timeframes_are_served(cache, feed, timeframe):
+    with pytest.raises(ValueError):
+        cache.payload(timeframe)
+    assert feed.requests == [] and cache._entries == {}
+
+
+def test_base_candles_cover_the_largest_timeframe(cache):
+    assert cache.base_candles == (50 + 50 + 1) * 15
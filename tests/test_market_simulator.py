@@ -0,0 +1,45 @@
+import numpy as np
+
+from clock import VirtualClock
+from market_simulator import MarketSimulator
+
+START = 1_700_000_000.0
+
+
+def simulator(seed, **kwargs):
+    return MarketSimulator(initial_price=3000, seed=seed, clock=VirtualClock(START), history=300, **kwargs)
+
+
+def test_same_seed_gives_the_same_path():
+    first, second = simulator(7), simulator(7)
+    first.clock.advance(3600)
+    second.clock.advance(3600)
+    for a, b in zip(first.ohlcv_arrays("1m", 500), second.ohlcv_arrays("1m", 500)):
+        assert np.array_equal(a, b)
+    assert not np.array_equal(first.ohlcv_arrays("1m", 50)[4], simulator(8).ohlcv_arrays("1m", 50)[4])
+
+
+def test_repeated_requests_are_consistent():
+    sim = simulator(1)
+    sim.clock.advance(90)
+    ts, o, h, l, c, v = sim.ohlcv_arrays("5m", 50)
+    assert (ts % 300_000 == 0).all() and (np.diff(ts) == 300_000).all()
+    assert (h >= np.maximum(o, c)).all() and (l <= np.minimum(o, c)).all()
+    # 1m и 5m - одна траектория: закрытие совпадает с текущей ценой
+    assert c[-1] == sim.ohlcv_arrays("1m", 10)[4][-1] == sim.get_current_price()
+
+
+def test_forming_candle_advances_with_the_clock():
+    sim = simulator(3)
+    before = sim.ohlcv_arrays("1m", 5)
+    sim.clock.advance(60)
+    after = sim.ohlcv_arrays("1m", 5)
+    assert after[0][-1] == before[0][-1] + 60_000
+    assert after[1][-2] == before[1][-1]  # прежняя формирующаяся свеча закрылась
+    assert after[1][-1] == after[4][-2]  # open новой свечи - close предыдущей
+
+
+def test_volatility_is_per_minute_log_return_std():
+    sim = MarketSimulator(seed=5, volatility=0.001, clock=VirtualClock(START), history=5000, capacity=6000)
+    closes = sim.ohlcv_arrays("1m", 5000)[4]
+    assert abs(np.diff(np.log(closes)).std() - 0.001) < 0.0001
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+from clock import VirtualClock
+from price_service import PriceService, PriceUnavailable
+
+
+class SlowFetch:
+    """Запрос цены, который ждёт release(); считает вызовы"""
+
+    def __init__(self, price=100.0):
+        self.price = price
+        self.calls = 0
+        self.started = threading.Event()
+        self.released = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        assert self.released.wait(2)
+        if isinstance(self.price, Exception):
+            raise self.price
+        return self.price
+
+
+def test_quote_within_ttl_is_served_from_memory():
+    clock = VirtualClock()
+    prices = iter([100.0, 101.0])
+    service = PriceService(lambda: next(prices), max_age=1.0, clock=clock)
+
+    assert service.get_price() == 100.0
+    clock.advance(0.5)
+    assert service.get_price() == 100.0
+    clock.advance(1.0)
+    assert service.get_price() == 101.0
+    assert service.stats["fetches"] == 2 and service.stats["cached"] == 1
+
+
+def test_concurrent_callers_share_one_fetch():
+    fetch = SlowFetch()
+    service = PriceService(fetch, clock=VirtualClock())
+    results = []
+    leader = threading.Thread(target=lambda: results.append(service.get_price()))
+    leader.start()
+    assert fetch.started.wait(2)
+
+    followers = [threading.Thread(target=lambda: results.append(service.get_price())) for _ in range(5)]
+    for thread in followers:
+        thread.start()
+    # последователи ждут запрос лидера, а не делают свои
+    deadline = time.monotonic() + 2
+    while service.stats["coalesced"] < 5 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    fetch.released.set()
+    for thread in [leader] + followers:
+        thread.join(2)
+
+    assert results == [100.0] * 6 and fetch.calls == 1
+
+
+def test_failed_fetch_falls_back_to_last_quote():
+    clock = VirtualClock()
+    service = PriceService(lambda: 100.0, max_age=1.0, clock=clock)
+    service.get_price()
+
+    service._fetch = lambda: (_ for _ in ()).throw(ConnectionError("down"))
+    clock.advance(5)
+    quote = service.get_quote()
+    assert quote.price == 100.0 and service.stats["stale"] == 1 and service.stats["errors"] == 1
+
+
+def test_failure_without_any_quote_raises():
+    fetch = SlowFetch(ConnectionError("down"))
+    fetch.released.set()
+    service = PriceService(fetch, clock=VirtualClock())
+    with pytest.raises(PriceUnavailable):
+        service.get_price()
+
+
+def test_older_stream_quote_does_not_replace_newer():
+    clock = VirtualClock()
+    service = PriceService(lambda: 0.0, clock=clock)
+    service.update(101.0, timestamp=clock.time())
+    service.update(99.0, timestamp=clock.time() - 1)
+    assert service.get_price() == 101.0 and service.stats["fetches"] == 0
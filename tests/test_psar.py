@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from psar import IncrementalPSAR, psar_series
+
+STEP, MAX_STEP = 0.05, 0.5
+
+
+def random_candles(n, seed=1):
+    rng = np.random.default_rng(seed)
+    close = 3000 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.001, n))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.001, n))
+    timestamps = 1_700_000_000_000 + np.arange(n, dtype=np.int64) * 60_000
+    return timestamps, high, low, close
+
+
+def test_matches_ta_psar_indicator():
+    pd = pytest.importorskip("pandas")
+    trend = pytest.importorskip("ta.trend")
+    _, high, low, close = random_candles(500)
+    expected = trend.PSARIndicator(
+        pd.Series(high), pd.Series(low), pd.Series(close), step=STEP, max_step=MAX_STEP
+    ).psar().to_numpy()
+    assert np.allclose(psar_series(high, low, close, STEP, MAX_STEP), expected)
+
+
+def test_sliding_windows_match_full_series():
+    """Окна по 50 свечей, как в живом цикле, с пересчётом формирующейся свечи"""
+    timestamps, high, low, close = random_candles(400, seed=2)
+    expected = psar_series(high, low, close, STEP, MAX_STEP)
+    engine = IncrementalPSAR(STEP, MAX_STEP)
+    for end in range(5, len(close) + 1):
+        window = slice(max(0, end - 50), end)
+        # сначала неполная версия последней свечи, затем окончательная
+        partial_high, partial_low = high[window].copy(), low[window].copy()
+        partial_close = close[window].copy()
+        partial_high[-1] = partial_low[-1] = partial_close[-1] = (high[end - 1] + low[end - 1]) / 2
+        engine.feed(timestamps[window], partial_high, partial_low, partial_close)
+        value = engine.feed(timestamps[window], high[window], low[window], close[window])
+        assert value == pytest.approx(expected[end - 1])
+
+
+def test_window_without_overlap_restarts_engine():
+    timestamps, high, low, close = random_candles(120, seed=3)
+    engine = IncrementalPSAR(STEP, MAX_STEP)
+    engine.feed(timestamps[:50], high[:50], low[:50], close[:50])
+    value = engine.feed(timestamps[60:], high[60:], low[60:], close[60:])
+    assert value == pytest.approx(psar_series(high[60:], low[60:], close[60:], STEP, MAX_STEP)[-1])
+
+
+def test_series_with_state_keeps_values():
+    _, high, low, close = random_candles(300, seed=4)
+    psar, up_trend, af, _, _ = psar_series(high, low, close, STEP, MAX_STEP, with_state=True)
+    assert psar == psar_series(high, low, close, STEP, MAX_STEP)
+    assert all(STEP <= value <= MAX_STEP for value in af)
+    # в восходящем тренде SAR под ценой, в нисходящем - над ней
+    for i in range(2, len(close)):
+        assert (psar[i] <= high[i]) if up_trend[i] else (psar[i] >= low[i])
+
+
+
+def test_backtest_pass_uses_the_same_engine():
+    backtest = pytest.importorskip("backtest")
+    _, high, low, close = random_candles(300, seed=5)
+    assert np.allclose(backtest.psar_pass(high, low, close, STEP, MAX_STEP),
+                       psar_series(high, low, close, STEP, MAX_STEP))
@@ -0,0 +1,65 @@
+import threading
+import time
+
+import rate_limiter
+from rate_limiter import ANALYTICS, OHLCV, ORDER, RequestScheduler
+
+SLOW_POOL = {"capacity": 10, "period": 1000.0, "reserve": 5.0}  # пополнение за время теста не успевает
+
+
+def start(target):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def test_order_overtakes_waiting_reads():
+    scheduler = RequestScheduler({"public": {"capacity": 1, "period": 0.1}}, {})
+    scheduler.acquire("public", 1, OHLCV)  # пул пуст
+    served = []
+
+    reader = start(lambda: (scheduler.acquire("public", 1, OHLCV), served.append("ohlcv")))
+    wait_for(lambda: scheduler.depth[OHLCV] == 1)
+    order = start(lambda: (scheduler.acquire("public", 1, ORDER), served.append("order")))
+    reader.join(2)
+    order.join(2)
+
+    assert served == ["order", "ohlcv"]
+
+
+def test_reads_stop_at_reserve_but_orders_do_not():
+    scheduler = RequestScheduler({"private": SLOW_POOL}, {})
+    assert scheduler.acquire("private", 5, OHLCV) < 0.05  # до резерва
+
+    start(lambda: scheduler.acquire("private", 1, ANALYTICS))
+    wait_for(lambda: scheduler.depth[ANALYTICS] == 1)
+    time.sleep(0.05)
+    assert scheduler.depth[ANALYTICS] == 1  # резерв чтениям недоступен
+
+    assert scheduler.acquire("private", 5, ORDER) < 0.05
+
+
+def test_call_does_not_demote_orders():
+    methods = {"create_order": ("private", 2, ORDER), "fetch_ohlcv": ("private", 3, OHLCV)}
+    scheduler = RequestScheduler({"private": SLOW_POOL}, methods)
+    seen = []
+    scheduler.acquire = lambda pool, weight, priority: seen.append(priority)
+
+    scheduler.call("create_order", lambda: None, priority=ANALYTICS)
+    scheduler.call("fetch_ohlcv", lambda: None, priority=ANALYTICS)
+    scheduler.call("cancel_unknown", lambda: None, priority=ANALYTICS)
+
+    assert seen == [ORDER, ANALYTICS, ORDER]
+
+
+def test_pools_follow_the_traded_market():
+    assert rate_limiter.KUCOIN_DEFAULT_TYPE in rate_limiter.FUTURES_TYPES
+    assert rate_limiter.SCHEDULER.buckets["private"].capacity == 2000  # futures, не spot 4000
+    assert rate_limiter.kucoin_pools("spot")["private"]["capacity"] == 4000
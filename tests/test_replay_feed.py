@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from clock import VirtualClock
+from replay_feed import ReplayClock, ReplayFeed, load_market_data
+
+pytest.importorskip("pandas")
+
+START = 1_700_000_000_000 - 1_700_000_000_000 % 900_000
+
+
+@pytest.fixture
+def candles_csv(tmp_path):
+    rng = np.random.default_rng(1)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, 600))
+    open_ = np.r_[close[0], close[:-1]]
+    rows = [
+        f"{START + i * 60_000},{o},{max(o, c) + 0.2},{min(o, c) - 0.2},{c},{10 + i}"
+        for i, (o, c) in enumerate(zip(open_, close))
+    ]
+    path = tmp_path / "candles.csv"
+    path.write_text("\n".join(rows) + "\n")
+    return str(path)
+
+
+def test_csv_with_and_without_header_loads_the_same(candles_csv, tmp_path):
+    with_header = tmp_path / "with_header.csv"
+    with_header.write_text("timestamp,open,high,low,close,volume\n" + open(candles_csv).read())
+    plain, _ = load_market_data(candles_csv)
+    headed, _ = load_market_data(str(with_header))
+    for name in plain:
+        assert np.array_equal(plain[name], headed[name])
+    assert plain["timestamp"][0] == START
+
+
+def test_trades_build_one_minute_candles(tmp_path):
+    path = tmp_path / "trades.csv"
+    path.write_text("timestamp,price,amount\n"
+                    f"{START},10,1\n{START + 5_000},12,2\n{START + 50_000},9,1\n{START + 120_000},11,3\n")
+    candles, trades = load_market_data(str(path))
+    assert candles["timestamp"].tolist() == [START, START + 120_000]  # пустая минута пропущена
+    assert candles["open"].tolist() == [10, 11] and candles["close"].tolist() == [9, 11]
+    assert candles["high"][0] == 12 and candles["low"][0] == 9 and candles["volume"][0] == 4
+    assert len(trades["price"]) == 4
+
+
+def test_max_speed_steps_one_closed_candle_per_advance(candles_csv):
+    feed = ReplayFeed(candles_csv, speed=0, warmup=200)
+    first = feed.now_ms()
+    feed.advance()
+    assert feed.now_ms() == START + 202 * 60_000 - 1  # закрытие свечи 201
+
+    ts, o, h, l, c, v = feed.ohlcv_arrays("5m", 20)
+    assert ts[-1] <= feed.now_ms() < ts[-1] + 300_000 and (ts % 300_000 == 0).all()
+    assert feed.stats["ohlcv_requests"] == 1 and first < feed.now_ms()
+
+
+def test_replay_clock_follows_recorded_time(candles_csv):
+    base = VirtualClock(1_800_000_000)
+    feed = ReplayFeed(candles_csv, speed=60, clock=base)
+    clock = ReplayClock(feed, base)
+    assert clock.time() == feed.start_ms / 1000
+
+    clock.sleep(1)  # секунда записи при speed=60 - 1/60 секунды на базовых часах
+    assert base.time() == pytest.approx(1_800_000_000 + 1 / 60)
+    assert clock.time() == pytest.approx(feed.start_ms / 1000 + 1)
+    assert clock.utcnow().year == 2023
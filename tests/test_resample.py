@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from resample import resample_arrays, resample_ohlcv
+
+
+def minute_candles(n, start_ms, seed=1, gaps=()):
+    rng = np.random.default_rng(seed)
+    minutes = np.delete(np.arange(n + len(gaps)), list(gaps))[:n]
+    timestamps = start_ms + minutes.astype(np.int64) * 60_000
+    close = 100 + np.cumsum(rng.normal(0, 0.5, n))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) + rng.uniform(0, 0.3, n)
+    low = np.minimum(open_, close) - rng.uniform(0, 0.3, n)
+    volume = rng.uniform(1, 10, n)
+    return timestamps, open_, high, low, close, volume
+
+
+@pytest.mark.parametrize("minutes", [5, 15])
+@pytest.mark.parametrize("offset", [0, 3])
+def test_arrays_match_list_version(minutes, offset):
+    columns = minute_candles(200, 1_700_000_100_000 - 1_700_000_100_000 % 900_000 + offset * 60_000,
+                             gaps=(17, 18, 40))
+    rows = [list(row) for row in zip(*(c.tolist() for c in columns))]
+    expected = np.array(resample_ohlcv(rows, minutes), dtype=np.float64)
+    result = np.column_stack(resample_arrays(*columns, minutes))
+    assert result.shape == expected.shape
+    assert np.allclose(result, expected)
+
+
+def test_buckets_are_epoch_aligned_and_complete():
+    start = 1_700_000_100_000 - 1_700_000_100_000 % 300_000 + 2 * 60_000  # неполная первая 5m свеча
+    timestamps, open_, high, low, close, volume = minute_candles(23, start)
+    ts, o, h, l, c, v = resample_arrays(timestamps, open_, high, low, close, volume, 5)
+
+    assert (ts % 300_000 == 0).all()
+    assert ts[0] == start + 3 * 60_000  # первая неполная отброшена: её open неверен
+    first = timestamps >= ts[0]
+    assert v.sum() == pytest.approx(volume[first].sum())
+    assert o[0] == open_[3] and c[-1] == close[-1]
+    # формирующаяся свеча - из имеющихся минут
+    tail = timestamps >= ts[-1]
+    assert h[-1] == high[tail].max() and l[-1] == low[tail].min()
+
+
+def test_one_minute_is_a_copy():
+    columns = minute_candles(10, 1_700_000_000_000 - 1_700_000_000_000 % 60_000)
+    result = resample_arrays(*columns, 1)
+    for original, copy in zip(columns, result):
+        assert np.array_equal(original, copy) and copy is not original
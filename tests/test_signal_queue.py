@@ -0,0 +1,151 @@
+import sqlite3
+import time
+
+import pytest
+
+import signal_sender
+from signal_sender import SignalQueue, SignalSender
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SignalQueue(str(tmp_path / "signal_queue.db"))
+
+
+@pytest.fixture
+def sender(queue, monkeypatch):
+    """SignalSender без фонового потока: _process вызывается тестом, _deliver подменён"""
+    sender = SignalSender()
+    sender.queue = queue
+    sender.results = []
+    monkeypatch.setattr(sender, "_deliver", lambda position_type, mode, payload: sender.results.pop(0))
+    return sender
+
+
+def test_order_is_kept_within_symbol(queue):
+    first = queue.push("LONG", "CLOSE", {}, "ETH/USDT")
+    queue.push("SHORT", "OPEN", {}, "ETH/USDT")
+    assert queue.head()["id"] == first
+    queue.remove(first)
+    assert queue.head()["mode"] == "OPEN"
+
+
+def test_backed_off_symbol_does_not_block_others(queue):
+    eth = queue.push("LONG", "CLOSE", {}, "ETH/USDT")
+    queue.push("SHORT", "OPEN", {}, "ETH/USDT")
+    btc = queue.push("LONG", "OPEN", {}, "BTC/USDT")
+    queue.retry_later(eth, 1, time.time() + 60)
+
+    assert queue.head()["id"] == btc
+    queue.remove(btc)
+    # OPEN ETH стоит за отложенным CLOSE своего символа
+    assert queue.head()["id"] == eth
+
+
+def test_queue_without_symbol_column_is_migrated(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE signals (id INTEGER PRIMARY KEY AUTOINCREMENT, position_type TEXT NOT NULL,"
+        " mode TEXT NOT NULL, payload TEXT NOT NULL, created_at REAL NOT NULL,"
+        " attempts INTEGER NOT NULL DEFAULT 0, next_attempt REAL NOT NULL DEFAULT 0)"
+    )
+    conn.execute("INSERT INTO signals (position_type, mode, payload, created_at, next_attempt)"
+                 " VALUES ('LONG', 'CLOSE', '{}', 0, ?)", (time.time() + 60,))
+    conn.commit()
+    conn.close()
+
+    queue = SignalQueue(path)
+    queue.push("SHORT", "OPEN", {}, signal_sender.SIGNAL_DEFAULT_SYMBOL)
+    # CLOSE из старой очереди отложен, но OPEN того же символа всё равно ждёт его
+    item = queue.head()
+    assert item["symbol"] == signal_sender.SIGNAL_DEFAULT_SYMBOL and item["mode"] == "CLOSE"
+
+
+def test_signal_without_symbol_uses_default(queue):
+    queue.push("LONG", "CLOSE", {})
+    assert queue.head()["symbol"] == signal_sender.SIGNAL_DEFAULT_SYMBOL
+
+
+def test_rejected_close_drops_opens_behind_it(queue, sender):
+    queue.push("LONG", "CLOSE", {}, "ETH/USDT")
+    queue.push("SHORT", "OPEN", {}, "ETH/USDT")
+    btc = queue.push("LONG", "OPEN", {}, "BTC/USDT")
+    sender.results = [(False, False)]  # 4xx: повторять бессмысленно
+
+    sender._process(queue.head())
+
+    assert len(queue) == 1 and queue.head()["id"] == btc
+    assert sender.stats["dropped"] == 2 and sender.stats["orphaned"] == 1
+
+
+def test_close_neither_expires_nor_runs_out_of_attempts(queue, sender):
+    close = queue.push("LONG", "CLOSE", {}, "ETH/USDT")
+    queue.push("SHORT", "OPEN", {}, "ETH/USDT")
+    queue._conn.execute("UPDATE signals SET created_at = ?", (time.time() - 10 * signal_sender.SIGNAL_MAX_AGE,))
+    queue.retry_later(close, signal_sender.SIGNAL_MAX_ATTEMPTS, 0)
+    sender.results = [(False, True)]
+
+    sender._process(queue.head())
+
+    item = queue.head()
+    assert item["id"] == close and item["attempts"] == signal_sender.SIGNAL_MAX_ATTEMPTS + 1
+    assert len(queue) == 2 and sender.stats["dropped"] == 0
+
+
+def test_stale_open_is_dropped_without_delivery(queue, sender):
+    queue.push("LONG", "OPEN", {}, "ETH/USDT")
+    queue._conn.execute("UPDATE signals SET created_at = ?", (time.time() - 2 * signal_sender.SIGNAL_MAX_AGE,))
+
+    sender._process(queue.head())  # results пуст: вызов _deliver упал бы
+
+    assert len(queue) == 0 and sender.stats["dropped"] == 1
+
+
+def test_close_of_a_dropped_open_is_not_sent(queue, sender):
+    queue.push("LONG", "OPEN", {}, "ETH/USDT")
+    queue._conn.execute("UPDATE signals SET created_at = ?", (time.time() - 2 * signal_sender.SIGNAL_MAX_AGE,))
+    queue.push("LONG", "CLOSE", {}, "ETH/USDT")
+
+    sender._process(queue.head())  # OPEN устарел
+    sender._process(queue.head())  # его CLOSE отбрасывается без доставки
+
+    assert len(queue) == 0 and sender.stats["dropped"] == 2 and sender.stats["delivered"] == 0
+
+
+def test_close_queued_after_the_open_was_dropped_is_not_sent(queue, sender):
+    queue.push("SHORT", "OPEN", {}, "ETH/USDT")
+    sender.results = [(False, False)]
+    sender._process(queue.head())  # OPEN отвергнут
+
+    queue.push("SHORT", "CLOSE", {}, "ETH/USDT")
+    queue.push("LONG", "OPEN", {}, "ETH/USDT")
+    sender.results = [(True, False), (True, False)]
+    sender._process(queue.head())
+    sender._process(queue.head())
+
+    assert len(queue) == 0 and sender.stats["delivered"] == 1 and sender.results == [(True, False)]
+
+
+def test_delivered_open_clears_stale_marks(queue, sender):
+    queue.mark_unopened("ETH/USDT", "LONG")
+    queue.push("LONG", "OPEN", {}, "ETH/USDT")
+    queue.push("LONG", "CLOSE", {}, "ETH/USDT")
+    sender.results = [(True, False), (True, False)]
+
+    sender._process(queue.head())
+    sender._process(queue.head())
+
+    assert sender.stats["delivered"] == 2
+
+
+def test_close_after_orphaned_open_is_not_sent(queue, sender):
+    queue.push("LONG", "CLOSE", {}, "ETH/USDT")
+    queue.push("SHORT", "OPEN", {}, "ETH/USDT")
+    queue.push("SHORT", "CLOSE", {}, "ETH/USDT")
+    sender.results = [(False, False)]
+
+    sender._process(queue.head())  # CLOSE отвергнут - OPEN за ним отброшен
+    sender._process(queue.head())  # и CLOSE этого OPEN тоже
+
+    assert len(queue) == 0 and sender.stats["orphaned"] == 1 and sender.stats["dropped"] == 3
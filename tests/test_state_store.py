@@ -0,0 +1,57 @@
+import copy
+import json
+
+import pytest
+
+from state_store import StateStore, thaw
+
+
+def test_snapshot_is_deeply_read_only():
+    state = {"balance": 100.0, "position": {"type": "long"}, "trades": [{"pnl": 1.0}]}
+    store = StateStore()
+    snapshot = store.publish(state)
+
+    with pytest.raises(TypeError):
+        snapshot.state["balance"] = 0
+    with pytest.raises(TypeError):
+        snapshot.state["position"]["type"] = "short"
+    assert isinstance(snapshot.state["trades"], tuple)
+
+    # писатель меняет свой dict - опубликованная версия не меняется
+    state["position"]["type"] = "short"
+    state["trades"].append({"pnl": 2.0})
+    assert store.state["position"]["type"] == "long" and len(store.state["trades"]) == 1
+    assert json.loads(json.dumps(store.state)) == {"balance": 100.0, "position": {"type": "long"},
+                                                    "trades": [{"pnl": 1.0}]}
+
+
+def test_thawed_copy_is_mutable():
+    store = StateStore({"position": {"type": "long"}, "trades": [1]})
+    for mutable in (thaw(store.state), copy.deepcopy(store.state)):
+        mutable["position"]["type"] = "short"
+        mutable["trades"].append(2)
+    assert store.state["position"]["type"] == "long"
+
+
+def test_batch_publishes_one_version():
+    store = StateStore()
+    seen = []
+    store.subscribe(lambda snapshot: seen.append((snapshot.version, snapshot.state["step"])))
+
+    with store.batch():
+        store.publish({"step": 1})
+        with store.batch():
+            store.publish({"step": 2})
+        assert seen == [] and store.version == 0  # вложенный batch не публикует
+        store.publish({"step": 3})
+
+    assert seen == [(1, 3)] and store.version == 1
+    store.publish({"step": 4})
+    assert seen[-1] == (2, 4)
+
+
+def test_empty_batch_publishes_nothing():
+    store = StateStore({"step": 0})
+    with store.batch():
+        pass
+    assert store.version == 0 and store.stats["publishes"] == 0
@@ -0,0 +1,23 @@
+import metrics
+from telegram_notifications import TELEGRAM_BROADCAST_SECONDS, TELEGRAM_MESSAGES, TelegramNotifier
+
+
+def test_broadcast_results_reach_metrics(monkeypatch):
+    notifier = TelegramNotifier("token", "1,2,3")
+
+    def post(chat_id, message):
+        if chat_id == "2":
+            raise ConnectionError("blocked")
+    monkeypatch.setattr(notifier, "_post_message", post)
+    delivered = TELEGRAM_MESSAGES.labels(result="delivered").value
+    failed = TELEGRAM_MESSAGES.labels(result="failed").value
+    sends = sum(TELEGRAM_BROADCAST_SECONDS.labels(stage="send").counts)
+
+    assert notifier.send_message("hello") and notifier.flush(timeout=5)
+
+    assert TELEGRAM_MESSAGES.labels(result="delivered").value == delivered + 2
+    assert TELEGRAM_MESSAGES.labels(result="failed").value == failed + 1
+    assert sum(TELEGRAM_BROADCAST_SECONDS.labels(stage="send").counts) == sends + 1
+    rendered = metrics.render()
+    assert 'tradingbot_telegram_messages_total{result="failed"}' in rendered
+    assert 'tradingbot_telegram_broadcast_seconds_count{stage="queue"}' in rendered
@@ -0,0 +1,36 @@
+from trade_journal import TradeJournal
+
+
+def trade(number, pnl, time):
+    return {"side": "long", "entry_price": 100.0, "exit_price": 100.0 + pnl, "size_base": 1.0,
+            "notional": 100.0, "pnl": pnl, "time": time, "trade_number": number}
+
+
+def test_trades_are_appended_and_read_back_in_order(tmp_path):
+    journal = TradeJournal(str(tmp_path / "trades.db"), symbol="ETH/USDT")
+    journal.record_open({"side": "long", "entry_price": 100.0, "entry_time": "2024-01-01T00:00:00"}, 1000.0)
+    for i in range(5):
+        journal.record_close(trade(i + 1, i - 2.0, f"2024-01-01T00:0{i}:30"), 1000.0 + i, i + 1)
+
+    assert [t["trade_number"] for t in journal.trades()] == [1, 2, 3, 4, 5]
+    assert [t["trade_number"] for t in journal.trades(limit=2)] == [4, 5]
+    assert [t["trade_number"] for t in journal.trades(since="2024-01-01T00:03")] == [4, 5]
+    assert journal.summary() == {"trades": 5, "total_pnl": 0.0, "wins": 2}
+    assert [e["kind"] for e in journal.events(limit=2)] == ["close", "close"]
+    assert journal.events(kind="open")[0]["data"]["entry_price"] == 100.0
+
+
+def test_symbols_share_a_file_but_not_history(tmp_path):
+    path = str(tmp_path / "trades.db")
+    eth, btc = TradeJournal(path, symbol="ETH/USDT"), TradeJournal(path, symbol="BTC/USDT")
+    eth.record_close(trade(1, 5.0, "2024-01-01T00:00:00"), 1005.0)
+    assert btc.trades() == [] and len(eth.trades()) == 1
+    assert TradeJournal(path).summary()["trades"] == 1
+
+
+def test_state_file_trades_are_imported_once(tmp_path):
+    journal = TradeJournal(str(tmp_path / "trades.db"), symbol="ETH/USDT")
+    legacy = [trade(1, 1.0, "2024-01-01T00:00:00"), trade(2, -1.0, "2024-01-01T00:01:00")]
+    assert journal.import_trades(legacy) == 2
+    assert journal.import_trades(legacy) == 0
+    assert journal.trades() == legacy
@@ -0,0 +1,116 @@
+import json
+import time
+import heapq
+import logging
+import threading
+
+import requests
+
+COINGECKO_MARKETS_URL = "https://api.coingecko.com/api/v3/coins/markets"
+TOP_GAINERS_K = 20
+TICKERS_INTERVAL = 15.0
+RANKS_INTERVAL = 3600.0
+RANK_PAGES = 4  # 4 x 250 монет по капитализации
+
+
+class TopGainersAggregator:
+    """
+    Топ растущих монет для /api/top_gainers, обновляется в фоне.
+
+    Все тикеры берутся одним запросом fetch_tickers раз в interval секунд, ранги
+    CoinGecko (символ -> место по капитализации) - раз в rank_interval. Первые top_k
+    по изменению за сутки хранятся готовым JSON, запрос клиента его только отдаёт.
+    """
+
+    def __init__(self, exchange, quote="USDT", top_k=TOP_GAINERS_K,
+                 interval=TICKERS_INTERVAL, rank_interval=RANKS_INTERVAL):
+        self.exchange = exchange
+        self.quote = quote
+        self.top_k = top_k
+        self.interval = interval
+        self.rank_interval = rank_interval
+        self.session = requests.Session()
+        self.ranks = {}
+        self.gainers = []
+        self.updated_at = None
+        self.ranks_updated_at = None
+        self.payload = json.dumps({"gainers": [], "updated_at": None})
+        self.stats = {"ticker_batches": 0, "ticker_errors": 0, "rank_refreshes": 0, "rank_errors": 0, "tickers": 0}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="top-gainers", daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            started = time.monotonic()
+            if self.ranks_updated_at is None or started - self.ranks_updated_at >= self.rank_interval:
+                self.refresh_ranks()
+            self.refresh_tickers()
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def refresh_ranks(self):
+        """Карта символ -> market_cap_rank из CoinGecko (при ошибке остаётся прежняя)"""
+        ranks = {}
+        try:
+            for page in range(1, RANK_PAGES + 1):
+                response = self.session.get(COINGECKO_MARKETS_URL, params={
+                    "vs_currency": "usd",
+                    "order": "market_cap_desc",
+                    "per_page": 250,
+                    "page": page
+                }, timeout=15)
+                response.raise_for_status()
+                for coin in response.json():
+                    symbol = (coin.get("symbol") or "").upper()
+                    rank = coin.get("market_cap_rank")
+                    if symbol and rank and (symbol not in ranks or rank < ranks[symbol]):
+                        ranks[symbol] = rank
+        except Exception as e:
+            self.stats["rank_errors"] += 1
+            logging.warning(f"CoinGecko ranks refresh failed: {e}")
+        if ranks:
+            self.ranks = ranks
+            self.stats["rank_refreshes"] += 1
+        # даже при ошибке не повторять запрос на каждом цикле тикеров
+        self.ranks_updated_at = time.monotonic()
+
+    def refresh_tickers(self):
+        try:
+            tickers = self.exchange.fetch_tickers()
+        except Exception as e:
+            self.stats["ticker_errors"] += 1
+            logging.warning(f"Top gainers tickers fetch failed: {e}")
+            return
+        self.stats["ticker_batches"] += 1
+        self.stats["tickers"] = len(tickers)
+        self.update(tickers.values())
+
+    def update(self, tickers):
+        """Пересчитать top_k из тикеров ccxt и подготовить JSON ответа"""
+        candidates = []
+        for ticker in tickers:
+            symbol = ticker.get("symbol") or ""
+            base, _, quote = symbol.partition("/")
+            if quote.split(":")[0] != self.quote:
+                continue
+            change = ticker.get("percentage")
+            if change is None:
+                continue
+            candidates.append((change, base, ticker.get("last")))
+
+        top = heapq.nlargest(self.top_k, candidates, key=lambda item: item[0])
+        ranks = self.ranks
+        gainers = [
+            {"symbol": base, "price": price, "change": change, "gecko_rank": ranks.get(base, "N/A")}
+            for change, base, price in top
+        ]
+        self.gainers = gainers
+        self.updated_at = time.time()
+        self.payload = json.dumps({"gainers": gainers, "updated_at": self.updated_at}, separators=(",", ":"))
+        return gainers
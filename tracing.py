@@ -0,0 +1,209 @@
+"""
+Трассировка итераций strategy_loop (span'ы в памяти, экспорт в Chrome Trace Event).
+
+    with TRACER.iteration("strategy_cycle", symbol=symbol):
+        with TRACER.span("fetch_candles", tf="1m"):
+            ...
+
+Законченные span'ы лежат в кольцевом буфере на capacity записей, старые вытесняются.
+Выключенный трассировщик отдаёт общий пустой контекст, поэтому включать и выключать
+его можно на ходу (TRACER.enable()/disable(), POST /api/trace) без перезапуска.
+Файл из chrome_trace() открывается в https://ui.perfetto.dev или chrome://tracing.
+"""
+import os
+import time
+import itertools
+import functools
+import threading
+from collections import deque
+
+TRACE_CAPACITY = int(os.getenv("TRACE_CAPACITY", "20000"))
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def annotate(self, **args):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "iteration", "root", "started", "started_wall")
+
+    def __init__(self, tracer, name, args, iteration=None):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.iteration = iteration
+        self.root = iteration is not None
+
+    def annotate(self, **args):
+        """Добавить аргументы к span'у (например, результат фазы)"""
+        self.args.update(args)
+
+    def __enter__(self):
+        local = self.tracer._local
+        if self.root:
+            local.iteration = self.iteration
+            local.root = self
+        else:
+            self.iteration = getattr(local, "iteration", None)
+        self.started_wall = time.time()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.started
+        if exc_type is not None:
+            self.args["error"] = f"{exc_type.__name__}: {exc}"
+        self.tracer._record(self, duration)
+        if self.root:
+            self.tracer._local.iteration = None
+            self.tracer._local.root = None
+        return False
+
+
+class Tracer:
+    """Span'ы по потокам; итерация - корневой span, к которому привязаны вложенные"""
+
+    def __init__(self, capacity=TRACE_CAPACITY, enabled=False):
+        self.enabled = enabled
+        self.spans = deque(maxlen=capacity)
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+        self._pid = os.getpid()
+        self.stats = {"spans": 0, "iterations": 0}
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        self.spans.clear()
+        self.stats = {"spans": 0, "iterations": 0}
+
+    def iteration(self, name, **args):
+        """Корневой span одной итерации цикла; вложенные span'ы этого потока попадают в неё"""
+        if not self.enabled:
+            return NULL_SPAN
+        self.stats["iterations"] += 1
+        return _Span(self, name, args, next(self._ids))
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name, args)
+
+    def annotate(self, **args):
+        """Аргументы текущей итерации этого потока (направления, решение и т.п.)"""
+        root = getattr(self._local, "root", None) if self.enabled else None
+        if root is not None:
+            root.args.update(args)
+
+    def bind(self, func):
+        """
+        func для выполнения в другом потоке (пул): его span'ы попадут в текущую
+        итерацию вызывающего потока.
+        """
+        iteration = getattr(self._local, "iteration", None)
+        if not self.enabled or iteration is None:
+            return func
+
+        @functools.wraps(func)
+        def bound(*args, **kwargs):
+            self._local.iteration = iteration
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._local.iteration = None
+        return bound
+
+    def _record(self, span, duration):
+        # deque.append атомарен, отдельная блокировка не нужна
+        self.spans.append((
+            span.iteration, span.name, span.started_wall, duration,
+            threading.get_ident(), threading.current_thread().name, dict(span.args)
+        ))
+        self.stats["spans"] += 1
+
+    def recent(self, limit=20):
+        """Последние limit итераций: корневой span и фазы по порядку начала"""
+        iterations = {}
+        for iteration, name, started, duration, _, thread, args in list(self.spans):
+            if iteration is None:
+                continue
+            iterations.setdefault(iteration, []).append({
+                "name": name,
+                "start": started,
+                "duration_ms": round(duration * 1000, 3),
+                "thread": thread,
+                "args": args
+            })
+        result = []
+        for iteration in sorted(iterations)[-limit:]:
+            spans = sorted(iterations[iteration], key=lambda s: s["start"])
+            root = spans[0]
+            result.append({
+                "iteration": iteration,
+                "name": root["name"],
+                "start": root["start"],
+                "duration_ms": root["duration_ms"],
+                "spans": spans
+            })
+        return result
+
+    def chrome_trace(self):
+        """Буфер в формате Chrome Trace Event (complete events, микросекунды)"""
+        events = []
+        threads = {}
+        for iteration, name, started, duration, tid, thread, args in list(self.spans):
+            threads[tid] = thread
+            event_args = dict(args)
+            if iteration is not None:
+                event_args["iteration"] = iteration
+            events.append({
+                "name": name,
+                "cat": "strategy" if iteration is not None else "background",
+                "ph": "X",
+                "ts": round(started * 1e6, 1),
+                "dur": round(duration * 1e6, 1),
+                "pid": self._pid,
+                "tid": tid,
+                "args": event_args
+            })
+        for tid, thread in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": thread}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def status(self):
+        return {
+            "enabled": self.enabled,
+            "capacity": self.spans.maxlen,
+            "buffered": len(self.spans),
+            **self.stats
+        }
+
+
+TRACER = Tracer(enabled=os.getenv("TRACE_ENABLED", "0").lower() in ("1", "true", "yes"))
+
+
+def traced(name, iteration=False):
+    """Декоратор: вызов функции - span name (iteration=True - корневой span итерации)"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return func(*args, **kwargs)
+            with (TRACER.iteration(name) if iteration else _Span(TRACER, name, {})):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,129 @@
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+
+class TradeJournal:
+    """
+    Журнал сделок (SQLite, WAL): каждое открытие и закрытие - одна запись,
+    старые записи не переписываются. Вся история доступна запросами,
+    а в файле состояния остаются только последние сделки для дашборда.
+    """
+
+    def __init__(self, path, symbol=None):
+        self.path = path
+        self.symbol = symbol
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " time TEXT NOT NULL,"
+            " kind TEXT NOT NULL,"
+            " symbol TEXT,"
+            " trade_number INTEGER,"
+            " side TEXT,"
+            " entry_price REAL,"
+            " exit_price REAL,"
+            " size_base REAL,"
+            " notional REAL,"
+            " pnl REAL,"
+            " balance REAL,"
+            " data TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS events_kind_time ON events (kind, time)")
+
+    def _append(self, kind, time, record, balance, trade_number=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO events (time, kind, symbol, trade_number, side, entry_price, exit_price,"
+                " size_base, notional, pnl, balance, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    time, kind, self.symbol, trade_number, record.get("side"),
+                    record.get("entry_price"), record.get("exit_price"), record.get("size_base"),
+                    record.get("notional"), record.get("pnl"), balance,
+                    json.dumps(record, default=str)
+                )
+            )
+
+    def record_open(self, position, balance):
+        try:
+            self._append("open", position.get("entry_time") or datetime.utcnow().isoformat(),
+                         position, balance, position.get("trade_number"))
+        except Exception as e:
+            logging.error(f"Trade journal error (open): {e}")
+
+    def record_close(self, trade, balance, trade_number=None):
+        try:
+            self._append("close", trade["time"], trade, balance, trade_number)
+        except Exception as e:
+            logging.error(f"Trade journal error (close): {e}")
+
+    def trades(self, limit=None, since=None):
+        """Закрытые сделки в формате state["trades"], от старых к новым"""
+        where = "kind = 'close'"
+        params = []
+        if self.symbol:
+            where += " AND symbol = ?"
+            params.append(self.symbol)
+        if since:
+            where += " AND time >= ?"
+            params.append(since)
+        if limit:
+            query = (f"SELECT data FROM (SELECT id, data FROM events WHERE {where}"
+                     f" ORDER BY id DESC LIMIT ?) ORDER BY id")
+            params.append(limit)
+        else:
+            query = f"SELECT data FROM events WHERE {where} ORDER BY id"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def events(self, kind=None, limit=100):
+        """Последние записи журнала (открытия и закрытия), от новых к старым"""
+        conditions = []
+        params = []
+        if self.symbol:
+            conditions.append("symbol = ?")
+            params.append(self.symbol)
+        if kind:
+            conditions.append("kind = ?")
+            params.append(kind)
+        query = "SELECT id, time, kind, symbol, trade_number, balance, data FROM events"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [
+            {"id": r[0], "time": r[1], "kind": r[2], "symbol": r[3], "trade_number": r[4],
+             "balance": r[5], "data": json.loads(r[6])}
+            for r in rows
+        ]
+
+    def summary(self):
+        with self._lock:
+            count, pnl, wins = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(pnl), 0), COALESCE(SUM(pnl > 0), 0) FROM events"
+                " WHERE kind = 'close' AND (? IS NULL OR symbol = ?)",
+                (self.symbol, self.symbol)
+            ).fetchone()
+        return {"trades": count, "total_pnl": pnl, "wins": wins}
+
+    def import_trades(self, trades):
+        """Перенести сделки из старого файла состояния, если журнал пуст"""
+        with self._lock:
+            empty = self._conn.execute(
+                "SELECT COUNT(*) FROM events WHERE ? IS NULL OR symbol = ?", (self.symbol, self.symbol)
+            ).fetchone()[0] == 0
+        if not empty or not trades:
+            return 0
+        for trade in trades:
+            self.record_close(trade, None)
+        logging.info(f"Trade journal: imported {len(trades)} trades from state file")
+        return len(trades)
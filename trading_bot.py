@@ -1,201 +1,542 @@
 import os
-import time
 import json
+import math
+import functools
 import threading
 import random
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
 
-import ccxt
-import pandas as pd
-from ta.trend import PSARIndicator
+import numpy as np
 import logging
+from startup import STARTUP
 from market_simulator import MarketSimulator
+from replay_feed import ReplayFeed, ReplayClock, parse_speed
+from candle_store import CandleStore, timeframe_to_seconds
+from resample import resample_arrays
+from candles import Candles
+from market_stream import MarketDataStream
+from price_service import PriceService, PriceUnavailable
+from trade_journal import TradeJournal
+from clock import RealClock, VirtualClock
+import metrics
+from metrics import timed
+from rate_limiter import ScheduledExchange, KUCOIN_DEFAULT_TYPE
+from tracing import TRACER, traced
+from psar import IncrementalPSAR, psar_series
 from signal_sender import SignalSender
+from state_store import StateStore
 
 API_KEY = os.getenv("KUCOIN_API_KEY", "")
 API_SECRET = os.getenv("KUCOIN_API_SECRET", "")
 API_PASSPHRASE = os.getenv("KUCOIN_API_PASSPHRASE", "")
 RUN_IN_PAPER = os.getenv("RUN_IN_PAPER", "1") == "1"
 USE_SIMULATOR = os.getenv("USE_SIMULATOR", "0") == "1"
+SIMULATOR_SEED = int(os.getenv("SIMULATOR_SEED")) if os.getenv("SIMULATOR_SEED") else None
+SIMULATOR_VOLATILITY = float(os.getenv("SIMULATOR_VOLATILITY", "0.001"))  # за 1m свечу
+VIRTUAL_CLOCK = os.getenv("VIRTUAL_CLOCK", "0") == "1"
+USE_WS_FEED = os.getenv("USE_WS_FEED", "0") == "1"
+REPLAY_FILE = os.getenv("REPLAY_FILE", "")
+REPLAY_SPEED = parse_speed(os.getenv("REPLAY_SPEED", "max"))
+MARKET_WS_URL = os.getenv("MARKET_WS_URL", "")
+STANDIN_EXCHANGE = os.getenv("STANDIN_EXCHANGE", "0") == "1"
 
 SYMBOL = "ETH/USDT"
 LEVERAGE = 500
 ISOLATED = True
 POSITION_PERCENT = 0.10
 TIMEFRAMES = {"1m": 1, "5m": 5, "15m": 15}
+PSAR_STEP = 0.05
+PSAR_MAX_STEP = 0.5
+OHLCV_CACHE_CAPACITY = 1000
+RESAMPLE_FROM_1M = os.getenv("RESAMPLE_FROM_1M", "1") == "1"
+RESAMPLE_MAX_BASE_CANDLES = 5000  # потолок 1m свечей на одну сборку старшего таймфрейма
+PRICE_MAX_AGE = float(os.getenv("PRICE_MAX_AGE", "1.0"))
+OHLCV_CACHE_MAX_AGE = 1.0
+DIRECTION_DEADLINE = float(os.getenv("DIRECTION_DEADLINE", "3.0"))
+DIRECTION_WORKERS = int(os.getenv("DIRECTION_WORKERS", "8"))
 MIN_TRADE_SECONDS = 120
 MIN_RANDOM_TRADE_SECONDS = 480
 MAX_RANDOM_TRADE_SECONDS = 780
 PAUSE_BETWEEN_TRADES = 0
 START_BANK = 100.0
 DASHBOARD_MAX = 20
+STATE_FILE = "goldantilopaeth500_state.json"
+TRADE_JOURNAL_FILE = os.getenv("TRADE_JOURNAL_FILE", "goldantilopaeth500_trades.db")
 
-state = {
-    "balance": START_BANK,
-    "available": START_BANK,
-    "in_position": False,
-    "position": None,
-    "last_trade_time": None,
-    "last_1m_dir": None,
-    "one_min_flip_count": 0,
-    "skip_next_signal": False,
-    "trades": []
-}
+def new_state():
+    return {
+        "balance": START_BANK,
+        "available": START_BANK,
+        "in_position": False,
+        "position": None,
+        "last_trade_time": None,
+        "last_1m_dir": None,
+        "one_min_flip_count": 0,
+        "skip_next_signal": False,
+        "trades": []
+    }
+
+
+def state_file_for(symbol):
+    """ETH/USDT -> goldantilopaeth500_state.json (как у отдельных ботов ETH/BTC)"""
+    if symbol == SYMBOL:
+        return STATE_FILE
+    return f"goldantilopa{symbol.split('/')[0].lower()}500_state.json"
+
+
+def replay_path(path):
+    """goldantilopaeth500_trades.db -> replay_goldantilopaeth500_trades.db (в том же каталоге)"""
+    if path == ":memory:":
+        return path
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f"replay_{name}")
+
+
+def create_exchange():
+    """
+    Клиент KuCoin; в мульти-символьном режиме один на все инструменты.
+    ccxt импортируется здесь: в режиме симулятора и воспроизведения он не нужен вовсе.
+    Лимиты запросов соблюдает общий планировщик (rate_limiter.py) с приоритетом
+    ордеров, а не встроенный в ccxt ограничитель, который держит порядок прихода.
+    STANDIN_EXCHANGE=1 - REST API локального stand-in сервера (market_ws_server.py).
+    """
+    if STANDIN_EXCHANGE:
+        from market_ws_server import StandInExchange
+        return ScheduledExchange(StandInExchange(MARKET_WS_URL or "ws://localhost:8765"))
+    import ccxt
+    return ScheduledExchange(ccxt.kucoin({
+        "apiKey": API_KEY,
+        "secret": API_SECRET,
+        "password": API_PASSPHRASE,
+        "sandbox": False,
+        "enableRateLimit": False,
+        "options": {
+            # пулы лимитов планировщика (rate_limiter.KUCOIN_POOLS) выбраны под этот рынок
+            "defaultType": KUCOIN_DEFAULT_TYPE,
+        }
+    }))
+
+
+DIRECTION_TIMEOUTS = metrics.counter(
+    "tradingbot_direction_timeouts_total", "Timeframe directions that missed the cycle deadline", ["timeframe"]
+)
+
+_direction_pool = None
+_direction_pool_lock = threading.Lock()
+
+
+def direction_pool():
+    """
+    Один пул потоков на процесс для расчёта направлений всех ботов: в мульти-символьном
+    режиме циклы символов идут по очереди, и пулу на каждый символ нечего было бы делать.
+    Потоки создаются по мере надобности, не больше DIRECTION_WORKERS.
+    """
+    global _direction_pool
+    with _direction_pool_lock:
+        if _direction_pool is None:
+            _direction_pool = ThreadPoolExecutor(max_workers=DIRECTION_WORKERS, thread_name_prefix="direction")
+        return _direction_pool
+
+# state основного инструмента (SYMBOL) - рабочий dict потока стратегии;
+# дашборд и Telegram читают опубликованные снимки из STATE_STORE
+state = new_state()
+STATE_STORE = StateStore(state)
 
 class TradingBot:
-    def __init__(self, telegram_notifier=None):
+    def __init__(self, telegram_notifier=None, symbol=SYMBOL, bot_state=None, exchange=None,
+                 candle_store=None, signal_sender=None, simulator=None, market_stream=True, clock=None):
+        """
+        symbol, bot_state - инструмент и его состояние (по умолчанию SYMBOL и модульный state).
+        exchange, candle_store, signal_sender, simulator - общие объекты при работе
+        нескольких инструментов в одном процессе (см. multi_symbol.py).
+        market_stream=False - поток рыночных данных ведёт внешний планировщик.
+        clock - часы (clock.py); VirtualClock прогоняет стратегию быстрее реального времени.
+        """
+        STARTUP.mark("imports")
+        if clock is None:
+            clock = VirtualClock() if VIRTUAL_CLOCK and (USE_SIMULATOR or REPLAY_FILE) else RealClock()
+        self.clock = clock
         self.notifier = telegram_notifier
-        self.signal_sender = SignalSender()
+        self.symbol = symbol
+        self.last_1m_direction = None
+        self.directions = {}
+        self._direction_futures = {}
+        self.on_state_change = None
+        if bot_state is not None:
+            self.state = bot_state
+        elif symbol == SYMBOL:
+            self.state = state
+        else:
+            self.state = new_state()
+        self.state_file = state_file_for(symbol)
+        self.signal_sender = signal_sender or SignalSender()
+        self.psar_engines = {tf: IncrementalPSAR(step=PSAR_STEP, max_step=PSAR_MAX_STEP) for tf in TIMEFRAMES}
+        self.candle_store = candle_store or CandleStore(
+            self._fetch_exchange_ohlcv,
+            capacity=OHLCV_CACHE_CAPACITY,
+            max_age=OHLCV_CACHE_MAX_AGE
+        )
+        self.price_service = PriceService(self._fetch_price, max_age=PRICE_MAX_AGE, clock=self.clock)
+        self.market_stream = None
+        self.replay_max_speed = False
         
-        if USE_SIMULATOR:
-            logging.info("Initializing market simulator")
-            self.simulator = MarketSimulator(initial_price=3000, volatility=0.02)
+        if REPLAY_FILE:
+            logging.info(f"Replaying {REPLAY_FILE} for {self.symbol}")
+            self.simulator = simulator or ReplayFeed(REPLAY_FILE, speed=REPLAY_SPEED, clock=self.clock)
+            self.exchange = None
+            # время бота (вход, выход, длительность сделок) - время записи, а не часы прогона
+            self.clock = ReplayClock(self.simulator, self.clock)
+            self.price_service.clock = self.clock
+            # цена меняется вместе со временем записи, а не по часам
+            self.price_service.max_age = 0
+            self.replay_max_speed = self.simulator.max_speed
+        elif USE_SIMULATOR:
+            logging.info(f"Initializing market simulator for {self.symbol}")
+            self.simulator = simulator or MarketSimulator(
+                initial_price=3000, volatility=SIMULATOR_VOLATILITY, seed=SIMULATOR_SEED, clock=self.clock
+            )
             self.exchange = None
         else:
-            logging.info("Initializing KUCOIN exchange connection")
             self.simulator = None
-            self.exchange = ccxt.kucoin({
-                "apiKey": API_KEY,
-                "secret": API_SECRET,
-                "password": API_PASSPHRASE,
-                "sandbox": False,
-                "enableRateLimit": True,
-                "options": {
-                    "defaultType": "swap",
-                }
-            })
-            logging.info("KUCOIN configured for futures trading with leverage support")
+            if exchange is not None:
+                self.exchange = exchange
+            else:
+                logging.info("Initializing KUCOIN exchange connection")
+                self.exchange = create_exchange()
+                logging.info("KUCOIN configured for futures trading with leverage support")
             
             if API_KEY and API_SECRET:
                 try:
                     if ISOLATED:
-                        self.exchange.set_margin_mode('isolated', SYMBOL)
-                        logging.info(f"Margin mode set to ISOLATED for {SYMBOL}")
+                        self.exchange.set_margin_mode('isolated', self.symbol)
+                        logging.info(f"Margin mode set to ISOLATED for {self.symbol}")
                     
-                    self.exchange.set_leverage(LEVERAGE, SYMBOL)
-                    logging.info(f"Leverage set to {LEVERAGE}x for {SYMBOL}")
+                    self.exchange.set_leverage(LEVERAGE, self.symbol)
+                    logging.info(f"Leverage set to {LEVERAGE}x for {self.symbol}")
                 except Exception as e:
                     logging.error(f"Failed to configure leverage/margin mode: {e}")
                     logging.error("Trading will continue in paper mode to avoid order rejections")
+
+        if USE_WS_FEED and market_stream:
+            if self.simulator is not None:
+                # свечи и цены симулятора - своя траектория, поток её бы только перебивал
+                logging.warning("USE_WS_FEED ignored with the simulator/replay; use STANDIN_EXCHANGE=1 instead")
+            else:
+                self.market_stream = MarketDataStream(
+                    [self.symbol],
+                    timeframe="1m",
+                    url=MARKET_WS_URL or None,
+                    on_connect=lambda: self.candle_store.mark_stale(self.symbol)
+                )
         
-        self.load_state_from_file()
+        if REPLAY_FILE:
+            # прогон записи каждый раз с чистого листа и не трогает живое состояние;
+            # его сделки остаются в replay_ журнале до следующего прогона
+            self.state_file = f"replay_{self.state_file}"
+            journal_path = replay_path(TRADE_JOURNAL_FILE)
+            if journal_path != ":memory:":
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(journal_path + suffix):
+                        os.remove(journal_path + suffix)
+            self.journal = TradeJournal(journal_path, symbol=self.symbol)
+        else:
+            self.journal = TradeJournal(TRADE_JOURNAL_FILE, symbol=self.symbol)
+            self.load_state_from_file()
+            self.journal.import_trades(self.state["trades"])
+        self.store = STATE_STORE if self.state is state else StateStore()
+        self.store.publish(self.state)
+        self.store.subscribe(self._write_state_file)
+        STARTUP.mark("bot_init")
         
+    @traced("save_state")
     def save_state_to_file(self):
+        """
+        Опубликовать живое состояние (баланс, позиция, последние DASHBOARD_MAX сделок)
+        новой версией store; внутри цикла стратегии - одной версией на весь цикл.
+        Файл пишет подписчик store (_write_state_file).
+        """
+        self.store.publish(self.state)
+
+    def _write_state_file(self, snapshot):
+        """
+        Снимок пишется во временный файл и атомарно подменяет старый;
+        история сделок - в журнале.
+        """
+        tmp_path = f"{self.state_file}.tmp"
         try:
-            with open("goldantilopaeth500_state.json", "w") as f:
-                json.dump(state, f, default=str, indent=2)
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot.state, f, default=str, separators=(",", ":"))
+            os.replace(tmp_path, self.state_file)
         except Exception as e:
             logging.error(f"Save error: {e}")
+        if self.on_state_change:
+            self.on_state_change()
 
     def load_state_from_file(self):
         try:
-            with open("goldantilopaeth500_state.json", "r") as f:
+            with open(self.state_file, "r") as f:
                 data = json.load(f)
-                state.update(data)
+                self.state.update(data)
         except:
             pass
 
     def now(self):
-        return datetime.utcnow()
+        return self.clock.utcnow()
+
+    def pause(self, seconds):
+        """Пауза между закрытием и новым входом (при воспроизведении на max - без паузы)"""
+        if not self.replay_max_speed:
+            self.clock.sleep(seconds)
 
+    @timed("exchange_fetch_ohlcv")
+    def _fetch_exchange_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        return self.exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
+
+    def fetch_raw_candles(self, tf: str, limit=200, store=None):
+        """
+        Свечи колонками (Candles) из симулятора или candle_store, без промежуточных списков.
+        store - другой CandleStore (например, у графиков), чтобы не трогать окна стратегии.
+        """
+        if self.simulator is not None:
+            return Candles(*self.simulator.ohlcv_arrays(tf, limit=limit))
+        return (store or self.candle_store).get_candles(self.symbol, tf, limit=limit)
+
+    def fetch_candles(self, tf: str, limit=200, store=None):
+        """
+        Свечи таймфрейма (Candles). При RESAMPLE_FROM_1M старшие таймфреймы собираются
+        из 1m свечей локально - один запрос к бирже на все таймфреймы
+        (не больше RESAMPLE_MAX_BASE_CANDLES 1m свечей).
+        """
+        minutes = timeframe_to_seconds(tf) // 60
+        if RESAMPLE_FROM_1M and minutes > 1:
+            base_limit = min((limit + 1) * minutes, RESAMPLE_MAX_BASE_CANDLES)
+            base = self.fetch_raw_candles("1m", limit=base_limit, store=store)
+            if len(base) == 0:
+                return base
+            return Candles(*resample_arrays(
+                base.timestamp, base.open, base.high, base.low, base.close, base.volume, minutes
+            )).tail(limit)
+        return self.fetch_raw_candles(tf, limit=limit, store=store)
+
+    @timed("fetch_ohlcv_tf", error_when=lambda result: result is None)
+    @traced("fetch_candles")
     def fetch_ohlcv_tf(self, tf: str, limit=200):
         """
-        Возвращает pd.DataFrame с колонками: timestamp, open, high, low, close, volume
+        Возвращает Candles (колонки timestamp, open, high, low, close, volume) или None.
+        DataFrame, если он нужен, - candles.to_frame().
         """
         try:
-            if USE_SIMULATOR and self.simulator:
-                ohlcv = self.simulator.fetch_ohlcv(tf, limit=limit)
-            else:
-                ohlcv = self.exchange.fetch_ohlcv(SYMBOL, timeframe=tf, limit=limit)
+            candles = self.fetch_candles(tf, limit=limit)
             
-            if not ohlcv:
+            if not len(candles):
                 return None
-                
-            df = pd.DataFrame(ohlcv)
-            df.columns = ["timestamp", "open", "high", "low", "close", "volume"]
-            df["datetime"] = pd.to_datetime(df["timestamp"], unit="ms")
-            return df
+            
+            return candles
         except Exception as e:
             logging.error(f"Error fetching {tf} ohlcv: {e}")
             return None
 
-    def compute_psar(self, df: pd.DataFrame):
+    @timed("compute_psar", error_when=lambda result: result is None)
+    def compute_psar(self, candles: Candles):
         """
-        Возвращает Series с PSAR (последняя точка).
+        Возвращает массив PSAR по всему окну (для графиков).
+        Для решений используется инкрементальный движок, см. get_direction_from_psar.
         """
-        if df is None or len(df) < 5:
+        if candles is None or len(candles) < 5:
             return None
         try:
-            high_series = pd.Series(df["high"].values)
-            low_series = pd.Series(df["low"].values)
-            close_series = pd.Series(df["close"].values)
-            psar_ind = PSARIndicator(high=high_series, low=low_series, close=close_series, step=0.05, max_step=0.5)
-            psar = psar_ind.psar()
-            return psar
+            psar = psar_series(
+                candles.high.tolist(), candles.low.tolist(), candles.close.tolist(),
+                step=PSAR_STEP, max_step=PSAR_MAX_STEP
+            )
+            return np.asarray(psar)
         except Exception as e:
             logging.error(f"PSAR compute error: {e}")
             return None
 
-    def get_direction_from_psar(self, df: pd.DataFrame):
+    @timed("update_psar")
+    @traced("psar")
+    def update_psar(self, tf: str, candles: Candles):
+        """
+        Продвигает PSAR движок таймфрейма по новым свечам окна и возвращает движок.
+        Закрытые свечи обрабатываются один раз, формирующаяся - пересчитывается.
+        """
+        engine = self.psar_engines[tf]
+        engine.feed(candles.timestamp, candles.high, candles.low, candles.close)
+        return engine
+
+    def get_direction_from_psar(self, candles: Candles, tf: str = None):
         """
         Возвращает направление 'long' или 'short' на основе сравнения последней close и psar
         """
         try:
-            psar = self.compute_psar(df)
-            if psar is None or len(psar) == 0:
+            if candles is None or len(candles) < 5:
                 return None
-            last_psar = psar.iloc[-1]
-            last_close = df["close"].iloc[-1]
+
+            if tf in self.psar_engines:
+                last_psar = self.update_psar(tf, candles).value
+            else:
+                psar = self.compute_psar(candles)
+                if psar is None or len(psar) == 0:
+                    return None
+                last_psar = float(psar[-1])
+            last_close = candles.last_close
             
-            if pd.isna(last_psar) or pd.isna(last_close):
+            if last_psar is None or math.isnan(last_psar) or math.isnan(last_close):
                 return None
             
-            return "long" if last_close > last_psar else "short"
+            direction = "long" if last_close > last_psar else "short"
+            if tf:
+                self.directions[tf] = direction
+            return direction
         except Exception as e:
             logging.error(f"Error in get_direction_from_psar: {e}")
             return None
 
 
+    def _current_direction(self, tf):
+        try:
+            candles = self.fetch_ohlcv_tf(tf, limit=50)
+            if candles is not None and len(candles) >= 5:
+                direction = self.get_direction_from_psar(candles, tf)
+                return direction if direction else None
+            return None
+        except Exception as e:
+            logging.error(f"Error getting direction for {tf}: {e}")
+            return None
+
     def get_current_directions(self):
         """Get current PSAR directions for all timeframes"""
+        return self.evaluate_directions({tf: functools.partial(self._current_direction, tf) for tf in TIMEFRAMES})
+
+    def _evaluate_direction(self, tf, evaluate):
+        with TRACER.span("direction", tf=tf):
+            return evaluate()
+
+    def evaluate_directions(self, evaluators, deadline=None):
+        """
+        Направления таймфреймов параллельно: evaluators - {tf: функция без аргументов}.
+        Каждый таймфрейм считается в потоке общего пула (direction_pool), общий срок -
+        deadline секунд (с симулятором и записью - по очереди в этом потоке).
+        Не успевший таймфрейм получает последнее известное направление (self.directions,
+        None если его ещё нет), а его расчёт дорабатывает в фоне: следующий цикл
+        дождётся того же расчёта, а не запустит второй на тот же PSAR движок.
+        """
+        deadline = DIRECTION_DEADLINE if deadline is None else deadline
+        if self.simulator is not None:
+            # данные в памяти процесса, ждать нечего - потоки дали бы только накладные расходы
+            return {tf: self._evaluate_direction(tf, evaluate) for tf, evaluate in evaluators.items()}
+        pool = direction_pool()
+        futures = {}
+        for tf, evaluate in evaluators.items():
+            future = self._direction_futures.get(tf)
+            if future is None or future.done():
+                future = pool.submit(TRACER.bind(self._evaluate_direction), tf, evaluate)
+                self._direction_futures[tf] = future
+            futures[tf] = future
+
+        wait(futures.values(), timeout=deadline)
         directions = {}
-        for tf in TIMEFRAMES.keys():
-            try:
-                df = self.fetch_ohlcv_tf(tf, limit=50)
-                if df is not None and len(df) >= 5:
-                    direction = self.get_direction_from_psar(df)
-                    directions[tf] = direction if direction else None
-                else:
+        for tf, future in futures.items():
+            if future.done():
+                try:
+                    directions[tf] = future.result()
+                except Exception as e:
+                    logging.error(f"Direction {tf} error: {e}")
                     directions[tf] = None
-            except Exception as e:
-                logging.error(f"Error getting direction for {tf}: {e}")
-                directions[tf] = None
+            else:
+                DIRECTION_TIMEOUTS.labels(timeframe=tf).inc()
+                directions[tf] = self.directions.get(tf)
+                logging.warning(f"{self.symbol} {tf} direction missed the {deadline:.1f}s deadline, "
+                                f"using last known: {directions[tf]}")
         return directions
 
+    def apply_market_events(self, events):
+        """Применить события потока: свечи 1m - в candle_store, тикер - в price_service"""
+        if self.simulator is not None:
+            return
+        for event in events:
+            if event.kind == "kline":
+                self.candle_store.apply(event.symbol, event.timeframe, event.data)
+            elif event.kind == "ticker":
+                self.price_service.update(event.data["last"], event.received_at)
+
+    def wait_for_market_update(self, timeout):
+        """
+        С потоком WebSocket - ждёт следующего события (не дольше timeout),
+        без него - просто пауза между опросами REST. Воспроизведение записи
+        на максимальной скорости вместо паузы переходит к следующей 1m свече.
+        """
+        if self.replay_max_speed:
+            self.simulator.advance()
+            return
+        if self.market_stream is None:
+            self.clock.sleep(timeout)
+            return
+        self.apply_market_events(self.market_stream.wait_events(timeout))
+
     def compute_order_size_usdt(self, balance, price):
         notional = balance * POSITION_PERCENT * LEVERAGE
         base_amount = notional / price
         return base_amount, notional
 
-    def get_current_price(self):
-        """Get current price from exchange or simulator"""
-        if USE_SIMULATOR and self.simulator:
+    @timed("fetch_price")
+    @traced("fetch_price")
+    def _fetch_price(self):
+        if self.simulator is not None:
             return self.simulator.get_current_price()
-        else:
-            try:
-                ticker = self.exchange.fetch_ticker(SYMBOL)
-                return ticker['last']
-            except Exception as e:
-                logging.error(f"Error fetching price: {e}")
-                return 3000.0
+        ticker = self.exchange.fetch_ticker(self.symbol)
+        return ticker['last']
+
+    def get_price_quote(self):
+        """Последняя котировка (цена и время получения) или None"""
+        try:
+            return self.price_service.get_quote()
+        except PriceUnavailable as e:
+            logging.error(f"Error fetching price: {e}")
+            return None
+
+    def get_current_price(self):
+        """Get current price from exchange or simulator (через кэш price_service)"""
+        quote = self.get_price_quote()
+        return quote.price if quote else None
+
+    def dashboard_snapshot(self):
+        """
+        Состояние для дашборда без запросов к бирже: опубликованный снимок store,
+        последняя котировка и направления SAR, посчитанные в цикле стратегии.
+        """
+        snapshot = self.store.snapshot
+        state = snapshot.state
+        quote = self.price_service.last_quote
+        pos = state["position"]
+        unrealized_pnl = 0.0
+        if state["in_position"] and pos and quote:
+            move = quote.price - pos["entry_price"] if pos["side"] == "long" else pos["entry_price"] - quote.price
+            unrealized_pnl = round(move * pos["size_base"], 4)
+        return {
+            "symbol": self.symbol,
+            "state_version": snapshot.version,
+            "balance": state["balance"],
+            "available": state["available"],
+            "in_position": state["in_position"],
+            "position": pos,
+            "trades": state["trades"][-DASHBOARD_MAX:],
+            "current_price": quote.price if quote else None,
+            "sar_directions": dict(self.directions),
+            "unrealized_pnl": unrealized_pnl
+        }
 
     def calculate_unrealized_pnl(self):
         """Рассчитать нереализованный P&L для открытой позиции"""
-        if not state["in_position"] or state["position"] is None:
+        if not self.state["in_position"] or self.state["position"] is None:
             return 0.0
         
-        pos = state["position"]
+        pos = self.state["position"]
         current_price = self.get_current_price()
+        if current_price is None:
+            return 0.0
         entry_price = pos["entry_price"]
         size = pos["size_base"]
         
@@ -206,6 +547,8 @@ class TradingBot:
         
         return round(unrealized_pnl, 4)
 
+    @timed("place_market_order", error_when=lambda result: result is None)
+    @traced("place_order")
     def place_market_order(self, side: str, amount_base: float):
         """
         side: 'buy' или 'sell' (для открытия позиции)
@@ -213,25 +556,29 @@ class TradingBot:
         """
         logging.info(f"[{self.now()}] PLACE MARKET ORDER -> side={side}, amount={amount_base:.6f}")
         
-        if RUN_IN_PAPER or API_KEY == "" or API_SECRET == "":
+        if RUN_IN_PAPER or API_KEY == "" or API_SECRET == "" or self.exchange is None:
             price = self.get_current_price()
+            if price is None:
+                logging.error("Paper order skipped: no price available")
+                return None
             entry_price = price
-            entry_time = datetime.utcnow()
+            entry_time = self.now()
             notional = amount_base * entry_price
             margin = notional / LEVERAGE
             
-            state["available"] -= margin
+            self.state["available"] -= margin
             
             close_time_seconds = random.randint(MIN_RANDOM_TRADE_SECONDS, MAX_RANDOM_TRADE_SECONDS)
             
-            if "telegram_trade_counter" not in state:
-                state["telegram_trade_counter"] = 1
+            if "telegram_trade_counter" not in self.state:
+                self.state["telegram_trade_counter"] = 1
             else:
-                state["telegram_trade_counter"] += 1
-            trade_number = state["telegram_trade_counter"]
+                self.state["telegram_trade_counter"] += 1
+            trade_number = self.state["telegram_trade_counter"]
             
-            state["in_position"] = True
-            state["position"] = {
+            self.state["in_position"] = True
+            self.state["position"] = {
+                "symbol": self.symbol,
                 "side": "long" if side == "buy" else "short",
                 "entry_price": entry_price,
                 "size_base": amount_base,
@@ -241,65 +588,86 @@ class TradingBot:
                 "close_time_seconds": close_time_seconds,
                 "trade_number": trade_number
             }
-            state["last_trade_time"] = entry_time.isoformat()
+            self.state["last_trade_time"] = entry_time.isoformat()
             
             logging.info(f"Position opened with random close time: {close_time_seconds}s ({close_time_seconds/60:.1f} minutes)")
+            self.journal.record_open(self.state["position"], self.state["balance"])
             
             if self.notifier:
-                self.notifier.send_position_opened(state["position"], price, trade_number, state["balance"])
+                with TRACER.span("telegram_notify"):
+                    self.notifier.send_position_opened(self.state["position"], price, trade_number, self.state["balance"])
             
-            if state["position"]["side"] == "long":
-                self.signal_sender.send_open_long()
-            else:
-                self.signal_sender.send_open_short()
+            with TRACER.span("signal_webhook"):
+                if self.state["position"]["side"] == "long":
+                    self.signal_sender.send_open_long(self.symbol)
+                else:
+                    self.signal_sender.send_open_short(self.symbol)
             
-            return state["position"]
+            return self.state["position"]
         else:
+            # цена входа на случай, если биржа не вернёт average/price: после исполнения
+            # ордера исключений быть не должно, иначе позиция на бирже останется без учёта
+            fallback_price = self.get_current_price()
+            if fallback_price is None and self.price_service.last_quote is not None:
+                fallback_price = self.price_service.last_quote.price
+            if fallback_price is None:
+                logging.error("Order skipped: no price available")
+                return None
+
             try:
                 try:
-                    self.exchange.set_leverage(LEVERAGE, SYMBOL)
+                    self.exchange.set_leverage(LEVERAGE, self.symbol)
                 except Exception as e:
                     logging.error(f"set_leverage failed: {e}")
 
-                order = self.exchange.create_market_buy_order(SYMBOL, amount_base) if side == "buy" else self.exchange.create_market_sell_order(SYMBOL, amount_base)
-                logging.info(f"Order response: {order}")
-                
-                entry_price = float(order.get("average", order.get("price", self.get_current_price())))
-                entry_time = datetime.utcnow()
-                notional = amount_base * entry_price
-                margin = notional / LEVERAGE
-                
-                state["available"] -= margin
-                
-                close_time_seconds = random.randint(MIN_RANDOM_TRADE_SECONDS, MAX_RANDOM_TRADE_SECONDS)
-                
-                state["in_position"] = True
-                state["position"] = {
-                    "side": "long" if side == "buy" else "short",
-                    "entry_price": entry_price,
-                    "size_base": amount_base,
-                    "notional": notional,
-                    "margin": margin,
-                    "entry_time": entry_time.isoformat(),
-                    "close_time_seconds": close_time_seconds
-                }
-                state["last_trade_time"] = entry_time.isoformat()
-                
-                logging.info(f"Position opened with random close time: {close_time_seconds}s ({close_time_seconds/60:.1f} minutes)")
-                
-                return state["position"]
-                
+                order = self.exchange.create_market_buy_order(self.symbol, amount_base) if side == "buy" else self.exchange.create_market_sell_order(self.symbol, amount_base)
             except Exception as e:
                 logging.error(f"Order error: {e}")
                 return None
+            logging.info(f"Order response: {order}")
 
+            entry_price = float(order.get("average") or order.get("price") or fallback_price)
+            entry_time = self.now()
+            notional = amount_base * entry_price
+            margin = notional / LEVERAGE
+            
+            self.state["available"] -= margin
+            
+            close_time_seconds = random.randint(MIN_RANDOM_TRADE_SECONDS, MAX_RANDOM_TRADE_SECONDS)
+            
+            self.state["in_position"] = True
+            self.state["position"] = {
+                "symbol": self.symbol,
+                "side": "long" if side == "buy" else "short",
+                "entry_price": entry_price,
+                "size_base": amount_base,
+                "notional": notional,
+                "margin": margin,
+                "entry_time": entry_time.isoformat(),
+                "close_time_seconds": close_time_seconds
+            }
+            self.state["last_trade_time"] = entry_time.isoformat()
+            
+            logging.info(f"Position opened with random close time: {close_time_seconds}s ({close_time_seconds/60:.1f} minutes)")
+            try:
+                self.journal.record_open(self.state["position"], self.state["balance"])
+            except Exception as e:
+                logging.error(f"Journal error: {e}")
+            
+            return self.state["position"]
+
+    @timed("close_position")
+    @traced("close_position")
     def close_position(self, close_reason="manual"):
         """Закрытие текущей позиции"""
-        if not state["in_position"] or state["position"] is None:
+        if not self.state["in_position"] or self.state["position"] is None:
             return None
             
-        pos = state["position"]
+        pos = self.state["position"]
         exit_price = self.get_current_price()
+        if exit_price is None:
+            logging.error("Close skipped: no price available")
+            return None
         entry_price = float(pos["entry_price"])
         size = float(pos["size_base"])
         
@@ -311,13 +679,14 @@ class TradingBot:
         pnl = round(pnl, 4)
         
         entry_time = datetime.fromisoformat(pos["entry_time"])
-        duration_seconds = (datetime.utcnow() - entry_time).total_seconds()
+        duration_seconds = (self.now() - entry_time).total_seconds()
         minutes = int(duration_seconds // 60)
         seconds = int(duration_seconds % 60)
         duration_str = f"{minutes}м {seconds}с"
         
         trade_record = {
-            "time": datetime.utcnow().isoformat(),
+            "time": self.now().isoformat(),
+            "symbol": self.symbol,
             "side": pos["side"],
             "entry_price": entry_price,
             "exit_price": exit_price,
@@ -328,25 +697,28 @@ class TradingBot:
             "close_reason": close_reason
         }
         
-        state["balance"] += pnl
-        state["available"] += pos.get("margin", pos["notional"] / LEVERAGE)
-        state["trades"].append(trade_record)
+        self.state["balance"] += pnl
+        self.state["available"] += pos.get("margin", pos["notional"] / LEVERAGE)
+        self.state["trades"].append(trade_record)
         
-        if len(state["trades"]) > DASHBOARD_MAX:
-            state["trades"] = state["trades"][-DASHBOARD_MAX:]
+        if len(self.state["trades"]) > DASHBOARD_MAX:
+            self.state["trades"] = self.state["trades"][-DASHBOARD_MAX:]
         
-        trade_number = pos.get("trade_number", state.get("telegram_trade_counter", 1))
+        trade_number = pos.get("trade_number", self.state.get("telegram_trade_counter", 1))
+        self.journal.record_close(trade_record, self.state["balance"], trade_number)
         
         if self.notifier:
-            self.notifier.send_position_closed(trade_record, trade_number, state["balance"])
+            with TRACER.span("telegram_notify"):
+                self.notifier.send_position_closed(trade_record, trade_number, self.state["balance"])
         
-        if pos["side"] == "long":
-            self.signal_sender.send_close_long()
-        else:
-            self.signal_sender.send_close_short()
+        with TRACER.span("signal_webhook"):
+            if pos["side"] == "long":
+                self.signal_sender.send_close_long(self.symbol)
+            else:
+                self.signal_sender.send_close_short(self.symbol)
         
-        state["in_position"] = False
-        state["position"] = None
+        self.state["in_position"] = False
+        self.state["position"] = None
         
         self.save_state_to_file()
         
@@ -357,11 +729,11 @@ class TradingBot:
     def get_1m_direction(self):
         """Получить направление SAR на 1m таймфрейме"""
         try:
-            df = self.fetch_ohlcv_tf("1m", limit=50)
-            if df is None or len(df) < 5:
+            candles = self.fetch_ohlcv_tf("1m", limit=50)
+            if candles is None or len(candles) < 5:
                 logging.warning("Could not fetch 1m OHLCV data - using default LONG")
                 return "long"
-            direction = self.get_direction_from_psar(df)
+            direction = self.get_direction_from_psar(candles, "1m")
             logging.debug(f"1m direction determined: {direction}")
             return direction
         except Exception as e:
@@ -371,11 +743,11 @@ class TradingBot:
     def get_5m_direction(self):
         """Получить направление SAR на 5m таймфрейме"""
         try:
-            df = self.fetch_ohlcv_tf("5m", limit=50)
-            if df is None or len(df) < 5:
+            candles = self.fetch_ohlcv_tf("5m", limit=50)
+            if candles is None or len(candles) < 5:
                 logging.warning("Could not fetch 5m OHLCV data - using default LONG")
                 return "long"
-            direction = self.get_direction_from_psar(df)
+            direction = self.get_direction_from_psar(candles, "5m")
             logging.debug(f"5m direction determined: {direction}")
             return direction
         except Exception as e:
@@ -385,17 +757,97 @@ class TradingBot:
     def get_15m_direction(self):
         """Получить направление SAR на 15m таймфрейме"""
         try:
-            df = self.fetch_ohlcv_tf("15m", limit=50)
-            if df is None or len(df) < 5:
+            candles = self.fetch_ohlcv_tf("15m", limit=50)
+            if candles is None or len(candles) < 5:
                 logging.warning("Could not fetch 15m OHLCV data - using default LONG")
                 return "long"
-            direction = self.get_direction_from_psar(df)
+            direction = self.get_direction_from_psar(candles, "15m")
             logging.debug(f"15m direction determined: {direction}")
             return direction
         except Exception as e:
             logging.error(f"Error in get_15m_direction: {e}", exc_info=True)
             return "long"
 
+    @traced("open_position")
+    def open_aligned_position(self, aligned_direction):
+        """Открыть позицию по направлению совпавших 1m и 5m"""
+        logging.info(f"✅ 1m + 5m ALIGNED: {aligned_direction.upper()}")
+        logging.info(f"OPENING NEW POSITION: {aligned_direction.upper()}")
+        price = self.get_current_price()
+        if price is None:
+            logging.error("Cannot open position: no price available")
+            return None
+        amount, notional = self.compute_order_size_usdt(self.state["balance"], price)
+        if aligned_direction == "long":
+            position = self.place_market_order("buy", amount)
+        else:
+            position = self.place_market_order("sell", amount)
+        self.save_state_to_file()
+        return position
+
+    @timed("strategy_cycle")
+    @traced("strategy_cycle", iteration=True)
+    def run_strategy_cycle(self):
+        """
+        Одна проверка стратегии: направления 1m и 5m, выход при смене 1m,
+        вход при совпадении 1m и 5m. Последнее направление 1m хранится в self.last_1m_direction.
+        Все изменения состояния за цикл (выход, новый вход) публикуются одной версией.
+        """
+        with self.store.batch():
+            self._strategy_decision()
+
+    def _strategy_decision(self):
+        directions = self.evaluate_directions({"1m": self.get_1m_direction, "5m": self.get_5m_direction})
+        current_1m, current_5m = directions["1m"], directions["5m"]
+        TRACER.annotate(symbol=self.symbol, direction_1m=current_1m, direction_5m=current_5m,
+                        in_position=self.state["in_position"])
+        if current_1m is None or current_5m is None:
+            logging.warning(f"{self.symbol}: no direction yet for 1m/5m, decision skipped this cycle")
+            return
+        
+        logging.info(f"{self.symbol} timeframes: 1m={current_1m.upper()} 5m={current_5m.upper()}")
+        
+        # Check if 1m and 5m align
+        aligned = (current_1m == current_5m)
+        aligned_direction = current_1m if aligned else None
+        last_1m_direction = self.last_1m_direction
+        
+        if last_1m_direction is None:
+            # First check - initialize
+            self.last_1m_direction = current_1m
+            
+            if self.state["in_position"] and self.state["position"]:
+                current_pos_side = self.state["position"]["side"].lower()
+                # Check if 1m has changed from position (exit condition)
+                if current_pos_side != current_1m:
+                    logging.warning(f"1m DIRECTION CHANGE DETECTED: {current_pos_side.upper()} -> {current_1m.upper()}")
+                    self.close_position(close_reason="1m_direction_change_exit")
+                    self.pause(1)
+            elif not self.state["in_position"] and aligned:
+                # Open position only if 1m and 5m align
+                self.open_aligned_position(aligned_direction)
+        
+        elif current_1m != last_1m_direction:
+            # 1m SAR changed - always exit regardless of alignment
+            logging.warning(f"⚠️ {self.symbol} 1m DIRECTION CHANGED: {last_1m_direction.upper()} -> {current_1m.upper()}")
+            
+            if self.state["in_position"]:
+                self.close_position(close_reason="1m_direction_change_exit")
+                self.pause(1)
+            
+            # Try to open new position if 1m and 5m now align
+            if aligned:
+                self.open_aligned_position(aligned_direction)
+            
+            self.last_1m_direction = current_1m
+        else:
+            # 1m hasn't changed
+            if self.state["in_position"]:
+                logging.debug(f"Position held - 1m unchanged: {current_1m.upper()}")
+            elif aligned:
+                # 1m and 5m align but not in position - open
+                self.open_aligned_position(aligned_direction)
+
     def strategy_loop(self, should_continue=None):
         """Основной цикл торговой стратегии
         ВХОД: 1m и 5m указывают в ОДНОМ направлении
@@ -405,92 +857,36 @@ class TradingBot:
         logging.info("ENTRY: 1m + 5m align in same direction")
         logging.info("EXIT: 1m SAR changes direction")
         
-        last_1m_direction = None
-        direction_check_interval = 5  # Check every 5 seconds
+        STARTUP.mark("loop_start")
+        self.last_1m_direction = None
+        # Check every 5 seconds; with the WebSocket feed - on every market event
+        direction_check_interval = 0 if self.market_stream or self.replay_max_speed else 5
         last_direction_check = 0
+        first_cycle = True
+
+        if self.market_stream:
+            self.market_stream.start()
         
         while True:
             if should_continue and not should_continue():
                 logging.info("Strategy loop stopped by external signal")
+                if self.market_stream:
+                    self.market_stream.stop()
                 break
             
             try:
-                current_time = time.time()
+                current_time = self.clock.time()
                 
                 # Check 1m and 5m timeframes every 5 seconds
                 if current_time - last_direction_check >= direction_check_interval:
-                    current_1m = self.get_1m_direction()
-                    current_5m = self.get_5m_direction()
-                    
-                    logging.info(f"Timeframes: 1m={current_1m.upper()} 5m={current_5m.upper()}")
-                    
-                    # Check if 1m and 5m align
-                    aligned = (current_1m == current_5m)
-                    aligned_direction = current_1m if aligned else None
-                    
-                    if last_1m_direction is None:
-                        # First check - initialize
-                        last_1m_direction = current_1m
-                        
-                        if state["in_position"] and state["position"]:
-                            current_pos_side = state["position"]["side"].lower()
-                            # Check if 1m has changed from position (exit condition)
-                            if current_pos_side != current_1m:
-                                logging.warning(f"1m DIRECTION CHANGE DETECTED: {current_pos_side.upper()} -> {current_1m.upper()}")
-                                self.close_position(close_reason="1m_direction_change_exit")
-                                time.sleep(1)
-                        elif not state["in_position"] and aligned:
-                            # Open position only if 1m and 5m align
-                            logging.info(f"✅ 1m + 5m ALIGNED: {aligned_direction.upper()}")
-                            logging.info(f"OPENING NEW POSITION: {aligned_direction.upper()}")
-                            price = self.get_current_price()
-                            amount, notional = self.compute_order_size_usdt(state["balance"], price)
-                            if aligned_direction == "long":
-                                self.place_market_order("buy", amount)
-                            else:
-                                self.place_market_order("sell", amount)
-                            self.save_state_to_file()
-                    
-                    elif current_1m != last_1m_direction:
-                        # 1m SAR changed - always exit regardless of alignment
-                        logging.warning(f"⚠️ 1m DIRECTION CHANGED: {last_1m_direction.upper()} -> {current_1m.upper()}")
-                        
-                        if state["in_position"]:
-                            self.close_position(close_reason="1m_direction_change_exit")
-                            time.sleep(1)
-                        
-                        # Try to open new position if 1m and 5m now align
-                        if aligned:
-                            logging.info(f"✅ 1m + 5m ALIGNED: {aligned_direction.upper()}")
-                            logging.info(f"OPENING NEW POSITION: {aligned_direction.upper()}")
-                            price = self.get_current_price()
-                            amount, notional = self.compute_order_size_usdt(state["balance"], price)
-                            if aligned_direction == "long":
-                                self.place_market_order("buy", amount)
-                            else:
-                                self.place_market_order("sell", amount)
-                            self.save_state_to_file()
-                        
-                        last_1m_direction = current_1m
-                    else:
-                        # 1m hasn't changed
-                        if state["in_position"]:
-                            logging.debug(f"Position held - 1m unchanged: {current_1m.upper()}")
-                        elif aligned:
-                            # 1m and 5m align but not in position - open
-                            logging.info(f"✅ 1m + 5m ALIGNED: {aligned_direction.upper()}")
-                            logging.info(f"OPENING NEW POSITION: {aligned_direction.upper()}")
-                            price = self.get_current_price()
-                            amount, notional = self.compute_order_size_usdt(state["balance"], price)
-                            if aligned_direction == "long":
-                                self.place_market_order("buy", amount)
-                            else:
-                                self.place_market_order("sell", amount)
-                            self.save_state_to_file()
-                    
+                    self.run_strategy_cycle()
                     last_direction_check = current_time
+                    if first_cycle:
+                        STARTUP.mark("first_decision")
+                        first_cycle = False
                 
             except Exception as e:
                 logging.error(f"Strategy loop error: {e}", exc_info=True)
             
-            time.sleep(5)
+            with TRACER.span("wait_market_update"):
+                self.wait_for_market_update(5)